@@ -6,13 +6,19 @@
 الإصدار: v1.0.0 MVP
 """
 
+import importlib
 import streamlit as st
 from streamlit_option_menu import option_menu
 import config
 from utils import apply_custom_css
 
-# استيراد الصفحات
-from pages import vision, gate_simulator, decision_center, live_report
+# الصفحات: عنوان القائمة ← وحدة الصفحة (تُستورد عند اختيارها فقط)
+PAGES = {
+    "الرؤية الاستراتيجية": "vision",
+    "بوابات العبور الرقمية": "gate_simulator",
+    "محاكي القرار السيادي": "decision_center",
+    "تقرير الأداء الحي": "live_report"
+}
 
 # ═══════════════════════════════════════════════════════════════
 # إعدادات الصفحة
@@ -61,12 +67,7 @@ with st.sidebar:
     # القائمة الرئيسية
     selected = option_menu(
         menu_title="القائمة الرئيسية",
-        options=[
-            "الرؤية الاستراتيجية",
-            "بوابات العبور الرقمية",
-            "محاكي القرار السيادي",
-            "تقرير الأداء الحي"
-        ],
+        options=list(PAGES),
         icons=['flag', 'door-open', 'building', 'graph-up'],
         menu_icon="list",
         default_index=0,
@@ -110,18 +111,8 @@ with st.sidebar:
 # المحتوى الرئيسي
 # ═══════════════════════════════════════════════════════════════
 
-# عرض الصفحة المختارة
-if selected == "الرؤية الاستراتيجية":
-    vision.show()
-
-elif selected == "بوابات العبور الرقمية":
-    gate_simulator.show()
-
-elif selected == "محاكي القرار السيادي":
-    decision_center.show()
-
-elif selected == "تقرير الأداء الحي":
-    live_report.show()
+# عرض الصفحة المختارة (الاستيراد الأول فقط يكلف، ثم تُؤخذ من sys.modules)
+importlib.import_module(f"pages.{PAGES[selected]}").show()
 
 # ═══════════════════════════════════════════════════════════════
 # التذييل (Footer)
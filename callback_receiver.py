@@ -0,0 +1,307 @@
+"""
+مستقبل قرارات محرك القرارات (n8n)
+خادم HTTP خفيف على asyncio يستقبل قرارات n8n الراجعة، يتحقق منها ويحفظها في
+مخزن مشترك (SQLite)، وتعرف الصفحات المفتوحة الجديد منها عبر رقم إصدار المخزن
+"""
+
+import asyncio
+import gzip
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# القرارات المقبولة من n8n
+DECISIONS = {
+    'approved': 'معتمد',
+    'rejected': 'مرفوض',
+    'on_hold': 'مجمد',
+    'needs_review': 'يحتاج مراجعة'
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    callback_id TEXT NOT NULL UNIQUE,
+    project_id TEXT,
+    project_name TEXT NOT NULL,
+    gate INTEGER,
+    decision TEXT NOT NULL,
+    reason TEXT,
+    sfm_score REAL,
+    decided_at TEXT NOT NULL,
+    received_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_decisions_received ON decisions (received_at);
+"""
+
+_STATUS_TEXT = {
+    200: 'OK', 202: 'Accepted', 400: 'Bad Request', 401: 'Unauthorized',
+    404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+    500: 'Internal Server Error'
+}
+
+
+def validate_decision(item: Any) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    التحقق من قرار واحد وتوحيد حقوله
+
+    Args:
+        item: القرار كما وصل من n8n
+
+    Returns:
+        Tuple: (القرار الموحد أو None، قائمة الأخطاء)
+    """
+    if not isinstance(item, dict):
+        return None, ['القرار يجب أن يكون كائن JSON']
+
+    errors = []
+    name = item.get('project_name')
+    if not isinstance(name, str) or not name.strip():
+        errors.append('project_name مطلوب')
+    decision = item.get('decision')
+    if decision not in DECISIONS:
+        errors.append(f"decision يجب أن يكون أحد: {', '.join(DECISIONS)}")
+    gate = item.get('gate')
+    if gate is not None and (not isinstance(gate, int) or isinstance(gate, bool) or not 1 <= gate <= 7):
+        errors.append('gate يجب أن يكون رقماً من 1 إلى 7')
+    sfm = item.get('sfm_score')
+    if sfm is not None and (not isinstance(sfm, (int, float)) or isinstance(sfm, bool) or not 0 <= sfm <= 100):
+        errors.append('sfm_score يجب أن يكون بين 0 و 100')
+    decided_at = item.get('decided_at') or datetime.now().isoformat()
+    try:
+        datetime.fromisoformat(str(decided_at))
+    except ValueError:
+        errors.append('decided_at يجب أن يكون بصيغة ISO 8601')
+    if errors:
+        return None, errors
+
+    return {
+        'callback_id': str(item.get('callback_id') or item.get('idempotency_key') or uuid.uuid4().hex),
+        'project_id': item.get('project_id'),
+        'project_name': name.strip(),
+        'gate': gate,
+        'decision': decision,
+        'reason': item.get('reason'),
+        'sfm_score': sfm,
+        'decided_at': str(decided_at)
+    }, []
+
+
+class DecisionStore:
+    """
+    مخزن القرارات المشترك بين المستقبل والجلسات
+
+    رقم الإصدار (version) هو أكبر معرّف في جدول القرارات، فيرى كل من يفتح
+    المخزن ما أضافته أي عملية أخرى، وتعرف الصفحة أن هناك قرارات جديدة
+    باستعلام واحد على المفتاح الأساسي قبل قراءة القرارات نفسها.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @property
+    def version(self) -> int:
+        """رقم الإصدار الحالي (يزيد مع كل قرار جديد من أي عملية)"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM decisions").fetchone()[0]
+
+    def add_many(self, decisions: List[Dict[str, Any]]) -> int:
+        """
+        حفظ قرارات موحدة (القرار المكرر بنفس callback_id يُتجاهل)
+
+        Returns:
+            int: عدد القرارات الجديدة
+        """
+        now = time.time()
+        rows = [
+            (d['callback_id'], d['project_id'], d['project_name'], d['gate'], d['decision'],
+             d['reason'], d['sfm_score'], d['decided_at'], now)
+            for d in decisions
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO decisions (callback_id, project_id, project_name, gate, "
+                    "decision, reason, sfm_score, decided_at, received_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            added = self._conn.total_changes - before
+        return added
+
+    def recent(self, limit: int = 20) -> pd.DataFrame:
+        """أحدث القرارات المستلمة"""
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT project_id, project_name, gate, decision, reason, sfm_score, decided_at "
+                "FROM decisions ORDER BY received_at DESC, id DESC LIMIT ?",
+                self._conn, params=(limit,)
+            )
+
+    def summary(self) -> Dict[str, int]:
+        """عدد القرارات لكل نوع"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT decision, COUNT(*) FROM decisions GROUP BY decision"
+            ).fetchall()
+        counts = {decision: 0 for decision in DECISIONS}
+        counts.update(dict(rows))
+        return counts
+
+
+class CallbackReceiver:
+    """
+    خادم HTTP على asyncio يعمل في خيط خلفي
+
+    يقبل POST بقرار واحد أو قائمة قرارات أو {"items": [...]} (مع دعم gzip)،
+    ويرد 202 عند الحفظ و 400 مع الأخطاء عند فشل التحقق و 500 عند تعذر الحفظ.
+
+    Args:
+        store: مخزن القرارات
+        host: عنوان الاستماع
+        port: المنفذ (0 لاختيار منفذ متاح)
+        path: مسار استقبال القرارات
+        token: رمز مشترك يُطلب في ترويسة X-EGISF-Token (اختياري)
+        max_body: الحد الأقصى لحجم الطلب (بايت)
+        read_timeout: مهلة قراءة الطلب (ثوانٍ)
+    """
+
+    def __init__(self, store: DecisionStore, host: str = '127.0.0.1', port: int = 8765,
+                 path: str = '/webhook/egisf-decision', token: Optional[str] = None,
+                 max_body: int = 1_000_000, read_timeout: float = 10.0):
+        self.store = store
+        self.host = host
+        self.port = port
+        self.path = path
+        self.token = token
+        self.max_body = max_body
+        self.read_timeout = read_timeout
+        self.received = 0
+        self.rejected = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}{self.path}'
+
+    def start(self) -> 'CallbackReceiver':
+        """تشغيل الخادم في خيط خلفي (يرفع OSError إذا كان المنفذ مشغولاً)"""
+        threading.Thread(target=self._run, name='n8n-callback-receiver', daemon=True).start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            status, body = await asyncio.wait_for(self._process(reader), self.read_timeout)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, UnicodeDecodeError):
+            status, body = 400, {'accepted': False, 'errors': ['طلب HTTP غير صالح']}
+        except Exception:  # خطأ في المخزن مثلاً: يجب أن يصل رد حتى لا يبقى الاتصال معلقاً
+            logger.exception("تعذر معالجة قرار وارد من n8n")
+            status, body = 500, {'accepted': False, 'errors': ['خطأ داخلي في حفظ القرارات']}
+        if status >= 400:
+            self.rejected += 1
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f'HTTP/1.1 {status} {_STATUS_TEXT[status]}\r\n'
+            f'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(data)}\r\n'
+            f'Connection: close\r\n\r\n'.encode('latin-1') + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _process(self, reader: asyncio.StreamReader) -> Tuple[int, Dict[str, Any]]:
+        method, target, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if target.split('?', 1)[0] != self.path:
+            return 404, {'accepted': False, 'errors': ['مسار غير معروف']}
+        if method != 'POST':
+            return 405, {'accepted': False, 'errors': ['الطريقة المسموحة: POST']}
+        if self.token and not hmac.compare_digest(headers.get('x-egisf-token', ''), self.token):
+            return 401, {'accepted': False, 'errors': ['رمز التحقق غير صحيح']}
+        length = int(headers.get('content-length', 0))
+        if length > self.max_body:
+            return 413, {'accepted': False, 'errors': ['حجم الطلب أكبر من المسموح']}
+
+        raw = await reader.readexactly(length)
+        try:
+            if headers.get('content-encoding') == 'gzip':
+                raw = gzip.decompress(raw)
+            payload = json.loads(raw)
+        except (OSError, ValueError):
+            return 400, {'accepted': False, 'errors': ['جسم JSON غير صالح']}
+
+        items = payload.get('items') if isinstance(payload, dict) and 'items' in payload else payload
+        items = items if isinstance(items, list) else [items]
+        decisions, errors = [], []
+        for index, item in enumerate(items):
+            decision, item_errors = validate_decision(item)
+            if item_errors:
+                errors.append({'index': index, 'errors': item_errors})
+            else:
+                decisions.append(decision)
+        if errors:
+            return 400, {'accepted': False, 'errors': errors}
+
+        # الحفظ وقراءة رقم الإصدار استعلامات SQLite حاجبة، فتُنفذ خارج حلقة الأحداث
+        added, version = await asyncio.get_running_loop().run_in_executor(None, self._store, decisions)
+        self.received += len(decisions)
+        return 202, {'accepted': True, 'stored': added, 'version': version}
+
+    def _store(self, decisions: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """حفظ القرارات ثم قراءة رقم الإصدار (في خيط من مجمع المنفذ)"""
+        return self.store.add_many(decisions), self.store.version
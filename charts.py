@@ -0,0 +1,300 @@
+"""
+بناة الرسوم البيانية المشتركة
+كل رسم يُبنى مرة واحدة لكل مجموعة مدخلات ويُحفظ في ذاكرة محدودة، فإعادة
+التشغيل بسبب عنصر تحكم آخر لا تعيد بناء الرسم، مع قالب تنسيق موحد للخطوط
+والألوان من config
+"""
+
+import copy
+import functools
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+import config
+
+def _figure_cache(builder: Callable[..., dict]) -> Callable[..., dict]:
+    """
+    تخزين مواصفات الرسم (fig.to_dict()) وإعادة نسخة عميقة منها لكل استدعاء
+
+    الرسم المحفوظ مشترك بين كل الجلسات، فإعادته كما هو تجعل أي تعديل من
+    مستدعٍ يظهر عند الآخرين. نسخ القاموس (أقل من 1 ms لجدول زمني بمئات
+    المشاريع) أرخص بكثير من بناء Figure أو نسخه أو فك تسلسله من cache_data
+    (7-17 ms)، و st.plotly_chart يقبل القاموس مباشرة.
+    """
+    cached = st.cache_resource(max_entries=config.CHARTS['cache_entries'], show_spinner=False)(builder)
+
+    @functools.wraps(builder)
+    def figure(*args, **kwargs) -> dict:
+        return copy.deepcopy(cached(*args, **kwargs))
+    return figure
+
+
+def base_layout(**overrides) -> dict:
+    """
+    قالب التنسيق المشترك لكل الرسوم
+
+    Args:
+        **overrides: إعدادات إضافية أو بديلة لـ update_layout
+
+    Returns:
+        dict: إعدادات التنسيق
+    """
+    layout = {
+        'font': {
+            'family': config.CHARTS['font_family'],
+            'size': config.CHARTS['font_size'],
+            'color': config.COLORS['dark']
+        }
+    }
+    layout.update(overrides)
+    return layout
+
+
+@_figure_cache
+def sfm_gauge(value: float, reference: float) -> dict:
+    """
+    مؤشر درجة الجدوى الشاملة
+
+    Args:
+        value: درجة SFM
+        reference: الحد الأدنى للاجتياز (خط العتبة ومرجع التغير)
+
+    Returns:
+        dict: مواصفات الرسم (fig.to_dict()، نسخة خاصة بالمستدعي)
+    """
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number+delta",
+        value=value,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': "الدرجة المركبة", 'font': {'size': 20}},
+        delta={'reference': reference, 'increasing': {'color': config.COLORS['success']}},
+        gauge={
+            'axis': {'range': [None, 100], 'tickwidth': 1, 'tickcolor': config.COLORS['dark']},
+            'bar': {'color': config.COLORS['primary']},
+            'bgcolor': "white",
+            'borderwidth': 2,
+            'bordercolor': config.COLORS['dark'],
+            'steps': [
+                {'range': [0, 40], 'color': config.COLORS['danger']},
+                {'range': [40, reference], 'color': config.COLORS['warning']},
+                {'range': [reference, 100], 'color': config.COLORS['success']}
+            ],
+            'threshold': {
+                'line': {'color': config.COLORS['secondary'], 'width': 4},
+                'thickness': 0.75,
+                'value': reference
+            }
+        }
+    ))
+    fig.update_layout(**base_layout(height=300, margin=dict(l=20, r=20, t=50, b=20)))
+    return fig.to_dict()
+
+
+@_figure_cache
+def sfm_distribution(economic: float, social: float, environmental: float) -> dict:
+    """
+    توزيع الجدوى الثلاثي (درجة كل محور)
+
+    Returns:
+        dict: مواصفات الرسم (fig.to_dict()، نسخة خاصة بالمستدعي)
+    """
+    fig = go.Figure(go.Bar(
+        x=['اقتصادي', 'اجتماعي', 'بيئي'],
+        y=[economic, social, environmental],
+        text=[economic, social, environmental],
+        texttemplate='%{text}',
+        textposition='outside',
+        marker_color=[config.COLORS['primary'], config.COLORS['info'], config.COLORS['success']]
+    ))
+    fig.update_layout(**base_layout(
+        height=400,
+        xaxis_title="",
+        yaxis_title="الدرجة (0-100)",
+        showlegend=False
+    ))
+    return fig.to_dict()
+
+
+@_figure_cache
+def monte_carlo_histogram(conditions: Tuple[str, ...], shares: Tuple[float, ...]) -> dict:
+    """
+    نصيب كل شرط من عينات Monte Carlo الفاشلة في البوابة الثانية
+
+    Args:
+        conditions: أسماء الشروط
+        shares: نسبة العينات الفاشلة التي خالفت كل شرط (0-1)
+
+    Returns:
+        dict: مواصفات الرسم (fig.to_dict()، نسخة خاصة بالمستدعي)
+    """
+    fig = go.Figure(go.Bar(
+        x=list(conditions),
+        y=[share * 100 for share in shares],
+        marker_color=config.COLORS['danger']
+    ))
+    fig.update_layout(**base_layout(
+        height=300,
+        xaxis_title="",
+        yaxis_title="% من العينات الفاشلة",
+        showlegend=False
+    ))
+    return fig.to_dict()
+
+
+@_figure_cache
+def status_pie(statuses: Tuple[str, ...], counts: Tuple[int, ...]) -> dict:
+    """
+    توزيع المشاريع حسب الحالة
+
+    Args:
+        statuses: أسماء الحالات (On Track, At Risk, Critical, Completed)
+        counts: عدد المشاريع لكل حالة
+
+    Returns:
+        dict: مواصفات الرسم (fig.to_dict()، نسخة خاصة بالمستدعي)
+    """
+    status_colors = {
+        'On Track': config.COLORS['success'],
+        'At Risk': config.COLORS['warning'],
+        'Critical': config.COLORS['danger'],
+        'Completed': config.COLORS['info']
+    }
+    fig = go.Figure(go.Pie(
+        labels=list(statuses),
+        values=list(counts),
+        hole=0.4,
+        marker={'colors': [status_colors.get(status, config.COLORS['primary']) for status in statuses]},
+        textposition='inside',
+        textinfo='percent+label',
+        sort=False
+    ))
+    fig.update_layout(**base_layout(height=400, showlegend=True))
+    return fig.to_dict()
+
+
+@_figure_cache
+def sector_bar(sectors: Tuple[str, ...], counts: Tuple[int, ...]) -> dict:
+    """
+    عدد المشاريع لكل قطاع
+
+    Returns:
+        dict: مواصفات الرسم (fig.to_dict()، نسخة خاصة بالمستدعي)
+    """
+    palette = px.colors.qualitative.Set3
+    fig = go.Figure(go.Bar(
+        x=list(sectors),
+        y=list(counts),
+        text=list(counts),
+        texttemplate='%{text}',
+        textposition='outside',
+        marker_color=[palette[i % len(palette)] for i in range(len(sectors))]
+    ))
+    fig.update_layout(**base_layout(
+        height=400,
+        xaxis_title="",
+        yaxis_title="عدد المشاريع",
+        showlegend=False
+    ))
+    return fig.to_dict()
+
+
+@_figure_cache
+def performance_timeline(
+    dates: Tuple[str, ...],
+    new_projects: Tuple[int, ...],
+    completed_projects: Tuple[int, ...],
+    deviations: Tuple[int, ...]
+) -> dict:
+    """
+    الأداء الشهري (مشاريع جديدة، مكتملة، انحرافات)
+
+    Args:
+        dates: تواريخ الأشهر (ISO)
+        new_projects: المشاريع الجديدة لكل شهر
+        completed_projects: المشاريع المكتملة لكل شهر
+        deviations: الانحرافات المكتشفة لكل شهر
+
+    Returns:
+        dict: مواصفات الرسم (fig.to_dict()، نسخة خاصة بالمستدعي)
+    """
+    series = [
+        ('مشاريع جديدة', new_projects, dict(color=config.COLORS['primary'], width=3)),
+        ('مشاريع مكتملة', completed_projects, dict(color=config.COLORS['success'], width=3)),
+        ('انحرافات مكتشفة', deviations, dict(color=config.COLORS['danger'], width=3, dash='dash'))
+    ]
+    fig = go.Figure([
+        go.Scatter(x=list(dates), y=list(values), mode='lines+markers', name=name,
+                   line=line, marker=dict(size=8))
+        for name, values, line in series
+    ])
+    fig.update_layout(**base_layout(
+        height=450,
+        xaxis_title="الشهر",
+        yaxis_title="العدد",
+        hovermode='x unified',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    ))
+    return fig.to_dict()
+
+
+# عدد الصفوف الذي تُخفى بعده أسماء المشاريع على المحور والنص داخل الأشرطة
+TIMELINE_LABEL_LIMIT = 40
+
+
+@_figure_cache
+def project_timeline(schedule: pd.DataFrame, status_colors: Dict[str, str]) -> dict:
+    """
+    الجدول الزمني للمشاريع (Gantt) بأثر واحد لكل حالة
+
+    عدد الآثار ثابت مهما زاد عدد المشاريع، والمدد تُحسب دفعة واحدة
+    (Finish - Start بالمللي ثانية) كأطوال أشرطة على محور تاريخ يبدأ من Start.
+
+    Args:
+        schedule: جدول بالأعمدة Task, Start, Finish, Resource (الحالة)
+        status_colors: لون كل حالة (بترتيب الظهور في وسيلة الإيضاح)
+
+    Returns:
+        dict: مواصفات الرسم (fig.to_dict()، نسخة خاصة بالمستدعي)
+    """
+    starts = pd.to_datetime(schedule['Start'])
+    finishes = pd.to_datetime(schedule['Finish'])
+    durations_ms = (finishes - starts).dt.total_seconds().to_numpy() * 1000
+    start_labels = starts.dt.strftime('%Y-%m-%d').to_numpy()
+    finish_labels = finishes.dt.strftime('%Y-%m-%d').to_numpy()
+    tasks = schedule['Task'].to_numpy()
+    statuses = schedule['Resource'].to_numpy()
+    show_labels = len(schedule) <= TIMELINE_LABEL_LIMIT
+
+    fig = go.Figure()
+    for status, color in status_colors.items():
+        rows = np.flatnonzero(statuses == status)
+        if not len(rows):
+            continue
+        fig.add_trace(go.Bar(
+            x=durations_ms[rows],
+            y=tasks[rows],
+            base=start_labels[rows],
+            orientation='h',
+            name=status,
+            marker=dict(color=color),
+            customdata=np.column_stack([start_labels[rows], finish_labels[rows]]),
+            hovertemplate='<b>%{y}</b><br>%{customdata[0]} - %{customdata[1]}<extra>' + status + '</extra>',
+            text=status if show_labels else None,
+            textposition='inside'
+        ))
+
+    height = 400 if len(schedule) <= 15 else min(120 + 14 * len(schedule), 1600)
+    fig.update_layout(**base_layout(
+        title="الجدول الزمني المتوقع",
+        xaxis=dict(type='date', title="التاريخ"),
+        yaxis=dict(title="", categoryorder='array', categoryarray=tasks[::-1], showticklabels=show_labels),
+        height=height,
+        barmode='overlay',
+        bargap=0.2 if show_labels else 0.05
+    ))
+    return fig.to_dict()
@@ -3,9 +3,101 @@
 يحتوي على الثوابت والإعدادات المشتركة
 """
 
+import os
+
+# مجلد البيانات المحلية (صندوق الإرسال وغيره)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
 # إعدادات الاتصال بـ n8n
 N8N_WEBHOOK_URL = "https://your-n8n-instance.com/webhook/egisf-gate-check"
 # يمكن تعديل الرابط بعد إنشاء Webhook في n8n
+N8N_HEALTH_URL = "https://your-n8n-instance.com/healthz"
+
+# إعدادات عميل HTTP لـ n8n
+N8N_CLIENT = {
+    'connect_timeout': 3.05,   # مهلة فتح الاتصال (ثوانٍ)
+    'read_timeout': 10,        # مهلة انتظار الرد (ثوانٍ)
+    'max_retries': 2,          # عدد إعادة المحاولات
+    'backoff_base': 0.25,      # أساس التأخير الأسي (ثوانٍ)
+    'backoff_max': 4.0,        # أقصى تأخير بين المحاولات (ثوانٍ)
+    'retry_statuses': [429, 502, 503, 504],
+    'pool_maxsize': 10,        # الحد الأقصى للاتصالات المحفوظة
+    'compress_level': 6        # مستوى ضغط gzip لطلبات الدفعات
+}
+
+# صندوق الإرسال الدائم (كل قرار يُحفظ محلياً قبل إرساله)
+N8N_OUTBOX = {
+    'path': os.path.join(DATA_DIR, 'n8n_outbox.db'),
+    'grace_period': 30,        # مهلة المحاولة الأولى قبل أن يتولاها المُفرِّغ (ثوانٍ)
+    'flush_interval': 5,       # الفاصل بين دورات التفريغ (ثوانٍ)
+    'batch_size': 50,          # الحد الأقصى للحمولات في كل دورة
+    'backoff_max': 300,        # أقصى تأخير لإعادة المحاولة (ثوانٍ)
+    'retention': 7 * 24 * 3600 # مدة الاحتفاظ بالحمولات المسلمة قبل حذفها (ثوانٍ)
+}
+
+# الإرسال الخلفي إلى n8n (حتى لا تنتظر الصفحة استجابة الشبكة)
+N8N_DISPATCH = {
+    'max_queue': 100,      # الحد الأقصى للطلبات المنتظرة
+    'workers': 2,          # عدد خيوط الإرسال
+    'wait_timeout': 15,    # بعدها تعرض الصفحة أن الرد سيصل لاحقاً (ثوانٍ)
+    'poll_interval': 1     # الفاصل بين فحوص وصول الاستجابة في الصفحة (ثوانٍ)
+}
+
+# قاطع الدائرة (رفض فوري عندما يكون محرك القرارات متوقفاً)
+N8N_CIRCUIT = {
+    'failure_threshold': 3,    # إخفاقات متتالية قبل فتح القاطع
+    'reset_timeout': 30,       # مدة الفتح قبل فحص الصحة (ثوانٍ)
+    'half_open_max_calls': 1   # الطلبات التجريبية بعد نجاح الفحص
+}
+
+# ذاكرة استجابات n8n للحمولات المتطابقة (إعادة التشغيل والنقر المزدوج)
+N8N_RESPONSE_CACHE = {
+    'max_entries': 256,        # الحد الأقصى للاستجابات المحفوظة
+    'ttl': 300                 # عمر الاستجابة المحفوظة (ثوانٍ)
+}
+
+# مستقبل القرارات الراجعة من n8n (خادم HTTP داخل التطبيق)
+CALLBACK_RECEIVER = {
+    'enabled': True,
+    'host': '127.0.0.1',
+    'port': 8765,
+    'path': '/webhook/egisf-decision',
+    'token': os.environ.get('EGISF_CALLBACK_TOKEN'),  # يُطلب في ترويسة X-EGISF-Token إن وُجد
+    'max_body': 1_000_000,     # الحد الأقصى لحجم الطلب (بايت)
+    'store_path': os.path.join(DATA_DIR, 'decisions.db'),
+    'refresh_interval': 3      # فحص الصفحات لوصول قرارات جديدة (ثوانٍ)
+}
+
+# تجميع نتائج البوابات في دفعات (التحليل الجماعي وتفريغ صندوق الإرسال)
+N8N_BATCH = {
+    'max_items': 500,          # الحد الأقصى للنتائج في الدفعة
+    'max_bytes': 1_000_000,    # الحد الأقصى لحجم الدفعة قبل الضغط (بايت)
+    'max_delay': 2.0           # أقصى انتظار قبل إرسال دفعة غير ممتلئة (ثوانٍ)
+}
+
+# الرسوم البيانية (قالب التنسيق المشترك وذاكرة الرسوم المبنية)
+CHARTS = {
+    'font_family': 'Tajawal',
+    'font_size': 14,
+    'cache_entries': 256       # الحد الأقصى للرسوم المحفوظة
+}
+
+# مستودع المشاريع (يُملأ بمحفظة تجريبية عند أول تشغيل)
+PROJECT_STORE = {
+    'path': os.path.join(DATA_DIR, 'projects.db'),
+    'demo_projects': 837       # عدد مشاريع المحفظة التجريبية
+}
+
+# لقطة المحفظة العمودية (Arrow IPC) التي يقرأها تقرير الأداء الحي
+PORTFOLIO_SNAPSHOT = {
+    'path': os.path.join(DATA_DIR, 'portfolio.arrow'),
+    'max_age': 300             # إعادة النشر من مستودع المشاريع بعد هذه المدة (ثوانٍ)
+}
+
+# قائمة القرارات المعلقة في مركز القرارات
+PENDING_DECISIONS = {
+    'page_sizes': [10, 25, 50]    # أحجام الصفحة المتاحة (الأول هو الافتراضي)
+}
 
 # الألوان السيادية
 COLORS = {
@@ -21,11 +113,121 @@ COLORS = {
 
 # حدود القبول في البوابات
 GATE_THRESHOLDS = {
+    'gate_1': {
+        'min_strategic_alignment': 50,  # الحد الأدنى للمواءمة الاستراتيجية (%)
+        'max_project_cost': 1000        # سقف التكلفة (مليون دولار)
+    },
     'gate_2': {
         'max_risk': 60,        # الحد الأقصى للمخاطر (%)
         'min_sustainability': 40,  # الحد الأدنى للاستدامة (%)
         'min_npv': 0,          # الحد الأدنى لـ NPV (يجب أن يكون موجباً)
         'min_sfm_score': 60    # الحد الأدنى لدرجة SFM
+    },
+    'gate_3': {
+        'min_bim_lod': 300,             # الحد الأدنى لمستوى تفصيل نموذج BIM
+        'min_gis_readiness': 60         # الحد الأدنى لجاهزية تحليل GIS (%)
+    },
+    'gate_4': {
+        'min_funding_secured': 80,      # الحد الأدنى للتمويل المؤمَّن (%)
+        'min_procurement_readiness': 60 # الحد الأدنى لجاهزية وثائق المناقصة (%)
+    },
+    'gate_5': {
+        'max_schedule_variance': 10,    # الحد الأقصى للانحراف الزمني (%)
+        'max_cost_variance': 10         # الحد الأقصى لتجاوز الميزانية (%)
+    },
+    'gate_6': {
+        'min_handover_readiness': 70,   # الحد الأدنى لجاهزية التسليم (%)
+        'min_quality_score': 70         # الحد الأدنى لدرجة الجودة (%)
+    },
+    'gate_7': {
+        'min_benefits_realization': 60  # الحد الأدنى لتحقق المنافع المستهدفة (%)
+    }
+}
+
+# قواعد البوابات السبع بصيغة تصريحية
+# كل قاعدة: الحقل المفحوص، المعامل، مفتاح الحد في GATE_THRESHOLDS،
+# الشدة (hard توقف المسار / soft للتنبيه فقط)، ونص الرسالة
+GATE_RULES = {
+    'gate_1': {
+        'title': 'البوابة الأولى: المواءمة الاستراتيجية',
+        'rules': [
+            {'field': 'strategic_alignment', 'op': '>=', 'threshold': 'min_strategic_alignment',
+             'severity': 'hard', 'message': '🎯 المواءمة الاستراتيجية ({value}%) أقل من الحد الأدنى ({threshold}%)'},
+            {'field': 'project_cost', 'op': '<=', 'threshold': 'max_project_cost',
+             'severity': 'soft', 'message': '💵 التكلفة ({value} مليون) تتجاوز سقف الاعتماد المباشر ({threshold} مليون)'}
+        ]
+    },
+    'gate_2': {
+        'title': 'البوابة الثانية: الجدوى الشاملة',
+        'rules': [
+            {'field': 'risk_score', 'op': '<=', 'threshold': 'max_risk',
+             'severity': 'hard', 'message': '⚠️ درجة المخاطر ({value}%) تتجاوز الحد المسموح ({threshold}%)'},
+            {'field': 'sustainability_score', 'op': '>=', 'threshold': 'min_sustainability',
+             'severity': 'hard', 'message': '🌱 درجة الاستدامة ({value}%) أقل من الحد الأدنى ({threshold}%)'},
+            {'field': 'npv', 'op': '>=', 'threshold': 'min_npv',
+             'severity': 'hard', 'message': '💰 صافي القيمة الحالية ({value} مليون) سالب أو صفر'},
+            {'field': 'sfm_score', 'op': '>=', 'threshold': 'min_sfm_score',
+             'severity': 'hard', 'message': '📊 درجة الجدوى الشاملة ({value}) أقل من الحد الأدنى ({threshold})'}
+        ]
+    },
+    'gate_3': {
+        'title': 'البوابة الثالثة: التصميم المعتمد',
+        'rules': [
+            {'field': 'bim_lod', 'op': '>=', 'threshold': 'min_bim_lod',
+             'severity': 'hard', 'message': '🏗️ مستوى نموذج BIM (LOD {value}) أقل من المطلوب (LOD {threshold})'},
+            {'field': 'gis_readiness', 'op': '>=', 'threshold': 'min_gis_readiness',
+             'severity': 'soft', 'message': '🗺️ جاهزية تحليل GIS ({value}%) أقل من الحد الأدنى ({threshold}%)'}
+        ]
+    },
+    'gate_4': {
+        'title': 'البوابة الرابعة: التمويل والطرح',
+        'rules': [
+            {'field': 'funding_secured', 'op': '>=', 'threshold': 'min_funding_secured',
+             'severity': 'hard', 'message': '🏦 التمويل المؤمَّن ({value}%) أقل من الحد الأدنى ({threshold}%)'},
+            {'field': 'procurement_readiness', 'op': '>=', 'threshold': 'min_procurement_readiness',
+             'severity': 'soft', 'message': '📑 جاهزية وثائق المناقصة ({value}%) أقل من الحد الأدنى ({threshold}%)'}
+        ]
+    },
+    'gate_5': {
+        'title': 'البوابة الخامسة: التنفيذ',
+        'rules': [
+            {'field': 'schedule_variance', 'op': '<=', 'threshold': 'max_schedule_variance',
+             'severity': 'soft', 'message': '⏱️ الانحراف الزمني ({value}%) يتجاوز الحد المسموح ({threshold}%)'},
+            {'field': 'cost_variance', 'op': '<=', 'threshold': 'max_cost_variance',
+             'severity': 'hard', 'message': '📉 تجاوز الميزانية ({value}%) يتجاوز الحد المسموح ({threshold}%)'}
+        ]
+    },
+    'gate_6': {
+        'title': 'البوابة السادسة: التسليم والتشغيل',
+        'rules': [
+            {'field': 'handover_readiness', 'op': '>=', 'threshold': 'min_handover_readiness',
+             'severity': 'hard', 'message': '🔑 جاهزية التسليم ({value}%) أقل من الحد الأدنى ({threshold}%)'},
+            {'field': 'quality_score', 'op': '>=', 'threshold': 'min_quality_score',
+             'severity': 'hard', 'message': '✔️ درجة الجودة ({value}%) أقل من الحد الأدنى ({threshold}%)'}
+        ]
+    },
+    'gate_7': {
+        'title': 'البوابة السابعة: تحقيق القيمة',
+        'rules': [
+            {'field': 'benefits_realization', 'op': '>=', 'threshold': 'min_benefits_realization',
+             'severity': 'soft', 'message': '💎 تحقق المنافع ({value}%) أقل من المستهدف ({threshold}%)'}
+        ]
+    }
+}
+
+# استثناءات الحدود حسب القطاع (تُطبق فوق GATE_THRESHOLDS)
+GATE_SECTOR_OVERRIDES = {
+    'الصحة': {
+        'gate_2': {'max_risk': 65, 'min_npv': -5}   # مشاريع خدمية بعائد مالي محدود
+    },
+    'التعليم': {
+        'gate_2': {'min_npv': -5}
+    },
+    'الطاقة': {
+        'gate_2': {'min_sustainability': 55}
+    },
+    'البنية التحتية': {
+        'gate_1': {'max_project_cost': 2000}
     }
 }
 
@@ -36,6 +238,16 @@ SFM_WEIGHTS = {
     'environmental': 0.30
 }
 
+# تكلفة تغيير وحدة واحدة في كل محور عند البحث عن أقل تغيير للاجتياز
+COUNTERFACTUAL_COSTS = {
+    'economic': 1.0,        # لكل نقطة
+    'social': 1.0,
+    'environmental': 1.0,
+    'risk': 1.5,            # خفض المخاطر أصعب عادة من رفع الدرجات
+    'sustainability': 1.0,
+    'npv': 2.0              # لكل مليون دولار
+}
+
 # معلومات التطبيق
 APP_INFO = {
     'title': 'EGISF',
@@ -0,0 +1,182 @@
+"""
+محرك التقييم المالي
+حساب NPV و IRR وفترة الاسترداد لآلاف المشاريع دفعة واحدة من جداول التدفقات النقدية
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# نطاق البحث عن IRR
+IRR_LOWER_BOUND = -0.99
+IRR_UPPER_BOUND = 10.0
+
+# شبكة المسح لإيجاد فترة تغير إشارة NPV لكل مشروع: كثيفة حول المعدلات
+# المعتادة (خطوة 1%) ومتباعدة حتى الحد الأعلى
+IRR_GRID = np.concatenate([
+    np.linspace(IRR_LOWER_BOUND, 1.0, 200),
+    np.geomspace(1.0, IRR_UPPER_BOUND, 41)[1:]
+])
+
+# عدد المشاريع في كل دفعة من مسح الشبكة (يحد ذاكرة مصفوفة N × الشبكة)
+_IRR_SCAN_CHUNK = 4096
+
+
+def _as_cash_flow_matrix(cash_flows) -> np.ndarray:
+    """تحويل التدفقات إلى مصفوفة (N×T)؛ العمود 0 هو الفترة الحالية (الاستثمار الأولي)"""
+    return np.atleast_2d(np.asarray(cash_flows, dtype=float))
+
+
+def discount_factors(rates, n_projects: int, n_periods: int) -> np.ndarray:
+    """
+    معاملات الخصم لكل مشروع وفترة من منحنى معدلات الخصم
+
+    Args:
+        rates: معدل ثابت، أو عمود (N×1) لكل مشروع، أو منحنى (T-1) مشترك،
+            أو مصفوفة (N × T-1) لكل مشروع؛ المعدل k يُطبق على الفترة k+1
+        n_projects: عدد المشاريع N
+        n_periods: عدد الفترات T (شاملة الفترة 0)
+
+    Returns:
+        np.ndarray: معاملات الخصم (N×T) حيث العمود 0 يساوي 1
+    """
+    rates = np.broadcast_to(np.asarray(rates, dtype=float), (n_projects, max(n_periods - 1, 0)))
+    factors = np.ones((n_projects, n_periods))
+    np.cumprod(1.0 / (1.0 + rates), axis=1, out=factors[:, 1:])
+    return factors
+
+
+def npv_batch(cash_flows, rates) -> np.ndarray:
+    """
+    صافي القيمة الحالية لكل مشروع
+
+    Args:
+        cash_flows: التدفقات النقدية (N×T) بالملايين
+        rates: معدلات الخصم (انظر discount_factors)
+
+    Returns:
+        np.ndarray: NPV لكل مشروع (N)
+    """
+    flows = _as_cash_flow_matrix(cash_flows)
+    return np.einsum('nt,nt->n', flows, discount_factors(rates, *flows.shape))
+
+
+def _npv_at(flows: np.ndarray, periods: np.ndarray, rate: np.ndarray) -> np.ndarray:
+    """NPV بمعدل ثابت لكل مشروع (يُستخدم في البحث عن IRR)"""
+    return np.einsum('nt,nt->n', flows, (1.0 + rate[:, None]) ** -periods)
+
+
+def _irr_brackets(flows: np.ndarray) -> np.ndarray:
+    """
+    فترة تغير إشارة NPV لكل مشروع بمسح IRR_GRID
+
+    عندما يتغير إشارة NPV أكثر من مرة (تدفقات غير تقليدية لها أكثر من IRR)
+    تُختار الفترة الأقرب إلى معدل صفر.
+
+    Returns:
+        np.ndarray: فهرس بداية الفترة في IRR_GRID لكل مشروع (-1 إذا لم يتغير الإشارة)
+    """
+    periods = np.arange(flows.shape[1], dtype=float)[:, None]
+    grid_factors = (1.0 + IRR_GRID[None, :]) ** -periods          # (T × G)
+    distance = np.abs(IRR_GRID[:-1] + IRR_GRID[1:]) / 2
+
+    brackets = np.empty(flows.shape[0], dtype=int)
+    for start in range(0, flows.shape[0], _IRR_SCAN_CHUNK):
+        signs = np.sign(flows[start:start + _IRR_SCAN_CHUNK] @ grid_factors)
+        change = (signs[:, :-1] * signs[:, 1:] <= 0) & ((signs[:, :-1] != 0) | (signs[:, 1:] != 0))
+        best = np.where(change, distance, np.inf).argmin(axis=1)
+        brackets[start:start + _IRR_SCAN_CHUNK] = np.where(change.any(axis=1), best, -1)
+    return brackets
+
+
+def irr_batch(cash_flows, tol: float = 1e-7, max_iter: int = 100) -> np.ndarray:
+    """
+    معدل العائد الداخلي لكل المشاريع ببحث تنصيفي متوازٍ
+
+    تُحدد لكل مشروع فترة تغير إشارة NPV بمسح شبكة معدلات (فالتدفقات التي
+    تنتهي بتدفق سالب لها IRR أيضاً)، ثم يُنصَّف داخلها لكل المشاريع في
+    عملية مصفوفية واحدة لكل تكرار حتى تضيق كل الفترات عن tol.
+
+    Args:
+        cash_flows: التدفقات النقدية (N×T)
+        tol: دقة المعدل المطلوبة
+        max_iter: الحد الأقصى للتكرارات
+
+    Returns:
+        np.ndarray: IRR لكل مشروع (NaN إذا لم يتغير إشارة NPV داخل النطاق)
+    """
+    flows = _as_cash_flow_matrix(cash_flows)
+    periods = np.arange(flows.shape[1], dtype=float)[None, :]
+
+    brackets = _irr_brackets(flows)
+    bracketed = brackets >= 0
+    safe = np.where(bracketed, brackets, 0)
+    lower = IRR_GRID[safe]
+    upper = IRR_GRID[safe + 1]
+    npv_lower = _npv_at(flows, periods, lower)
+
+    for _ in range(max_iter):
+        if np.all(upper - lower < tol):
+            break
+        middle = (lower + upper) / 2
+        npv_middle = _npv_at(flows, periods, middle)
+        same_side = np.sign(npv_middle) == np.sign(npv_lower)
+        lower = np.where(same_side, middle, lower)
+        npv_lower = np.where(same_side, npv_middle, npv_lower)
+        upper = np.where(same_side, upper, middle)
+
+    return np.where(bracketed, (lower + upper) / 2, np.nan)
+
+
+def payback_period_batch(cash_flows, rates=None) -> np.ndarray:
+    """
+    فترة الاسترداد (بالفترات، مع استيفاء خطي داخل الفترة)
+
+    Args:
+        cash_flows: التدفقات النقدية (N×T)
+        rates: معدلات الخصم لفترة الاسترداد المخصومة (اختياري)
+
+    Returns:
+        np.ndarray: فترة الاسترداد لكل مشروع (NaN إذا لم يُسترد الاستثمار أو كان
+            الجدول فارغاً، و0 إذا لم يكن هناك استثمار أولي سالب)
+    """
+    flows = _as_cash_flow_matrix(cash_flows)
+    if rates is not None:
+        flows = flows * discount_factors(rates, *flows.shape)
+    cumulative = np.cumsum(flows, axis=1)
+
+    recovered = cumulative >= 0
+    if flows.shape[1] < 2:
+        # لا فترة تالية للاستيفاء: إما مسترد من البداية أو غير مسترد
+        return np.where(recovered.any(axis=1), 0.0, np.nan)
+    
+    # أول فترة يصبح فيها التراكم موجباً بعد أن كان سالباً
+    first = np.where(recovered.any(axis=1), recovered.argmax(axis=1), -1)
+    rows = np.arange(flows.shape[0])
+    safe = np.maximum(first, 1)
+    fraction = -cumulative[rows, safe - 1] / np.where(flows[rows, safe] == 0, np.nan, flows[rows, safe])
+    payback = np.where(first > 0, safe - 1 + fraction, np.where(first == 0, 0.0, np.nan))
+    return payback
+
+
+def evaluate_cash_flows(cash_flows, rates, index: Optional[pd.Index] = None) -> pd.DataFrame:
+    """
+    تقييم مالي كامل للمحفظة
+
+    عمود npv جاهز للتمرير مباشرة إلى check_gate_2_dataframe / check_gate_2_batch.
+
+    Args:
+        cash_flows: التدفقات النقدية (N×T) بالملايين
+        rates: معدلات الخصم (انظر discount_factors)
+        index: فهرس المشاريع (اختياري)
+
+    Returns:
+        pd.DataFrame: الأعمدة npv, irr, payback_period
+    """
+    flows = _as_cash_flow_matrix(cash_flows)
+    return pd.DataFrame({
+        'npv': npv_batch(flows, rates),
+        'irr': irr_batch(flows),
+        'payback_period': payback_period_batch(flows)
+    }, index=index)
@@ -0,0 +1,335 @@
+"""
+تحليلات البوابة الثانية
+محاكاة عدم اليقين (Monte Carlo)، سطح منطقة الاجتياز المحسوب مسبقاً،
+وحساب أقل تغيير مطلوب للاجتياز، فوق الفحص الدفعي للبوابة
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from gate_rules import SECTOR_FIELD, gate_thresholds
+from utils import (
+    SFM_AXES,
+    GATE_2_VIOLATION_RISK,
+    GATE_2_VIOLATION_SUSTAINABILITY,
+    GATE_2_VIOLATION_NPV,
+    GATE_2_VIOLATION_SFM,
+    calculate_sfm_scores,
+    check_gate_2_batch,
+    sfm_weight_matrix
+)
+
+# أسماء الانتهاكات للعرض
+GATE_2_VIOLATION_LABELS = {
+    GATE_2_VIOLATION_RISK: 'المخاطر',
+    GATE_2_VIOLATION_SUSTAINABILITY: 'الاستدامة',
+    GATE_2_VIOLATION_NPV: 'صافي القيمة الحالية',
+    GATE_2_VIOLATION_SFM: 'درجة SFM'
+}
+
+
+def simulate_gate_2(
+    economic: float,
+    social: float,
+    environmental: float,
+    risk_score: float,
+    sustainability_score: float,
+    npv: float,
+    score_std: float = 5.0,
+    npv_std: Optional[float] = None,
+    n_samples: int = 200_000,
+    seed: Optional[int] = None,
+    thresholds: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    محاكاة Monte Carlo لاجتياز البوابة الثانية
+
+    كل درجة تُعامل كتوزيع طبيعي حول القيمة المدخلة (مقصوص على 0-100)،
+    وكذلك NPV، ثم تُمرر العينات كلها دفعة واحدة عبر calculate_sfm_scores
+    و check_gate_2_batch.
+
+    Args:
+        economic: الدرجة الاقتصادية (0-100)
+        social: الدرجة الاجتماعية (0-100)
+        environmental: الدرجة البيئية (0-100)
+        risk_score: درجة المخاطر (0-100)
+        sustainability_score: درجة الاستدامة (0-100)
+        npv: صافي القيمة الحالية (بالملايين)
+        score_std: الانحراف المعياري للدرجات (نقاط)
+        npv_std: الانحراف المعياري لـ NPV (افتراضياً 20% من قيمته، وبحد أدنى 1)
+        n_samples: عدد العينات
+        seed: بذرة المولد العشوائي (لإعادة النتائج)
+        thresholds: حدود البوابة (افتراضياً من config)
+
+    Returns:
+        Dict: احتمال النجاح، نسبة كل انتهاك، والانتهاك الأكثر تسبباً في الفشل
+    """
+    if npv_std is None:
+        npv_std = max(abs(npv) * 0.2, 1.0)
+    rng = np.random.default_rng(seed)
+
+    # عينات الدرجات الخمس في مصفوفة واحدة (5×N)
+    centers = np.array([economic, social, environmental, risk_score, sustainability_score], dtype=float)
+    scores = rng.normal(centers[:, None], score_std, size=(5, n_samples))
+    np.clip(scores, 0, 100, out=scores)
+    npvs = rng.normal(npv, npv_std, size=n_samples)
+
+    sfm_scores = calculate_sfm_scores(scores[0], scores[1], scores[2])[:, 0]
+    passed, violation_mask = check_gate_2_batch(
+        scores[3], scores[4], npvs, sfm_scores, thresholds
+    )
+
+    failed = ~passed
+    n_failed = int(failed.sum())
+    violation_rates = {}
+    failure_shares = {}
+    for flag, label in GATE_2_VIOLATION_LABELS.items():
+        hits = (violation_mask & flag) != 0
+        violation_rates[label] = float(hits.mean())
+        failure_shares[label] = float(hits.sum() / n_failed) if n_failed else 0.0
+
+    dominant = max(failure_shares, key=failure_shares.get) if n_failed else None
+
+    return {
+        'n_samples': n_samples,
+        'pass_probability': float(passed.mean()),
+        'violation_rates': violation_rates,     # نسبة العينات التي تخرق كل شرط
+        'failure_shares': failure_shares,       # نسبة العينات الفاشلة التي يظهر فيها كل شرط
+        'dominant_violation': dominant,
+        'sfm_mean': float(sfm_scores.mean()),
+        'sfm_p05': float(np.percentile(sfm_scores, 5)),
+        'sfm_p95': float(np.percentile(sfm_scores, 95))
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# سطح منطقة الاجتياز
+# ═══════════════════════════════════════════════════════════════
+
+# عدد نقاط الشبكة لكل محور (الدرجات الصحيحة 0-100)
+GRID_SIZE = 101
+
+
+@dataclass(frozen=True)
+class PassSurface:
+    """
+    منطقة اجتياز البوابة الثانية على الشبكة المنفصلة 0-100
+
+    شروط المخاطر والاستدامة وNPV مستقلة (حد واحد لكل منها)، أما شرط SFM
+    فيعتمد على المحاور الثلاثة معاً؛ لذا تُخزن منطقة SFM كمكعب 101³ مضغوط
+    بالبتات (~128KB) بدلاً من شبكة المحاور الخمسة كاملة، مع أسطح الحدود
+    لكل محور لحساب المسافة إلى الاجتياز فوراً.
+    """
+    sfm_bits: np.ndarray            # مكعب (اقتصادي، اجتماعي، بيئي) مضغوط بالبتات
+    min_economic: np.ndarray        # [اجتماعي، بيئي] ← أقل درجة اقتصادية ناجحة (-1 = غير ممكن)
+    min_social: np.ndarray          # [اقتصادي، بيئي] ← أقل درجة اجتماعية ناجحة
+    min_environmental: np.ndarray   # [اقتصادي، اجتماعي] ← أقل درجة بيئية ناجحة
+    thresholds: Dict[str, float]
+
+    def sfm_passes(self, economic: int, social: int, environmental: int) -> bool:
+        """هل تحقق الدرجات الثلاث حد SFM؟"""
+        index = (int(economic) * GRID_SIZE + int(social)) * GRID_SIZE + int(environmental)
+        return bool((self.sfm_bits[index >> 3] >> (7 - (index & 7))) & 1)
+
+    def passes(self, economic: int, social: int, environmental: int,
+               risk_score: int, sustainability_score: int, npv: float) -> bool:
+        """هل يجتاز المشروع البوابة الثانية؟ (بحث في الجدول دون إعادة حساب)"""
+        return (
+            risk_score <= self.thresholds['max_risk']
+            and sustainability_score >= self.thresholds['min_sustainability']
+            and npv >= self.thresholds['min_npv']
+            and self.sfm_passes(economic, social, environmental)
+        )
+
+    def distance_to_pass(self, economic: int, social: int, environmental: int,
+                         risk_score: int, sustainability_score: int,
+                         npv: float) -> Dict[str, Optional[float]]:
+        """
+        أقل تغيير في كل محور بمفرده (مع تثبيت البقية) ليتحقق شرطه
+
+        Returns:
+            Dict: التغيير المطلوب لكل محور (موجب = زيادة، سالب = خفض، 0 = مستوفٍ،
+                None = غير ممكن بهذا المحور وحده)
+        """
+        def axis_distance(current, minimum):
+            if self.sfm_passes(economic, social, environmental):
+                return 0
+            return None if minimum < 0 else int(minimum) - int(current)
+
+        return {
+            'economic': axis_distance(economic, self.min_economic[social, environmental]),
+            'social': axis_distance(social, self.min_social[economic, environmental]),
+            'environmental': axis_distance(environmental, self.min_environmental[economic, social]),
+            'risk': min(0, self.thresholds['max_risk'] - risk_score),
+            'sustainability': max(0, self.thresholds['min_sustainability'] - sustainability_score),
+            'npv': max(0.0, self.thresholds['min_npv'] - npv)
+        }
+
+
+_surface_cache: Dict[str, PassSurface] = {}
+
+
+def _first_true(mask: np.ndarray, axis: int) -> np.ndarray:
+    """فهرس أول قيمة صحيحة على محور (-1 إذا لم توجد)"""
+    return np.where(mask.any(axis=axis), mask.argmax(axis=axis), -1)
+
+
+def get_pass_surface(thresholds: Optional[Dict[str, float]] = None) -> PassSurface:
+    """
+    سطح منطقة الاجتياز لحدود البوابة الثانية
+
+    يُخزن سطح لكل مجموعة حدود (أي لكل قطاع له استثناءات) ويُعاد استخدامه
+    حتى تتغير الحدود أو SFM_WEIGHTS.
+
+    Args:
+        thresholds: حدود البوابة بعد استثناءات القطاع
+            (gate_rules.gate_thresholds؛ افتراضياً الحدود العامة من config)
+
+    Returns:
+        PassSurface: السطح المحسوب مسبقاً
+    """
+    thresholds = dict(config.GATE_THRESHOLDS['gate_2'] if thresholds is None else thresholds)
+    fingerprint = json.dumps([thresholds, config.SFM_WEIGHTS], sort_keys=True)
+    cached = _surface_cache.get(fingerprint)
+    if cached is not None:
+        return cached
+
+    axis = np.arange(GRID_SIZE)
+    economic, social, environmental = (
+        grid.ravel() for grid in np.meshgrid(axis, axis, axis, indexing='ij')
+    )
+    sfm_scores = calculate_sfm_scores(economic, social, environmental)[:, 0]
+    sfm_pass = (sfm_scores >= thresholds['min_sfm_score']).reshape((GRID_SIZE,) * 3)
+
+    surface = PassSurface(
+        sfm_bits=np.packbits(sfm_pass.ravel()),
+        min_economic=_first_true(sfm_pass, axis=0),
+        min_social=_first_true(sfm_pass, axis=1),
+        min_environmental=_first_true(sfm_pass, axis=2),
+        thresholds=thresholds
+    )
+
+    # سطح لكل قطاع؛ تغير الأوزان يبطل كل الأسطح
+    if any(json.loads(key)[1] != config.SFM_WEIGHTS for key in _surface_cache):
+        _surface_cache.clear()
+    _surface_cache[fingerprint] = surface
+    return surface
+
+
+# ═══════════════════════════════════════════════════════════════
+# أقل تغيير مطلوب للاجتياز
+# ═══════════════════════════════════════════════════════════════
+
+def minimum_change_to_pass(
+    projects: pd.DataFrame,
+    costs: Optional[Dict[str, float]] = None,
+    thresholds: Optional[Dict[str, float]] = None
+) -> pd.DataFrame:
+    """
+    أقل تغيير موزون يحول مشروعاً مرفوضاً في البوابة الثانية إلى ناجح
+
+    شروط المخاطر والاستدامة وNPV مستقلة فتغييرها المطلوب محدد مباشرة.
+    شرط SFM خطي في المحاور الثلاثة: سد الفجوة بأقل تكلفة هو مسألة حقيبة
+    كسرية حلها مغلق (نملأ المحاور بترتيب التكلفة/الوزن حتى حد 100)،
+    وتُحسب لكل المشاريع دفعة واحدة.
+
+    Args:
+        projects: جدول بالأعمدة economic_score, social_score, environmental_score,
+            risk_score, sustainability_score, npv
+        costs: تكلفة تغيير الوحدة لكل محور (افتراضياً config.COUNTERFACTUAL_COSTS)
+        thresholds: حدود البوابة (افتراضياً من config)
+
+    Returns:
+        pd.DataFrame: أعمدة delta_* لكل محور، total_cost، وfeasible، بنفس فهرس المدخلات
+    """
+    if costs is None:
+        costs = config.COUNTERFACTUAL_COSTS
+    if thresholds is None:
+        thresholds = config.GATE_THRESHOLDS['gate_2']
+
+    scores = projects[[f'{axis}_score' for axis in SFM_AXES]].to_numpy(dtype=float)
+    risk = projects['risk_score'].to_numpy(dtype=float)
+    sustainability = projects['sustainability_score'].to_numpy(dtype=float)
+    npv = projects['npv'].to_numpy(dtype=float)
+
+    weights = sfm_weight_matrix()[0]
+    axis_costs = np.array([costs[axis] for axis in SFM_AXES], dtype=float)
+
+    # فجوة SFM ثم ملء المحاور بترتيب التكلفة لكل نقطة SFM
+    gap = np.maximum(thresholds['min_sfm_score'] - scores @ weights, 0.0)
+    deltas = np.zeros_like(scores)
+    cost_per_point = np.divide(axis_costs, weights, out=np.full(len(weights), np.inf), where=weights > 0)
+    for j in np.argsort(cost_per_point):
+        if not np.isfinite(cost_per_point[j]):
+            continue
+        step = np.minimum(100 - scores[:, j], gap / weights[j])
+        deltas[:, j] = step
+        gap = np.maximum(gap - step * weights[j], 0.0)
+    sfm_feasible = gap <= 1e-9
+
+    result = pd.DataFrame(
+        {f'delta_{axis}': deltas[:, j] for j, axis in enumerate(SFM_AXES)},
+        index=projects.index
+    )
+    result['delta_risk'] = np.minimum(thresholds['max_risk'] - risk, 0.0)
+    result['delta_sustainability'] = np.maximum(thresholds['min_sustainability'] - sustainability, 0.0)
+    result['delta_npv'] = np.maximum(thresholds['min_npv'] - npv, 0.0)
+    result['total_cost'] = (
+        deltas @ axis_costs
+        + np.abs(result['delta_risk'].to_numpy()) * costs['risk']
+        + result['delta_sustainability'].to_numpy() * costs['sustainability']
+        + result['delta_npv'].to_numpy() * costs['npv']
+    )
+    result['feasible'] = sfm_feasible
+    result.loc[~sfm_feasible, 'total_cost'] = np.inf
+    return result
+
+
+def whole_step_changes(changes: pd.DataFrame) -> pd.DataFrame:
+    """
+    تقريب أقل تغيير للاجتياز إلى خطوات صحيحة (الشرائح و NPV بوحدات كاملة)
+
+    الزيادات تُقرب للأعلى وخفض المخاطر للأسفل، فيبقى المشروع ناجحاً بعد
+    التقريب (التقريب العادي قد يُنقص التغيير عن المطلوب).
+
+    Args:
+        changes: نتيجة minimum_change_to_pass
+
+    Returns:
+        pd.DataFrame: نفس الجدول بأعمدة delta_* صحيحة
+    """
+    result = changes.copy()
+    # إزالة أخطاء الفاصلة العائمة قبل التقريب (3.0000000001 لا تصبح 4)
+    for column in [f'delta_{axis}' for axis in SFM_AXES] + ['delta_sustainability', 'delta_npv']:
+        result[column] = np.ceil(result[column].round(6)).astype(int)
+    result['delta_risk'] = np.floor(result['delta_risk'].round(6)).astype(int)
+    return result
+
+
+def nearest_to_pass(projects: pd.DataFrame, n: int = 6,
+                    costs: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    المشاريع المرفوضة في البوابة الثانية الأقرب للاجتياز (أقل تكلفة تغيير)
+
+    كل مشروع يُقاس بحدود قطاعه (gate_thresholds)، والمشروع الناجح تكلفة
+    تغييره صفر فيُستبعد.
+
+    Args:
+        projects: جدول بأعمدة minimum_change_to_pass و project_sector
+        n: عدد المشاريع المطلوبة
+        costs: تكلفة تغيير الوحدة لكل محور (افتراضياً config.COUNTERFACTUAL_COSTS)
+
+    Returns:
+        pd.DataFrame: صفوف المشاريع مع أعمدة minimum_change_to_pass، الأرخص أولاً
+    """
+    changes = pd.concat([
+        minimum_change_to_pass(group, costs, gate_thresholds('gate_2', sector))
+        for sector, group in projects.groupby(SECTOR_FIELD, sort=False, observed=True)
+    ]) if len(projects) else minimum_change_to_pass(projects, costs)
+    rejected = changes[changes['total_cost'] > 0]
+    return projects.join(rejected, how='inner').sort_values('total_cost', kind='stable').head(n)
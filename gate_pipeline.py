@@ -0,0 +1,126 @@
+"""
+مسار البوابات السبع
+يمرر المشروع عبر البوابات بالترتيب ويتوقف عند أول فشل حاسم،
+مع تخزين نتيجة كل بوابة تحت بصمة المدخلات التي تقرؤها تلك البوابة فقط
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+import config
+from gate_rules import SECTOR_FIELD, compile_gate_rules, describe_violations, evaluate_gates, select_gates
+
+
+@dataclass(frozen=True)
+class StageResult:
+    """نتيجة بوابة واحدة"""
+    gate_id: str
+    title: str
+    passed: bool
+    hard_failed: bool
+    violations: List[str]
+    cached: bool = False
+
+
+@dataclass
+class PipelineResult:
+    """نتيجة المسار الكامل"""
+    stages: List[StageResult] = field(default_factory=list)
+    stopped_at: Optional[str] = None   # البوابة التي أوقفت المسار (فشل حاسم)
+
+    @property
+    def passed(self) -> bool:
+        """اجتاز المشروع كل البوابات المطلوبة دون فشل حاسم"""
+        return self.stopped_at is None and all(stage.passed for stage in self.stages)
+
+
+class GatePipeline:
+    """
+    مسار مرحلي للبوابات مع تخزين مؤقت لكل بوابة
+
+    مفتاح التخزين لكل بوابة يشمل تعريف قواعدها وحدودها المطبقة وقيم الحقول
+    التي تقرؤها فقط، لذا تعديل حقل في بوابة متأخرة (مثل bim_lod) لا يُبطل
+    نتائج البوابات السابقة.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, StageResult]" = OrderedDict()
+        self._compiled = None
+        self._stage_rules: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _stage_key(self, gate_id: str, rules: List[Dict[str, Any]],
+                   thresholds: np.ndarray, inputs: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            [gate_id, rules, thresholds.tolist(), inputs],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def run(self, project: Dict[str, Any], gates: Optional[List[str]] = None) -> PipelineResult:
+        """
+        تمرير مشروع عبر البوابات بالترتيب
+
+        Args:
+            project: بيانات المشروع (نفس مفاتيح project_data والحقول في GATE_RULES)
+            gates: البوابات المطلوبة (افتراضياً كل البوابات بترتيبها)
+
+        Returns:
+            PipelineResult: نتائج البوابات حتى أول فشل حاسم
+        """
+        compiled = compile_gate_rules()
+        if compiled is not self._compiled:
+            # قواعد كل بوابة على حدة، تُعاد ترجمتها فقط عند تغير الإعدادات
+            self._compiled = compiled
+            self._stage_rules = {gate_id: select_gates(compiled, [gate_id]) for gate_id in compiled.gate_ids}
+        sector_row = compiled.sector_index.get(project.get(SECTOR_FIELD), 0)
+
+        result = PipelineResult()
+        for gate_id in compiled.gate_ids:
+            if gates is not None and gate_id not in gates:
+                continue
+            stage_rules = self._stage_rules[gate_id]
+            inputs = {field: project.get(field) for field in stage_rules.fields}
+
+            key = self._stage_key(gate_id, stage_rules.rules, stage_rules.thresholds[sector_row], inputs)
+            stage = self._cache.get(key)
+            if stage is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                stage = replace(stage, cached=True)
+            else:
+                self.misses += 1
+                # تقييم قواعد هذه البوابة فقط؛ البوابات بعد أول فشل حاسم لا تُحسب
+                evaluation = evaluate_gates(inputs | {SECTOR_FIELD: project.get(SECTOR_FIELD)}, stage_rules)
+                stage = StageResult(
+                    gate_id=gate_id,
+                    title=config.GATE_RULES[gate_id]['title'],
+                    passed=bool(evaluation.gate_passed[0, 0]),
+                    hard_failed=bool(evaluation.hard_failed[0, 0]),
+                    violations=describe_violations(evaluation).get(gate_id, [])
+                )
+                self._cache[key] = stage
+                if len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+            result.stages.append(stage)
+            if stage.hard_failed:
+                result.stopped_at = gate_id
+                break
+
+        return result
+
+    def clear(self):
+        """مسح النتائج المخزنة"""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
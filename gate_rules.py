@@ -0,0 +1,302 @@
+"""
+محرك قواعد البوابات السبع
+يُترجم القواعد التصريحية في config.GATE_RULES إلى مصفوفات تُقيَّم دفعة واحدة،
+ويحتفظ بالنسخة المترجمة حتى تتغير الإعدادات
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# حقل القطاع في بيانات المشروع (نفس مفتاح project_data في محاكي البوابات)
+SECTOR_FIELD = 'project_sector'
+
+# إشارة كل معامل: النجاح عندما (القيمة - الحد) × الإشارة موجب (أو صفر لغير الصارم)
+_OPERATORS = {
+    '>=': (1.0, False),
+    '>': (1.0, True),
+    '<=': (-1.0, False),
+    '<': (-1.0, True),
+}
+
+
+@dataclass(frozen=True)
+class CompiledGateRules:
+    """القواعد بعد الترجمة إلى مصفوفات (R = عدد القواعد، G = عدد البوابات)"""
+    gate_ids: List[str]
+    rules: List[Dict[str, Any]]       # القواعد بالترتيب مع مفتاح 'gate'
+    fields: List[str]                 # الحقول الفريدة المطلوبة
+    rule_field_index: np.ndarray      # (R) فهرس حقل كل قاعدة داخل fields
+    gate_starts: np.ndarray           # (G) بداية قواعد كل بوابة
+    rule_gate_index: np.ndarray       # (R) فهرس بوابة كل قاعدة
+    signs: np.ndarray                 # (R) إشارة المقارنة
+    strict: np.ndarray                # (R) مقارنة صارمة؟
+    hard: np.ndarray                  # (R) قاعدة حاسمة؟
+    sector_index: Dict[str, int]      # القطاع ← صف في thresholds (الصف 0 = الافتراضي)
+    thresholds: np.ndarray            # (S+1 × R) الحدود لكل قطاع
+
+
+@dataclass(frozen=True)
+class GateEvaluation:
+    """نتيجة تقييم N مشروع عبر البوابات"""
+    compiled: CompiledGateRules
+    values: np.ndarray        # (N × R) قيمة الحقل لكل قاعدة
+    thresholds: np.ndarray    # (N × R) الحد المطبق بعد استثناءات القطاع
+    rule_passed: np.ndarray   # (N × R)
+    gate_passed: np.ndarray   # (N × G)
+    hard_failed: np.ndarray   # (N × G) فشل في قاعدة حاسمة
+
+    @property
+    def first_hard_failure(self) -> np.ndarray:
+        """فهرس أول بوابة فشل حاسم لكل مشروع (-1 إذا لم يفشل)"""
+        return np.where(
+            self.hard_failed.any(axis=1),
+            self.hard_failed.argmax(axis=1),
+            -1
+        )
+
+
+_compiled_cache: Dict[str, CompiledGateRules] = {}
+
+
+def _config_fingerprint() -> str:
+    """بصمة الإعدادات التي تعتمد عليها الترجمة"""
+    return json.dumps(
+        [config.GATE_RULES, config.GATE_THRESHOLDS, config.GATE_SECTOR_OVERRIDES],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+
+
+def compile_gate_rules() -> CompiledGateRules:
+    """
+    ترجمة قواعد البوابات إلى مصفوفات جاهزة للتقييم
+
+    تُعاد النسخة المخزنة ما دامت GATE_RULES و GATE_THRESHOLDS
+    و GATE_SECTOR_OVERRIDES لم تتغير.
+
+    Returns:
+        CompiledGateRules: القواعد المترجمة
+    """
+    fingerprint = _config_fingerprint()
+    cached = _compiled_cache.get(fingerprint)
+    if cached is not None:
+        return cached
+
+    gate_ids, rules, gate_starts = [], [], []
+    for gate_id, gate in config.GATE_RULES.items():
+        if not gate['rules']:
+            raise ValueError(f"البوابة {gate_id} لا تحتوي على قواعد")
+        gate_starts.append(len(rules))
+        gate_ids.append(gate_id)
+        for rule in gate['rules']:
+            if rule['op'] not in _OPERATORS:
+                raise ValueError(f"معامل غير مدعوم في {gate_id}: {rule['op']}")
+            rules.append({**rule, 'gate': gate_id})
+
+    fields = list(dict.fromkeys(rule['field'] for rule in rules))
+    sectors = list(config.GATE_SECTOR_OVERRIDES)
+
+    # صف الحدود الافتراضي ثم صف لكل قطاع له استثناءات
+    thresholds = np.empty((len(sectors) + 1, len(rules)))
+    for row, sector in enumerate([None] + sectors):
+        overrides = config.GATE_SECTOR_OVERRIDES.get(sector, {}) if sector else {}
+        for col, rule in enumerate(rules):
+            gate_thresholds = {
+                **config.GATE_THRESHOLDS[rule['gate']],
+                **overrides.get(rule['gate'], {})
+            }
+            thresholds[row, col] = gate_thresholds[rule['threshold']]
+
+    compiled = CompiledGateRules(
+        gate_ids=gate_ids,
+        rules=rules,
+        fields=fields,
+        rule_field_index=np.array([fields.index(rule['field']) for rule in rules]),
+        gate_starts=np.array(gate_starts),
+        rule_gate_index=np.array([gate_ids.index(rule['gate']) for rule in rules]),
+        signs=np.array([_OPERATORS[rule['op']][0] for rule in rules]),
+        strict=np.array([_OPERATORS[rule['op']][1] for rule in rules]),
+        hard=np.array([rule.get('severity', 'hard') == 'hard' for rule in rules]),
+        sector_index={sector: i + 1 for i, sector in enumerate(sectors)},
+        thresholds=thresholds
+    )
+
+    _compiled_cache.clear()
+    _compiled_cache[fingerprint] = compiled
+    return compiled
+
+
+def select_gates(compiled: CompiledGateRules, gate_ids: List[str]) -> CompiledGateRules:
+    """
+    القواعد المترجمة لبوابات مختارة فقط، بنفس الحدود واستثناءات القطاع
+    
+    تسمح بتقييم بوابة واحدة عبر evaluate_gates دون حساب قواعد البقية.
+    
+    Args:
+        compiled: القواعد المترجمة الكاملة
+        gate_ids: البوابات المطلوبة بالترتيب
+    
+    Returns:
+        CompiledGateRules: قواعد البوابات المختارة
+    """
+    ends = list(compiled.gate_starts[1:]) + [len(compiled.rules)]
+    ranges = [
+        np.arange(compiled.gate_starts[g], ends[g])
+        for g in (compiled.gate_ids.index(gate_id) for gate_id in gate_ids)
+    ]
+    columns = np.concatenate(ranges)
+    lengths = np.array([len(r) for r in ranges])
+    rules = [compiled.rules[col] for col in columns]
+    fields = list(dict.fromkeys(rule['field'] for rule in rules))
+    
+    return CompiledGateRules(
+        gate_ids=list(gate_ids),
+        rules=rules,
+        fields=fields,
+        rule_field_index=np.array([fields.index(rule['field']) for rule in rules]),
+        gate_starts=np.concatenate([[0], np.cumsum(lengths)[:-1]]),
+        rule_gate_index=np.repeat(np.arange(len(ranges)), lengths),
+        signs=compiled.signs[columns],
+        strict=compiled.strict[columns],
+        hard=compiled.hard[columns],
+        sector_index=compiled.sector_index,
+        thresholds=compiled.thresholds[:, columns]
+    )
+
+
+def gate_thresholds(gate_id: str, sector: Optional[str] = None,
+                    compiled: Optional[CompiledGateRules] = None) -> Dict[str, float]:
+    """
+    حدود بوابة واحدة بعد تطبيق استثناءات القطاع (من القواعد المترجمة)
+
+    هذا هو المصدر الوحيد للحدود المطبقة، فيتفق قرار البوابة الثانية وسطح
+    الاجتياز و Monte Carlo مع صف البوابة في مسار البوابات السبع.
+
+    Args:
+        gate_id: معرف البوابة (مثل 'gate_2')
+        sector: قطاع المشروع (None أو قطاع بلا استثناءات = الحدود الافتراضية)
+        compiled: قواعد مترجمة (افتراضياً compile_gate_rules())
+
+    Returns:
+        Dict[str, float]: مفتاح الحد ← قيمته
+    """
+    if compiled is None:
+        compiled = compile_gate_rules()
+    row = compiled.sector_index.get(sector, 0)
+    return {
+        rule['threshold']: _format_number(compiled.thresholds[row, col])
+        for col, rule in enumerate(compiled.rules)
+        if rule['gate'] == gate_id
+    }
+
+
+def _as_frame(projects) -> pd.DataFrame:
+    """توحيد المدخلات (قاموس مشروع / قاموس أعمدة / DataFrame) في جدول"""
+    if isinstance(projects, pd.DataFrame):
+        return projects
+    if isinstance(projects, dict):
+        if all(np.ndim(value) == 0 for value in projects.values()):
+            return pd.DataFrame([projects])
+        return pd.DataFrame(projects)
+    return pd.DataFrame(list(projects))
+
+
+def evaluate_gates(projects, compiled: Optional[CompiledGateRules] = None) -> GateEvaluation:
+    """
+    تقييم مشروع أو محفظة كاملة عبر البوابات السبع بعمليات مصفوفية
+
+    الحقول المفقودة تُعامل كقيمة غير متوفرة (NaN) فتفشل قاعدتها.
+
+    Args:
+        projects: قاموس مشروع واحد، أو قاموس أعمدة، أو DataFrame
+        compiled: قواعد مترجمة (افتراضياً compile_gate_rules())
+
+    Returns:
+        GateEvaluation: نتائج القواعد والبوابات لكل مشروع
+    """
+    if compiled is None:
+        compiled = compile_gate_rules()
+    df = _as_frame(projects)
+    n = len(df)
+
+    field_values = np.column_stack([
+        pd.to_numeric(df[field], errors='coerce').to_numpy(dtype=float)
+        if field in df else np.full(n, np.nan)
+        for field in compiled.fields
+    ]) if n else np.empty((0, len(compiled.fields)))
+    values = field_values[:, compiled.rule_field_index]
+
+    if SECTOR_FIELD in df:
+        sector_rows = df[SECTOR_FIELD].map(compiled.sector_index).fillna(0).to_numpy(dtype=int)
+    else:
+        sector_rows = np.zeros(n, dtype=int)
+    thresholds = compiled.thresholds[sector_rows]
+
+    margin = (values - thresholds) * compiled.signs
+    rule_passed = (margin > 0) | (~compiled.strict & (margin == 0))
+    failed = ~rule_passed
+
+    if n:
+        gate_failed = np.logical_or.reduceat(failed, compiled.gate_starts, axis=1)
+        hard_failed = np.logical_or.reduceat(failed & compiled.hard, compiled.gate_starts, axis=1)
+    else:
+        gate_failed = hard_failed = np.zeros((0, len(compiled.gate_ids)), dtype=bool)
+
+    return GateEvaluation(
+        compiled=compiled,
+        values=values,
+        thresholds=thresholds,
+        rule_passed=rule_passed,
+        gate_passed=~gate_failed,
+        hard_failed=hard_failed
+    )
+
+
+def _format_number(value: float):
+    """عرض القيم الصحيحة بدون كسور عشرية"""
+    return int(value) if float(value).is_integer() else round(float(value), 2)
+
+
+def format_rule_message(rule: Dict[str, Any], value: float, threshold: float) -> str:
+    """
+    صياغة رسالة انتهاك قاعدة واحدة
+
+    Args:
+        rule: تعريف القاعدة من GATE_RULES
+        value: قيمة الحقل (NaN إذا لم تتوفر)
+        threshold: الحد المطبق
+
+    Returns:
+        str: نص الرسالة
+    """
+    return rule['message'].format(
+        value='غير متوفر' if np.isnan(value) else _format_number(value),
+        threshold=_format_number(threshold)
+    )
+
+
+def describe_violations(evaluation: GateEvaluation, row: int = 0) -> Dict[str, List[str]]:
+    """
+    صياغة رسائل الانتهاكات لمشروع واحد (تُستدعى للصفوف المعروضة فقط)
+
+    Args:
+        evaluation: نتيجة evaluate_gates
+        row: رقم صف المشروع
+
+    Returns:
+        Dict[str, List[str]]: رسائل الانتهاكات لكل بوابة فشل فيها المشروع
+    """
+    messages: Dict[str, List[str]] = {}
+    for col in np.flatnonzero(~evaluation.rule_passed[row]):
+        rule = evaluation.compiled.rules[col]
+        messages.setdefault(rule['gate'], []).append(format_rule_message(
+            rule, evaluation.values[row, col], evaluation.thresholds[row, col]
+        ))
+    return messages
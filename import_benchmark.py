@@ -0,0 +1,108 @@
+"""
+قياس زمن الاستيراد عند البدء البارد
+يقيس في مفسر جديد لكل قياس زمن استيراد وحدات بدء التطبيق وكل صفحة فوق
+استيراد streamlit نفسه، ويفشل (رمز خروج 1) إذا تجاوز أي منها ميزانيته أو
+حمّل بدء التطبيق أو صفحة الرؤية مكتبات التحليل أو الرسوم
+
+التشغيل:
+    python import_benchmark.py            # الوسيط من 5 قياسات
+    python import_benchmark.py --runs 9 --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Any, List, Optional
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# streamlit نفسه يستورد plotly.graph_objects، أما numpy و pandas و plotly.express
+# و requests فلا يجب أن تُحمَّل قبل فتح صفحة تحتاجها
+LIGHT_PAGE_FORBIDDEN = ['numpy', 'pandas', 'plotly.express', 'requests']
+
+# ميزانية كل هدف (مللي ثانية فوق import streamlit) والوحدات الممنوعة فيه
+IMPORT_BUDGETS = {
+    'startup': {'modules': ['config', 'utils'], 'budget_ms': 60, 'forbidden': LIGHT_PAGE_FORBIDDEN},
+    'vision': {'modules': ['pages.vision'], 'budget_ms': 60, 'forbidden': LIGHT_PAGE_FORBIDDEN},
+    'gate_simulator': {'modules': ['pages.gate_simulator'], 'budget_ms': 1000, 'forbidden': []},
+    'decision_center': {'modules': ['pages.decision_center'], 'budget_ms': 900, 'forbidden': []},
+    'live_report': {'modules': ['pages.live_report'], 'budget_ms': 1000, 'forbidden': []}
+}
+
+_PROBE = """
+import json, sys, time
+import streamlit
+started = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    'ms': elapsed * 1000,
+    'loaded': [m for m in {forbidden!r} if m in sys.modules]
+}}))
+"""
+
+
+def measure(modules: List[str], forbidden: List[str], runs: int = 5) -> Dict[str, Any]:
+    """
+    زمن استيراد مجموعة وحدات في مفسرات جديدة
+
+    Args:
+        modules: الوحدات بترتيب استيرادها
+        forbidden: وحدات يجب ألا تُحمَّل
+        runs: عدد القياسات (يُؤخذ الوسيط)
+
+    Returns:
+        Dict: median_ms و min_ms والوحدات الممنوعة التي حُمِّلت
+    """
+    samples, loaded = [], set()
+    code = _PROBE.format(modules=modules, forbidden=forbidden)
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(probe['ms'])
+        loaded.update(probe['loaded'])
+    return {'median_ms': statistics.median(samples), 'min_ms': min(samples), 'forbidden_loaded': sorted(loaded)}
+
+
+def run_benchmark(runs: int = 5, budgets: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    قياس كل الأهداف ومقارنتها بالميزانيات
+
+    Returns:
+        Dict: لكل هدف القياس والميزانية وهل اجتاز (passed)
+    """
+    report = {}
+    for target, spec in (budgets or IMPORT_BUDGETS).items():
+        result = measure(spec['modules'], spec['forbidden'], runs)
+        result['budget_ms'] = spec['budget_ms']
+        result['passed'] = result['median_ms'] <= spec['budget_ms'] and not result['forbidden_loaded']
+        report[target] = result
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='ميزانية زمن الاستيراد عند البدء البارد')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='طباعة التقرير بصيغة JSON')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for target, result in report.items():
+            status = 'OK  ' if result['passed'] else 'FAIL'
+            extra = f"  يحمّل: {', '.join(result['forbidden_loaded'])}" if result['forbidden_loaded'] else ''
+            print(f"{status} {target:<16} {result['median_ms']:7.1f} ms "
+                  f"(الأدنى {result['min_ms']:.1f}) / الميزانية {result['budget_ms']} ms{extra}")
+    return 0 if all(result['passed'] for result in report.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
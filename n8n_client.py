@@ -0,0 +1,595 @@
+"""
+عميل محرك القرارات (n8n)
+اتصال مشترك مع إعادة استخدام الاتصالات وإعادة المحاولة، وإرسال بيانات
+البوابات في الخلفية حتى لا تنتظر الصفحة استجابة الشبكة، وتجميع النتائج
+في دفعات مضغوطة، وقاطع دائرة يرفض الطلبات فوراً عندما يكون المحرك متوقفاً،
+وذاكرة مؤقتة لاستجابات الحمولات المتطابقة
+"""
+
+import gzip
+import hashlib
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# نوع غلاف الدفعات كما يستقبله n8n (قائمة items)
+BATCH_ENVELOPE_TYPE = 'egisf.gate_results.batch'
+BATCH_ENVELOPE_VERSION = 1
+
+# حالات قاطع الدائرة
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+CIRCUIT_LABELS = {
+    CIRCUIT_CLOSED: 'متصل',
+    CIRCUIT_OPEN: 'غير متصل (رفض فوري)',
+    CIRCUIT_HALF_OPEN: 'جاري اختبار الاتصال'
+}
+
+
+class CircuitBreaker:
+    """
+    قاطع دائرة بثلاث حالات (مغلق، مفتوح، نصف مفتوح)
+
+    بعد failure_threshold إخفاقات متتالية يُفتح القاطع فتُرفض الطلبات فوراً
+    دون لمس الشبكة. بعد reset_timeout يُشغَّل فحص الصحة (probe) في الخلفية
+    إن وُجد، وعند نجاحه -أو مباشرة إن لم يوجد فحص- ينتقل القاطع إلى نصف
+    مفتوح ويسمح بطلب تجريبي واحد: نجاحه يغلق القاطع وفشله يعيد فتحه.
+
+    Args:
+        failure_threshold: عدد الإخفاقات المتتالية لفتح القاطع
+        reset_timeout: مدة بقاء القاطع مفتوحاً قبل اختبار الاتصال (ثوانٍ)
+        probe: دالة فحص صحة المحرك تعيد True إذا كان متاحاً (اختياري)
+        half_open_max_calls: عدد الطلبات التجريبية المسموحة في حالة نصف مفتوح
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 probe: Optional[Callable[[], bool]] = None, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.probe = probe
+        self._lock = threading.Lock()
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """الحالة الحالية (بعد تطبيق انتهاء مهلة الفتح)"""
+        with self._lock:
+            self._advance_locked()
+            return self._state
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        حالة القاطع للعرض في الواجهة
+
+        Returns:
+            Dict: state, label, failures, retry_in (ثوانٍ حتى اختبار الاتصال)
+        """
+        with self._lock:
+            self._advance_locked()
+            retry_in = 0.0
+            if self._state == CIRCUIT_OPEN:
+                retry_in = max(self._opened_at + self.reset_timeout - time.monotonic(), 0.0)
+            return {
+                'state': self._state,
+                'label': CIRCUIT_LABELS[self._state],
+                'failures': self._failures,
+                'retry_in': retry_in
+            }
+
+    def allow(self) -> bool:
+        """هل يُسمح بإرسال طلب الآن؟ (لا يلمس الشبكة)"""
+        with self._lock:
+            self._advance_locked()
+            if self._state == CIRCUIT_CLOSED:
+                return True
+            if self._state == CIRCUIT_HALF_OPEN and self._trial_calls < self.half_open_max_calls:
+                self._trial_calls += 1
+                return True
+            return False
+
+    def record_success(self):
+        """تسجيل نجاح طلب"""
+        with self._lock:
+            self._state = CIRCUIT_CLOSED
+            self._failures = 0
+            self._trial_calls = 0
+
+    def record_failure(self):
+        """تسجيل فشل طلب"""
+        with self._lock:
+            self._failures += 1
+            if self._state == CIRCUIT_HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open_locked()
+
+    def _open_locked(self):
+        self._state = CIRCUIT_OPEN
+        self._opened_at = time.monotonic()
+        self._trial_calls = 0
+
+    def _advance_locked(self):
+        if self._state != CIRCUIT_OPEN or self._probing:
+            return
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return
+        if self.probe is None:
+            self._state = CIRCUIT_HALF_OPEN
+            return
+        # الطلبات تبقى مرفوضة فوراً بينما يجري الفحص في الخلفية
+        self._probing = True
+        threading.Thread(target=self._run_probe, name="n8n-health-probe", daemon=True).start()
+
+    def _run_probe(self):
+        try:
+            healthy = bool(self.probe())
+        except Exception:
+            healthy = False
+        with self._lock:
+            self._probing = False
+            if self._state != CIRCUIT_OPEN:
+                return
+            if healthy:
+                self._state = CIRCUIT_HALF_OPEN
+                self._trial_calls = 0
+            else:
+                self._opened_at = time.monotonic()
+
+
+class N8NClient:
+    """
+    عميل HTTP مشترك لـ n8n
+
+    يحتفظ بجلسة requests واحدة بمجمع اتصالات (keep-alive) فلا يُفتح اتصال
+    TCP/TLS جديد لكل تحليل، ويعيد المحاولة لرموز الحالة المؤقتة وأخطاء
+    الاتصال بتأخير أسي عشوائي (full jitter). عند تمرير breaker تُرفض
+    الطلبات فوراً ما دام القاطع مفتوحاً، ويُستخدم health_check لفحص الصحة.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10,
+        max_retries: int = 2,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        retry_statuses: Iterable[int] = (429, 502, 503, 504),
+        pool_maxsize: int = 10,
+        compress_level: int = 6,
+        health_url: Optional[str] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.compress_level = compress_level
+        self.health_url = health_url
+        self.breaker = breaker
+        if breaker is not None and breaker.probe is None:
+            breaker.probe = self.health_check
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """زمن الانتظار قبل المحاولة التالية"""
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def post(self, data: Any, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        إرسال البيانات إلى n8n مع إعادة المحاولة
+
+        Args:
+            data: البيانات المراد إرسالها (JSON)
+            headers: ترويسات إضافية
+
+        Returns:
+            Dict: استجابة من n8n أو رسالة خطأ
+        """
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        return self._send(body, {'Content-Type': 'application/json', **(headers or {})})
+
+    def post_batch(self, items: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        إرسال عدة نتائج في طلب واحد مضغوط بـ gzip
+
+        Args:
+            items: قائمة (مفتاح منع التكرار، الحمولة)
+
+        Returns:
+            Dict: استجابة من n8n أو رسالة خطأ
+        """
+        envelope = build_batch_envelope(items)
+        body = gzip.compress(
+            json.dumps(envelope, ensure_ascii=False).encode('utf-8'),
+            compresslevel=self.compress_level
+        )
+        return self._send(body, {
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+            'Idempotency-Key': envelope['batch_id']
+        })
+
+    def health_check(self) -> bool:
+        """
+        فحص صحة محرك القرارات (GET على health_url أو رابط الـ Webhook)
+
+        Returns:
+            bool: True إذا ردّ الخادم بأي رمز أقل من 500
+        """
+        try:
+            response = self.session.get(self.health_url or self.url, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            return False
+        return response.status_code < 500
+
+    def _send(self, body: bytes, headers: Dict[str, str]) -> Dict[str, Any]:
+        """إرسال جسم جاهز عبر قاطع الدائرة (إن وُجد)"""
+        if self.breaker is not None and not self.breaker.allow():
+            return {
+                'success': False,
+                'error': 'قاطع الدائرة مفتوح',
+                'message': 'محرك القرارات غير متاح حالياً، سيُعاد الاتصال تلقائياً',
+                'circuit_open': True
+            }
+        response = self._send_with_retries(body, headers)
+        engine_down = response.pop('engine_down', False)
+        if self.breaker is not None:
+            if engine_down:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        return response
+
+    def _send_with_retries(self, body: bytes, headers: Dict[str, str]) -> Dict[str, Any]:
+        """إرسال جسم جاهز مع إعادة المحاولة وتوحيد صيغة الاستجابة"""
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout) as e:
+                # الطلب لم يصل إلى الخادم، فإعادة المحاولة آمنة
+                if attempt < self.max_retries:
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                if isinstance(e, requests.exceptions.ConnectTimeout):
+                    return {
+                        'success': False,
+                        'error': 'انتهت مهلة الاتصال',
+                        'message': 'الرجاء المحاولة مرة أخرى',
+                        'engine_down': True
+                    }
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'message': 'خطأ في الاتصال بالشبكة',
+                    'engine_down': True
+                }
+            except requests.exceptions.Timeout:
+                return {
+                    'success': False,
+                    'error': 'انتهت مهلة الاتصال',
+                    'message': 'الرجاء المحاولة مرة أخرى',
+                    'engine_down': True
+                }
+            except requests.exceptions.RequestException as e:
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'message': 'خطأ في الاتصال بالشبكة'
+                }
+
+            if response.status_code in self.retry_statuses and attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, response.headers.get('Retry-After')))
+                attempt += 1
+                continue
+
+            if response.status_code == 200:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {'raw': response.text}
+                return {
+                    'success': True,
+                    'data': body,
+                    'message': 'تم إرسال البيانات بنجاح'
+                }
+            return {
+                'success': False,
+                'error': f'خطأ في الاستجابة: {response.status_code}',
+                'message': 'فشل الاتصال بالخادم',
+                'engine_down': response.status_code >= 500 or response.status_code in self.retry_statuses
+            }
+
+    def close(self):
+        """إغلاق الاتصالات المفتوحة"""
+        self.session.close()
+
+
+def build_batch_envelope(items: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    غلاف دفعة نتائج البوابات
+
+    معرّف الدفعة مشتق من مفاتيح عناصرها، فإعادة إرسال نفس الدفعة تحمل نفس
+    المعرّف ويستطيع n8n تجاهل التكرار.
+
+    Args:
+        items: قائمة (مفتاح منع التكرار، الحمولة)
+
+    Returns:
+        Dict: الغلاف (type, version, batch_id, count, sent_at, items)
+    """
+    keys = [key for key, _ in items]
+    return {
+        'type': BATCH_ENVELOPE_TYPE,
+        'version': BATCH_ENVELOPE_VERSION,
+        'batch_id': hashlib.sha1('|'.join(keys).encode('utf-8')).hexdigest(),
+        'count': len(items),
+        'sent_at': datetime.now().isoformat(),
+        'items': [{'idempotency_key': key, 'payload': payload} for key, payload in items]
+    }
+
+
+class WebhookBatcher:
+    """
+    مُجمِّع نتائج يرسلها في دفعة واحدة عند امتلاء العدد أو الحجم أو انقضاء المهلة
+
+    Args:
+        sender: دالة إرسال الدفعة (مثل N8NClient.post_batch)
+        max_items: الحد الأقصى لعدد العناصر في الدفعة
+        max_bytes: الحد الأقصى لحجم الدفعة قبل الضغط (بايت)
+        max_delay: أقصى زمن يبقى فيه عنصر في الانتظار (ثوانٍ)
+    """
+
+    def __init__(self, sender: Callable[[List[Tuple[str, Dict[str, Any]]]], Dict[str, Any]],
+                 max_items: int = 500, max_bytes: int = 1_000_000, max_delay: float = 2.0):
+        self._sender = sender
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._items: List[Tuple[str, Dict[str, Any]]] = []
+        self._futures: List[Future] = []
+        self._size = 0
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, payload: Dict[str, Any], key: Optional[str] = None) -> Future:
+        """
+        إضافة نتيجة إلى الدفعة الحالية
+
+        Args:
+            payload: الحمولة
+            key: مفتاح منع التكرار (يُولد إن لم يُعطَ)
+
+        Returns:
+            Future: تكتمل باستجابة الدفعة التي أُرسلت فيها النتيجة
+        """
+        future: Future = Future()
+        size = len(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            if self._items and self._size + size > self.max_bytes:
+                self._flush_locked()
+            self._items.append((key or uuid.uuid4().hex, payload))
+            self._futures.append(future)
+            self._size += size
+            if len(self._items) >= self.max_items or self._size >= self.max_bytes:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future
+
+    def flush(self):
+        """إرسال الدفعة الحالية فوراً"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._items:
+            return
+        items, futures = self._items, self._futures
+        self._items, self._futures, self._size = [], [], 0
+        # الإرسال خارج مسار الاستدعاء حتى لا ينتظر المُضيف الشبكة
+        threading.Thread(target=self._send, args=(items, futures), daemon=True).start()
+
+    def _send(self, items, futures):
+        try:
+            response = self._sender(items)
+        except Exception as e:
+            response = {'success': False, 'error': str(e), 'message': 'خطأ غير متوقع أثناء الإرسال'}
+        for future in futures:
+            future.set_result(response)
+
+
+def payload_fingerprint(data: Dict[str, Any], ignore: Iterable[str] = ('timestamp',)) -> str:
+    """
+    بصمة ثابتة للحمولة (ترتيب المفاتيح لا يؤثر)
+
+    Args:
+        data: الحمولة
+        ignore: حقول لا تدخل في البصمة (مثل وقت الإرسال)
+
+    Returns:
+        str: sha256 للتمثيل القانوني للحمولة
+    """
+    ignore = set(ignore)
+    canonical = json.dumps(
+        {k: v for k, v in data.items() if k not in ignore},
+        ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class WebhookResponseCache:
+    """
+    ذاكرة LRU محدودة بعمر (TTL) لاستجابات n8n الناجحة
+
+    تمنع إعادة التشغيل والنقرات المزدوجة من إرسال نفس الحمولة مرة أخرى:
+    الحمولة المطابقة لاستجابة محفوظة تعيدها مباشرة، والمطابقة لطلب ما زال
+    قيد الإرسال تشاركه نفس الـ Future.
+
+    Args:
+        max_entries: الحد الأقصى للاستجابات المحفوظة
+        ttl: عمر الاستجابة المحفوظة (ثوانٍ)
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: str) -> Optional[Future]:
+        """
+        البحث عن استجابة محفوظة أو طلب قيد الإرسال
+
+        Returns:
+            Future: مكتملة بالاستجابة المحفوظة أو Future الطلب الجاري، أو None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                future: Future = Future()
+                future.set_result({**entry[1], 'cached': True})
+                return future
+            if entry is not None:
+                del self._entries[key]
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.hits += 1
+                return inflight
+            self.misses += 1
+            return None
+
+    def track(self, key: str, future: Future):
+        """تسجيل طلب قيد الإرسال وحفظ استجابته إذا نجح"""
+        with self._lock:
+            self._inflight[key] = future
+        future.add_done_callback(lambda f: self._settle(key, f))
+
+    def _settle(self, key: str, future: Future):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if future.exception() is not None:
+                return
+            response = future.result()
+            if response.get('success'):
+                self._entries[key] = (time.monotonic(), response)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        """نسبة الطلبات التي لم تحتج إلى إرسال جديد"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        إحصاءات الذاكرة للعرض في الواجهة
+
+        Returns:
+            Dict: hits, misses, hit_rate, size
+        """
+        with self._lock:
+            size = len(self._entries)
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate, 'size': size}
+
+
+class WebhookDispatcher:
+    """
+    مرسل خلفي بقائمة انتظار محدودة
+
+    الصفحة تضع البيانات في القائمة وتحصل فوراً على Future، بينما تتولى
+    خيوط العمل الإرسال الفعلي. عند امتلاء القائمة يُرفض الطلب فوراً بدلاً
+    من حجب الصفحة.
+    """
+
+    def __init__(self, sender: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 max_queue: int = 100, workers: int = 2):
+        self._sender = sender
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._workers = [
+            threading.Thread(target=self._run, name=f"n8n-dispatch-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, data: Dict[str, Any]) -> Future:
+        """
+        جدولة إرسال البيانات
+
+        Args:
+            data: البيانات المراد إرسالها
+
+        Returns:
+            Future: تكتمل باستجابة الإرسال (بنفس صيغة send_to_n8n_webhook)
+        """
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((data, future))
+        except queue.Full:
+            future.set_result({
+                'success': False,
+                'error': 'قائمة الإرسال ممتلئة',
+                'message': 'الرجاء المحاولة مرة أخرى'
+            })
+        return future
+
+    @property
+    def pending(self) -> int:
+        """عدد الطلبات في انتظار الإرسال"""
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            data, future = self._queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(self._sender(data))
+            except Exception as e:  # لا يجب أن يتوقف خيط العمل بسبب طلب واحد
+                future.set_result({
+                    'success': False,
+                    'error': str(e),
+                    'message': 'خطأ غير متوقع أثناء الإرسال'
+                })
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,243 @@
+"""
+خادم n8n محلي بديل للتطوير والقياس
+يحاكي Webhook ‏egisf-gate-check بزمن استجابة ونسبة أخطاء وجسم رد قابلة للضبط،
+حتى يمكن قياس مسار الإرسال دون نسخة n8n حقيقية
+
+التشغيل:
+    python n8n_stub.py --port 5678 --latency 0.05 --jitter 0.02 --error-rate 0.05
+ثم توجيه N8N_WEBHOOK_URL في config.py إلى الرابط المطبوع.
+مع --callback-url يرسل الخادم قرار كل مشروع إلى مستقبل القرارات في التطبيق
+كما يفعل سير عمل n8n الحقيقي.
+"""
+
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+
+DEFAULT_PATH = '/webhook/egisf-gate-check'
+HEALTH_PATH = '/healthz'
+
+
+def default_response(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    رد افتراضي يشبه مخرجات سير عمل n8n
+
+    Args:
+        payload: الحمولة المستلمة (نتيجة واحدة أو غلاف دفعة)
+
+    Returns:
+        Dict: قرار لكل نتيجة
+    """
+    if 'items' in payload:
+        return {
+            'received': payload.get('count', len(payload['items'])),
+            'batch_id': payload.get('batch_id')
+        }
+    return {
+        'received': True,
+        'project_name': payload.get('project_name'),
+        'decision': 'approved' if payload.get('gate_2_passed') else 'rejected'
+    }
+
+
+class N8NStubServer:
+    """
+    خادم HTTP بديل لـ n8n يعمل في خيط خلفي
+
+    Args:
+        host: عنوان الاستماع
+        port: المنفذ (0 لاختيار منفذ متاح)
+        path: مسار الـ Webhook
+        latency: زمن المعالجة الأساسي لكل طلب (ثوانٍ)
+        jitter: تذبذب عشوائي يُضاف إلى الزمن (0 حتى jitter ثوانٍ)
+        error_rate: نسبة الطلبات التي تُرد بخطأ (0 - 1)
+        error_status: رمز الحالة للطلبات الفاشلة
+        response_body: جسم رد ثابت (بدلاً من default_response)
+        seed: بذرة العشوائية لتكرار نفس السلوك
+        callback_url: رابط مستقبل القرارات (اختياري)
+        callback_delay: زمن اتخاذ القرار قبل إرساله (ثوانٍ)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, path: str = DEFAULT_PATH,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, response_body: Optional[Dict[str, Any]] = None,
+                 seed: Optional[int] = None, callback_url: Optional[str] = None,
+                 callback_delay: float = 1.0):
+        self.path = path
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.response_body = response_body
+        self.callback_url = callback_url
+        self.callback_delay = callback_delay
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # retries: طلبات بمفتاح Idempotency-Key سبق استلامه (إعادة محاولة من العميل أو صندوق الإرسال)
+        self.stats = {'requests': 0, 'errors': 0, 'retries': 0, 'items': 0, 'bytes': 0}
+        self._seen_keys = set()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{self.path}'
+
+    @property
+    def health_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{HEALTH_PATH}'
+
+    def start(self) -> 'N8NStubServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='n8n-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _decide(self):
+        """زمن الرد وهل يفشل الطلب (مولد عشوائي واحد محمي بقفل)"""
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+        return delay, failed
+
+    def _record(self, size: int, items: int, failed: bool, key: Optional[str] = None):
+        with self._lock:
+            self.stats['requests'] += 1
+            if key is not None:
+                self.stats['retries'] += key in self._seen_keys
+                self._seen_keys.add(key)
+            self.stats['bytes'] += size
+            self.stats['items'] += items
+            self.stats['errors'] += failed
+
+    def _send_callbacks(self, payload: Dict[str, Any]):
+        """إرسال قرار كل نتيجة إلى مستقبل القرارات بعد callback_delay"""
+        entries = payload['items'] if 'items' in payload else [{'idempotency_key': None, 'payload': payload}]
+        decisions = []
+        for entry in entries:
+            item = entry['payload']
+            decisions.append({
+                'callback_id': entry['idempotency_key'] or f"{item.get('project_name')}@{item.get('timestamp')}",
+                'project_name': item.get('project_name') or 'غير معروف',
+                'gate': 2,
+                'decision': 'approved' if item.get('gate_2_passed') else 'rejected',
+                'reason': 'قرار تجريبي من الخادم البديل',
+                'sfm_score': item.get('sfm_score')
+            })
+        time.sleep(self.callback_delay)
+        request = urllib.request.Request(
+            self.callback_url,
+            data=json.dumps({'items': decisions}, ensure_ascii=False).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except OSError:
+            pass
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _reply(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == HEALTH_PATH:
+                    self._reply(200, {'status': 'ok'})
+                else:
+                    self._reply(404, {'message': 'not found'})
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path != stub.path:
+                    self._reply(404, {'message': 'webhook not registered'})
+                    return
+                try:
+                    if self.headers.get('Content-Encoding') == 'gzip':
+                        raw = gzip.decompress(raw)
+                    payload = json.loads(raw)
+                except (OSError, ValueError):
+                    stub._record(len(raw), 0, True)
+                    self._reply(400, {'message': 'invalid body'})
+                    return
+
+                delay, failed = stub._decide()
+                if delay > 0:
+                    time.sleep(delay)
+                stub._record(len(raw), payload.get('count', 1) if isinstance(payload, dict) else 1, failed,
+                             self.headers.get('Idempotency-Key'))
+                if failed:
+                    self._reply(stub.error_status, {'message': 'simulated failure'})
+                else:
+                    self._reply(200, stub.response_body or default_response(payload))
+                    if stub.callback_url and isinstance(payload, dict):
+                        threading.Thread(target=stub._send_callbacks, args=(payload,), daemon=True).start()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='خادم n8n محلي بديل')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5678)
+    parser.add_argument('--path', default=DEFAULT_PATH)
+    parser.add_argument('--latency', type=float, default=0.05, help='زمن المعالجة (ثوانٍ)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='تذبذب الزمن (ثوانٍ)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='نسبة الأخطاء (0 - 1)')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--response-file', help='ملف JSON بجسم رد ثابت')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--callback-url', help='رابط مستقبل القرارات في التطبيق')
+    parser.add_argument('--callback-delay', type=float, default=1.0)
+    args = parser.parse_args()
+
+    response_body = None
+    if args.response_file:
+        with open(args.response_file, encoding='utf-8') as f:
+            response_body = json.load(f)
+
+    server = N8NStubServer(
+        args.host, args.port, args.path, args.latency, args.jitter,
+        args.error_rate, args.error_status, response_body, args.seed,
+        args.callback_url, args.callback_delay
+    ).start()
+    print(f'n8n stub: {server.url}  (health: {server.health_url})')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+        print(json.dumps(server.stats))
+
+
+if __name__ == '__main__':
+    main()
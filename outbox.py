@@ -0,0 +1,249 @@
+"""
+صندوق الإرسال الدائم لقرارات البوابات
+كل حمولة تُكتب أولاً في SQLite (وضع WAL) ثم تُرسل إلى n8n، فلا يضيع قرار
+بسبب انقطاع الشبكة، والتسليم مضمون مرة واحدة على الأقل بمفاتيح منع التكرار
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    delivered_at REAL,
+    last_error TEXT,
+    batched INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_pending
+    ON outbox (delivered_at, next_attempt_at);
+"""
+
+
+class WebhookOutbox:
+    """
+    صندوق إرسال إلحاقي على SQLite
+
+    الكتابة محلية وسريعة (لا شبكة)، والحالة تُحفظ بين إعادة تشغيل التطبيق.
+    """
+
+    def __init__(self, path: str, grace_period: float = 30.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.grace_period = grace_period
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        """
+        حفظ حمولة جديدة
+
+        المحاولة الأولى يتولاها المرسل الخلفي مباشرة؛ لذلك لا يلتقطها
+        المُفرِّغ قبل انقضاء grace_period.
+
+        Args:
+            payload: بيانات القرار
+
+        Returns:
+            str: مفتاح منع التكرار المرسل مع الحمولة
+        """
+        key = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (idempotency_key, payload, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(payload, ensure_ascii=False), now, now + self.grace_period)
+            )
+        return key
+
+    def enqueue_many(self, payloads: List[Dict[str, Any]]) -> List[str]:
+        """
+        حفظ عدة حمولات تُرسل في دفعات، في معاملة واحدة
+
+        Args:
+            payloads: بيانات القرارات
+
+        Returns:
+            List[str]: مفاتيح منع التكرار بنفس الترتيب
+        """
+        now = time.time()
+        keys = [uuid.uuid4().hex for _ in payloads]
+        rows = [
+            (key, json.dumps(payload, ensure_ascii=False), now, now + self.grace_period)
+            for key, payload in zip(keys, payloads)
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT INTO outbox (idempotency_key, payload, created_at, next_attempt_at, batched) "
+                    "VALUES (?, ?, ?, ?, 1)",
+                    rows
+                )
+        return keys
+
+    def due(self, limit: int, now: Optional[float] = None) -> List[Tuple[str, Dict[str, Any], int, bool]]:
+        """
+        الحمولات غير المسلمة التي حان موعد محاولتها (الأقدم أولاً)
+
+        Returns:
+            List: (المفتاح، الحمولة، عدد المحاولات السابقة، هل أُرسلت في دفعة)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idempotency_key, payload, attempts, batched FROM outbox "
+                "WHERE delivered_at IS NULL AND next_attempt_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+        return [
+            (key, json.loads(payload), attempts, bool(batched))
+            for key, payload, attempts, batched in rows
+        ]
+
+    def mark_delivered(self, keys: List[str]):
+        """تسجيل تسليم الحمولات"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET delivered_at = ?, attempts = attempts + 1, last_error = NULL "
+                "WHERE idempotency_key = ?",
+                [(now, key) for key in keys]
+            )
+
+    def mark_failed(self, keys: List[str], error: str, retry_in: float):
+        """تسجيل فشل المحاولة وتحديد موعد المحاولة التالية"""
+        retry_at = time.time() + retry_in
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = ? "
+                "WHERE idempotency_key = ? AND delivered_at IS NULL",
+                [(error, retry_at, key) for key in keys]
+            )
+
+    def pending_count(self) -> int:
+        """عدد الحمولات التي لم تُسلم بعد"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE delivered_at IS NULL"
+            ).fetchone()[0]
+
+    def purge_delivered(self, older_than: float):
+        """حذف الحمولات المسلمة الأقدم من older_than ثانية"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM outbox WHERE delivered_at IS NOT NULL AND delivered_at < ?",
+                (time.time() - older_than,)
+            )
+
+
+class OutboxFlusher:
+    """
+    مُفرِّغ خلفي يعيد إرسال الحمولات المتأخرة من صندوق الإرسال
+
+    كل حمولة تُعاد بالشكل الذي أُرسلت به أول مرة، فلا يستقبل n8n شكلين
+    لنفس القرار: القرارات التفاعلية منفردة بمفتاح منع تكرارها، ونتائج
+    التحليل الجماعي معاً في غلاف دفعة مضغوط تُسجَّل كلها مسلمة أو فاشلة.
+
+    Args:
+        outbox: صندوق الإرسال
+        sender: دالة إرسال حمولة واحدة (المفتاح، الحمولة) ← استجابة بصيغة send_to_n8n_webhook
+        batch_sender: دالة إرسال الدفعة [(المفتاح، الحمولة)] ← استجابة بنفس الصيغة
+        interval: الفاصل بين دورات التفريغ (ثوانٍ)
+        batch_size: الحد الأقصى للحمولات في كل دورة
+        backoff_max: أقصى تأخير لإعادة المحاولة (ثوانٍ)
+        retention: مدة الاحتفاظ بالحمولات المسلمة (ثوانٍ)؛ تُحذف الأقدم منها
+            مرة كل ساعة على الأكثر
+    """
+
+    PURGE_INTERVAL = 3600
+
+    def __init__(self, outbox: WebhookOutbox,
+                 sender: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+                 batch_sender: Callable[[List[Tuple[str, Dict[str, Any]]]], Dict[str, Any]],
+                 interval: float = 5.0, batch_size: int = 50, backoff_max: float = 300.0,
+                 retention: float = 7 * 24 * 3600):
+        self.outbox = outbox
+        self.sender = sender
+        self.batch_sender = batch_sender
+        self.interval = interval
+        self.batch_size = batch_size
+        self.backoff_max = backoff_max
+        self.retention = retention
+        self._purged_at = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="n8n-outbox-flusher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def retry_delay(self, attempts: int) -> float:
+        """تأخير أسي عشوائي حسب عدد المحاولات السابقة"""
+        return random.uniform(0, min(self.backoff_max, self.interval * 2 ** attempts))
+
+    def flush_once(self) -> int:
+        """
+        دورة تفريغ واحدة
+
+        Returns:
+            int: عدد الحمولات التي سُلمت
+        """
+        due = self.outbox.due(self.batch_size)
+        batched = [(key, payload, attempts) for key, payload, attempts, in_batch in due if in_batch]
+        delivered = self._settle(batched, self.batch_sender([(key, payload) for key, payload, _ in batched])) \
+            if batched else 0
+        for key, payload, attempts, in_batch in due:
+            if in_batch:
+                continue
+            response = self.sender(key, payload)
+            if response.get('circuit_open'):
+                break
+            delivered += self._settle([(key, payload, attempts)], response)
+        return delivered
+
+    def purge_if_due(self, now: Optional[float] = None):
+        """حذف الحمولات المسلمة الأقدم من retention إذا مرت PURGE_INTERVAL منذ آخر حذف"""
+        now = time.time() if now is None else now
+        if now - self._purged_at >= self.PURGE_INTERVAL:
+            self.outbox.purge_delivered(self.retention)
+            self._purged_at = now
+
+    def _settle(self, entries: List[Tuple[str, Dict[str, Any], int]], response: Dict[str, Any]) -> int:
+        """تسجيل نتيجة طلب واحد لحمولاته، وإرجاع عدد ما سُلم منها"""
+        keys = [key for key, _, _ in entries]
+        if response['success']:
+            self.outbox.mark_delivered(keys)
+            return len(keys)
+        if response.get('circuit_open'):
+            # المحرك معروف أنه متوقف: تبقى الحمولات مستحقة دون احتساب محاولة
+            return 0
+        attempts = max(attempts for _, _, attempts in entries)
+        self.outbox.mark_failed(keys, response.get('error', ''), self.retry_delay(attempts))
+        return 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush_once()
+                self.purge_if_due()
+            except Exception:  # دورة فاشلة لا يجب أن توقف المُفرِّغ
+                continue
@@ -1,10 +1,7 @@
 """
 حزمة الصفحات
+تُستورد كل صفحة عند اختيارها من القائمة (app.py) وليس عند بدء التطبيق،
+حتى لا تحمّل صفحة الرؤية مكتبات الرسوم والتحليل التي لا تحتاجها
 """
 
-from . import vision
-from . import gate_simulator
-from . import decision_center
-from . import live_report
-
 __all__ = ['vision', 'gate_simulator', 'decision_center', 'live_report']
\ No newline at end of file
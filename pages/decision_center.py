@@ -3,11 +3,35 @@
 """
 
 import streamlit as st
-import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
+import charts
 import config
-from utils import display_metric_card
+from portfolio import OBJECTIVES, optimize_portfolio
+from project_store import ACTIVE_STATUSES
+from utils import display_metric_card, get_project_store, show_decision_feed
+
+STATUS_LABELS = {
+    'critical': '🔴 حرج',
+    'at_risk': '🟡 يحتاج متابعة',
+    'on_track': '🔵 قيد المراجعة'
+}
+
+# نطاقات المخاطر: (الحد الأدنى، الحد الأعلى) شاملة
+RISK_BANDS = {
+    'منخفض': (0, 39),
+    'متوسط': (40, 59),
+    'مرتفع': (60, 100)
+}
+
+# تسميات الجدول الزمني (المشروع على المسار المنتظر لقرار يظهر "مراجعة")
+TIMELINE_LABELS = {
+    'critical': 'حرج',
+    'at_risk': 'تحذير',
+    'on_track': 'على المسار'
+}
+
 
 def show():
     """عرض صفحة محاكي القرار السيادي"""
@@ -26,36 +50,10 @@ def show():
         </div>
     """, unsafe_allow_html=True)
     
-    # محاكاة مشاريع قيد المراجعة
-    projects_pending = [
-        {
-            'id': 'PRJ-2025-00234',
-            'name': 'مطار إقليمي - المنطقة الشرقية',
-            'cost': 450,
-            'status': 'critical',
-            'sfm_score': 58,
-            'risk': 72,
-            'issue': 'تأخير 6 أشهر + تجاوز ميزانية 12%'
-        },
-        {
-            'id': 'PRJ-2025-00156',
-            'name': 'محطة طاقة شمسية - 500 ميجاواط',
-            'cost': 380,
-            'status': 'warning',
-            'sfm_score': 82,
-            'risk': 48,
-            'issue': 'نزاع قانوني مع مقاول فرعي'
-        },
-        {
-            'id': 'PRJ-2025-00089',
-            'name': 'طريق سريع - 250 كم',
-            'cost': 520,
-            'status': 'pending',
-            'sfm_score': 75,
-            'risk': 35,
-            'issue': 'انتظار موافقة M17_ESG_Approval'
-        }
-    ]
+    store = get_project_store()
+    active = store.stats(statuses=ACTIVE_STATUSES)
+    critical = store.stats(statuses=['critical'])['count']
+    pending = store.stats(awaiting_decision=True)['count']
     
     # المقاييس الإجمالية
     st.subheader("📊 ملخص الحالة الوطنية")
@@ -65,23 +63,23 @@ def show():
     with col1:
         display_metric_card(
             "المشاريع النشطة",
-            "487",
-            "قيمة: 28.5 مليار",
+            f"{active['count']:,}",
+            f"قيمة: {active['total_cost'] / 1000:.1f} مليار",
             "📁"
         )
     
     with col2:
         display_metric_card(
             "المشاريع الحرجة",
-            "20",
-            "4% من الإجمالي",
+            f"{critical:,}",
+            f"{critical / max(active['count'], 1):.0%} من الإجمالي",
             "🔴"
         )
     
     with col3:
         display_metric_card(
             "قرارات معلقة",
-            "3",
+            f"{pending:,}",
             "تحتاج موافقة عاجلة",
             "⏳"
         )
@@ -96,99 +94,47 @@ def show():
     
     st.markdown("---")
     
+    # القرارات الراجعة من n8n (تتحدث تلقائياً عند وصولها)
+    st.subheader("📡 آخر قرارات محرك القرارات")
+    show_decision_feed(limit=5)
+    
+    st.markdown("---")
+    
     # قائمة المشاريع المعلقة
     st.subheader("📋 المشاريع المعلقة للقرار")
     
-    for project in projects_pending:
-        status_colors = {
-            'critical': config.COLORS['danger'],
-            'warning': config.COLORS['warning'],
-            'pending': config.COLORS['info']
-        }
-        
-        status_labels = {
-            'critical': '🔴 حرج',
-            'warning': '🟡 يحتاج متابعة',
-            'pending': '🔵 قيد المراجعة'
-        }
-        
-        with st.expander(f"**{project['name']}** - {status_labels[project['status']]}"):
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                st.markdown(f"""
-                    **📌 معرف المشروع:** `{project['id']}`  
-                    **💰 القيمة:** {project['cost']} مليون دولار  
-                    **⚠️ المشكلة:** {project['issue']}
-                """)
-                
-                # SFM Score progress
-                st.markdown("**درجة الجدوى الشاملة:**")
-                st.progress(project['sfm_score'] / 100)
-                st.caption(f"{project['sfm_score']}/100")
-                
-                # Risk Score
-                st.markdown("**درجة المخاطر:**")
-                risk_color = 'normal' if project['risk'] < 60 else 'inverse'
-                st.progress(project['risk'] / 100)
-                st.caption(f"{project['risk']}% - {'مرتفع' if project['risk'] > 60 else 'متوسط'}")
-            
-            with col2:
-                st.markdown("**القرارات المتاحة:**")
-                
-                if st.button("✅ اعتماد", key=f"approve_{project['id']}", use_container_width=True):
-                    st.success(f"تم اعتماد المشروع {project['id']}")
-                    st.balloons()
-                
-                if st.button("⏸️ تجميد", key=f"hold_{project['id']}", use_container_width=True):
-                    st.warning(f"تم تجميد المشروع {project['id']}")
-                
-                if st.button("❌ رفض", key=f"reject_{project['id']}", use_container_width=True):
-                    st.error(f"تم رفض المشروع {project['id']}")
+    show_pending_decisions()
     
     st.markdown("---")
     
-    # Gantt Chart للجدول الزمني
-    st.subheader("📅 الجدول الزمني للمشاريع الحرجة")
-    
-    # بيانات وهمية لـ Gantt
-    df_gantt = pd.DataFrame([
-        dict(Task="مطار إقليمي", Start='2024-03-01', Finish='2026-12-31', Resource='حرج'),
-        dict(Task="محطة طاقة شمسية", Start='2024-06-01', Finish='2026-08-31', Resource='تحذير'),
-        dict(Task="طريق سريع", Start='2024-09-01', Finish='2027-03-31', Resource='مراجعة'),
-    ])
+    # محسن المحفظة
+    show_portfolio_optimizer()
     
-    df_gantt['Start'] = pd.to_datetime(df_gantt['Start'])
-    df_gantt['Finish'] = pd.to_datetime(df_gantt['Finish'])
+    st.markdown("---")
     
-    fig = go.Figure()
+    # Gantt Chart للجدول الزمني
+    st.subheader("📅 الجدول الزمني للمشاريع الحرجة")
     
     colors = {'حرج': config.COLORS['danger'], 
               'تحذير': config.COLORS['warning'], 
-              'مراجعة': config.COLORS['info']}
-    
-    for i, row in df_gantt.iterrows():
-        fig.add_trace(go.Bar(
-            x=[row['Finish'] - row['Start']],
-            y=[row['Task']],
-            base=row['Start'],
-            orientation='h',
-            marker=dict(color=colors[row['Resource']]),
-            name=row['Resource'],
-            showlegend=i == 0,
-            text=row['Resource'],
-            textposition='inside'
-        ))
-    
-    fig.update_layout(
-        title="الجدول الزمني المتوقع",
-        xaxis_title="التاريخ",
-        yaxis_title="",
-        height=400,
-        font={'family': 'Tajawal', 'size': 14}
+              'مراجعة': config.COLORS['info'],
+              'على المسار': config.COLORS['success']}
+    
+    full_schedule = st.toggle("عرض الجدول الكامل لكل المشاريع النشطة")
+    schedule = store.query(
+        ['id', 'name', 'status', 'awaiting_decision', 'start_date', 'finish_date'],
+        statuses=ACTIVE_STATUSES if full_schedule else ['critical'],
+        order_by='start_date'
     )
+    labels = schedule['status'].map(TIMELINE_LABELS)
+    df_gantt = pd.DataFrame({
+        'Task': schedule['id'] + ' - ' + schedule['name'],
+        'Start': schedule['start_date'],
+        'Finish': schedule['finish_date'],
+        'Resource': labels.mask((schedule['status'] == 'on_track') & (schedule['awaiting_decision'] == 1), 'مراجعة')
+    })
     
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(charts.project_timeline(df_gantt, colors), use_container_width=True)
     
     st.markdown("---")
     
@@ -226,4 +172,158 @@ def show():
             st.info(f"📌 مستوى الأولوية: {urgency}/10")
             
             if urgency >= 8:
-                st.warning("⚠️ هذا المشروع يتطلب متابعة يومية")
\ No newline at end of file
+                st.warning("⚠️ هذا المشروع يتطلب متابعة يومية")
+
+
+@st.fragment
+def show_pending_decisions():
+    """
+    قائمة المشاريع المعلقة مع التصفية والتقسيم إلى صفحات
+    
+    التصفية والترتيب والاقتطاع تُنفذ في مستودع المشاريع، فتُقرأ وتُعرض عناصر
+    الصفحة الحالية فقط، وتغيير المرشحات أو الصفحة يعيد تشغيل هذا الجزء وحده.
+    """
+    
+    store = get_project_store()
+    backlog = store.stats(awaiting_decision=True)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        statuses = st.multiselect(
+            "الحالة", list(STATUS_LABELS), default=list(STATUS_LABELS),
+            format_func=STATUS_LABELS.get, key="pending_status"
+        )
+    with col2:
+        risk_bands = st.multiselect("المخاطر", list(RISK_BANDS), default=list(RISK_BANDS), key="pending_risk")
+    with col3:
+        max_cost = int(np.ceil(backlog['max_cost']))
+        # لا نطاق للتصفية إذا لم تكن هناك مشاريع بقيمة موجبة (المنزلق يرفض 0 إلى 0)
+        cost_range = st.slider(
+            "القيمة (مليون دولار)", 0, max_cost, (0, max_cost), key="pending_cost"
+        ) if max_cost > 0 else None
+    
+    filters = dict(
+        awaiting_decision=True,
+        statuses=statuses,
+        risk_ranges=[RISK_BANDS[band] for band in risk_bands],
+        cost_range=cost_range
+    )
+    matches = store.stats(**filters)['count']
+    
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        page_size = st.selectbox("عدد المشاريع في الصفحة", config.PENDING_DECISIONS['page_sizes'], key="pending_page_size")
+    page_count = max(-(-matches // page_size), 1)
+    # تصحيح الصفحة إذا قلّت النتائج بعد التصفية
+    st.session_state["pending_page"] = min(st.session_state.get("pending_page", 1), page_count)
+    with col1:
+        page = st.number_input(f"الصفحة (من {page_count})", 1, page_count, key="pending_page")
+    
+    st.caption(f"{matches:,} مشروع مطابق من {backlog['count']:,} (الأعلى مخاطرة أولاً)")
+    
+    rows = store.query(
+        ['id', 'name', 'status', 'cost', 'sfm_score', 'risk', 'issue'],
+        order_by='risk', descending=True,
+        limit=page_size, offset=(page - 1) * page_size,
+        **filters
+    )
+    for project in rows.to_dict('records'):
+        show_pending_project(project)
+
+
+def show_pending_project(project: dict):
+    """بطاقة مشروع معلق واحد (المفاتيح مبنية على معرف المشروع فتبقى ثابتة بين الصفحات)"""
+    
+    with st.expander(f"**{project['name']}** - {STATUS_LABELS[project['status']]}"):
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            st.markdown(f"""
+                **📌 معرف المشروع:** `{project['id']}`  
+                **💰 القيمة:** {project['cost']:g} مليون دولار  
+                **⚠️ المشكلة:** {project['issue']}
+            """)
+            
+            # SFM Score progress
+            st.markdown("**درجة الجدوى الشاملة:**")
+            st.progress(project['sfm_score'] / 100)
+            st.caption(f"{project['sfm_score']:.0f}/100")
+            
+            # Risk Score
+            st.markdown("**درجة المخاطر:**")
+            st.progress(project['risk'] / 100)
+            st.caption(f"{project['risk']}% - {'مرتفع' if project['risk'] > 60 else 'متوسط'}")
+        
+        with col2:
+            st.markdown("**القرارات المتاحة:**")
+            
+            if st.button("✅ اعتماد", key=f"approve_{project['id']}", use_container_width=True):
+                st.success(f"تم اعتماد المشروع {project['id']}")
+                st.balloons()
+            
+            if st.button("⏸️ تجميد", key=f"hold_{project['id']}", use_container_width=True):
+                st.warning(f"تم تجميد المشروع {project['id']}")
+            
+            if st.button("❌ رفض", key=f"reject_{project['id']}", use_container_width=True):
+                st.error(f"تم رفض المشروع {project['id']}")
+
+
+def show_portfolio_optimizer():
+    """عرض محسن المحفظة تحت سقف الميزانية"""
+    
+    st.subheader("🧮 محسن المحفظة الاستثمارية")
+    
+    # المرشحون هم المشاريع التي تنتظر قراراً في مستودع المشاريع
+    candidates = get_project_store().query(
+        ['id', 'name', 'sector', 'cost', 'sfm_score', 'risk'],
+        order_by='sfm_score', descending=True,
+        awaiting_decision=True
+    )
+    if candidates.empty:
+        st.info("لا توجد مشاريع بانتظار القرار")
+        return
+    st.caption(f"{len(candidates):,} مشروع مرشح بانتظار القرار")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        budget = st.number_input("سقف الميزانية (مليون دولار)", min_value=100.0, max_value=50000.0, value=5000.0, step=100.0)
+        objective = st.radio("الهدف", list(OBJECTIVES), format_func=OBJECTIVES.get, horizontal=True)
+    
+    with col2:
+        max_avg_risk = st.slider("سقف متوسط المخاطر (%)", 10, 80, 45)
+        sector_minimum = st.slider("الحد الأدنى من المشاريع لكل قطاع", 0, 10, 2)
+    
+    with col3:
+        time_limit = st.slider("مهلة البحث (ثوانٍ)", 1, 10, 3)
+    
+    if st.button("⚙️ حساب المحفظة المثلى", use_container_width=True):
+        result = optimize_portfolio(
+            candidates,
+            budget,
+            objective=objective,
+            sector_minimums={sector: sector_minimum for sector in candidates['sector'].unique()},
+            max_avg_risk=max_avg_risk,
+            time_limit=time_limit
+        )
+        
+        if not result['feasible']:
+            st.error("❌ لا توجد محفظة تستوفي القيود المحددة")
+            return
+        
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("المشاريع المختارة", len(result['selected']))
+        col2.metric("مجموع SFM", f"{result['total_sfm']:.0f}")
+        col3.metric("التكلفة", f"{result['total_cost']:,.0f} مليون")
+        col4.metric("متوسط المخاطر", f"{result['avg_risk']:.1f}%")
+        
+        if result['optimal']:
+            st.success(f"✅ حل أمثل مُثبت خلال {result['elapsed']:.2f} ثانية ({result['nodes']:,} عقدة)")
+        else:
+            st.warning(f"⏱️ أفضل حل خلال المهلة - فجوة الأمثلية لا تتجاوز {result['gap']:.2%}")
+        
+        st.dataframe(
+            candidates.loc[result['selected']].sort_values('sfm_score', ascending=False),
+            use_container_width=True,
+            hide_index=True
+        )
\ No newline at end of file
@@ -3,18 +3,35 @@
 """
 
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
+import time
 from datetime import datetime
+import charts
 import config
+from finance import evaluate_cash_flows
+from gate_analysis import get_pass_surface, minimum_change_to_pass, simulate_gate_2, whole_step_changes
+from gate_pipeline import GatePipeline
+from gate_rules import gate_thresholds
 from utils import (
     calculate_sfm_score,
     check_gate_2_conditions,
-    send_to_n8n_webhook,
-    show_loading_animation
+    dispatch_to_n8n_webhook,
+    get_n8n_circuit_status,
+    get_webhook_response_cache,
+    format_duration,
+    get_webhook_outbox,
+    StageProgress
 )
 
+# مفاتيح الشرائح في حالة الجلسة (مشتركة بين جزء الدرجات وجزء التحليل)
+SCORE_KEYS = {
+    'economic_score': 'gate_sim_economic',
+    'social_score': 'gate_sim_social',
+    'environmental_score': 'gate_sim_environmental',
+    'risk_score': 'gate_sim_risk',
+    'sustainability_score': 'gate_sim_sustainability'
+}
+
 def show():
     """عرض صفحة محاكي البوابات"""
     
@@ -72,17 +89,46 @@ def show():
             help="المدة الزمنية المتوقعة لإنجاز المشروع"
         )
         
-        npv = st.number_input(
-            "صافي القيمة الحالية (مليون دولار)",
-            min_value=-100.0,
-            max_value=500.0,
-            value=8.5,
-            step=0.1,
-            help="NPV المحسوب من دراسة الجدوى المالية"
+        npv_from_cash_flows = st.toggle(
+            "🧮 حساب NPV من التدفقات النقدية",
+            help="حساب NPV و IRR وفترة الاسترداد من جدول التدفقات بدلاً من الإدخال اليدوي"
         )
+        
+        if not npv_from_cash_flows:
+            npv = st.number_input(
+                "صافي القيمة الحالية (مليون دولار)",
+                min_value=-100.0,
+                max_value=500.0,
+                value=8.5,
+                step=0.1,
+                help="NPV المحسوب من دراسة الجدوى المالية"
+            )
+    
+    if npv_from_cash_flows:
+        npv = show_cash_flow_editor(project_cost)
+    
+    st.markdown("---")
+    
+    # الدرجات والرسوم ومسار البوابات تُعاد وحدها عند تحريك الشرائح
+    show_scores(project_sector, project_cost, npv)
     
     st.markdown("---")
     
+    # التحليل يُعاد وحده عند الضغط على زر التحليل
+    show_analysis(project_name, project_cost, project_location, project_sector, project_duration, npv)
+
+
+@st.fragment
+def show_scores(project_sector: str, project_cost: float, npv: float):
+    """
+    مؤشرات الأداء والجدوى (جزء يُعاد تشغيله وحده)
+    
+    تغيير أي شريحة يعيد هذا الجزء فقط: الشارات ومؤشر SFM والرسوم والمسافة
+    إلى الاجتياز ومسار البوابات، دون نموذج المشروع أو قسم التحليل. لوحة
+    عدم اليقين ومسار البوابات جزءان مستقلان داخله، فتغيير مدخلاتهما يعيد
+    كلاً منهما وحده دون الشرائح والرسوم.
+    """
+    
     # مؤشرات الأداء (Sliders)
     st.subheader("📊 مؤشرات الأداء والجدوى")
     
@@ -99,6 +145,7 @@ def show():
         economic_score = st.slider(
             "الدرجة الاقتصادية",
             0, 100, 75,
+            key=SCORE_KEYS['economic_score'],
             help="تقييم الجدوى المالية والعائد الاقتصادي"
         )
         st.progress(economic_score / 100)
@@ -108,6 +155,7 @@ def show():
         social_score = st.slider(
             "الدرجة الاجتماعية",
             0, 100, 65,
+            key=SCORE_KEYS['social_score'],
             help="تقييم الأثر على المجتمع وفرص العمل والخدمات"
         )
         st.progress(social_score / 100)
@@ -117,6 +165,7 @@ def show():
         environmental_score = st.slider(
             "الدرجة البيئية",
             0, 100, 55,
+            key=SCORE_KEYS['environmental_score'],
             help="تقييم الأثر البيئي والاستدامة"
         )
         st.progress(environmental_score / 100)
@@ -130,6 +179,7 @@ def show():
         risk_score = st.slider(
             "نسبة المخاطر (%)",
             0, 100, 45,
+            key=SCORE_KEYS['risk_score'],
             help="تقييم شامل للمخاطر (فني، مالي، تشغيلي)"
         )
         
@@ -149,206 +199,470 @@ def show():
         sustainability_score = st.slider(
             "نسبة الاستدامة (%)",
             0, 100, 60,
+            key=SCORE_KEYS['sustainability_score'],
             help="SIM Score - تقييم شامل للاستدامة"
         )
         
         # لون ديناميكي بناءً على الاستدامة
-sust_color = config.COLORS['danger'] if sustainability_score < 40 else (
-config.COLORS['warning'] if sustainability_score < 70 else config.COLORS['success']
-)
-st.markdown(f"""
-<div style="background: {sust_color}; color: white; padding: 10px; 
-                     border-radius: 5px; text-align: center; font-weight: bold;">
-{sustainability_score}% - {'ضعيف' if sustainability_score < 40 else ('مقبول' if sustainability_score < 70 else 'ممتاز')}
-</div>
-""", unsafe_allow_html=True)
-st.markdown("---")
+        sust_color = config.COLORS['danger'] if sustainability_score < 40 else (
+            config.COLORS['warning'] if sustainability_score < 70 else config.COLORS['success']
+        )
+        st.markdown(f"""
+            <div style="background: {sust_color}; color: white; padding: 10px; 
+                        border-radius: 5px; text-align: center; font-weight: bold;">
+            {sustainability_score}% - {'ضعيف' if sustainability_score < 40 else ('مقبول' if sustainability_score < 70 else 'ممتاز')}
+            </div>
+        """, unsafe_allow_html=True)
+    st.markdown("---")
 
-# حساب SFM Score
-sfm_score = calculate_sfm_score(economic_score, social_score, environmental_score)
+    # حساب SFM Score
+    sfm_score = calculate_sfm_score(economic_score, social_score, environmental_score)
+    
+    # حدود البوابة الثانية بعد استثناءات القطاع (نفس حدود مسار البوابات)
+    thresholds = gate_thresholds('gate_2', project_sector)
 
-# عرض الدرجة المركبة
-st.subheader("📈 درجة الجدوى الشاملة (SFM Score)")
+    # عرض الدرجة المركبة
+    st.subheader("📈 درجة الجدوى الشاملة (SFM Score)")
 
-col1, col2, col3 = st.columns([1, 2, 1])
+    col1, col2, col3 = st.columns([1, 2, 1])
 
-with col2:
-    # Gauge chart لعرض SFM Score
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number+delta",
-        value=sfm_score,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': "الدرجة المركبة", 'font': {'size': 20}},
-        delta={'reference': 60, 'increasing': {'color': config.COLORS['success']}},
-        gauge={
-            'axis': {'range': [None, 100], 'tickwidth': 1, 'tickcolor': config.COLORS['dark']},
-            'bar': {'color': config.COLORS['primary']},
-            'bgcolor': "white",
-            'borderwidth': 2,
-            'bordercolor': config.COLORS['dark']},
-            'steps': [
-                {'range': [0, 40], 'color': config.COLORS['danger']},
-                {'range': [40, 60], 'color': config.COLORS['warning']},
-                {'range': [60, 100], 'color': config.COLORS['success']}
-            ],
-            'threshold': {
-                'line': {'color': config.COLORS['secondary'], 'width': 4},
-                'thickness': 0.75,
-                'value': 60
-            }
-        }
-    ))
-    
-    fig.update_layout(
-        height=300,
-        margin=dict(l=20, r=20, t=50, b=20),
-        font={'family': 'Tajawal', 'color': config.COLORS['dark'], 'size': 14}
+    with col2:
+        # Gauge chart لعرض SFM Score
+        st.plotly_chart(
+            charts.sfm_gauge(sfm_score, thresholds['min_sfm_score']),
+            use_container_width=True
+        )
+
+    # عرض توزيع الدرجات
+    st.subheader("📊 توزيع الجدوى الثلاثي")
+
+    st.plotly_chart(
+        charts.sfm_distribution(economic_score, social_score, environmental_score),
+        use_container_width=True
     )
-    
-    st.plotly_chart(fig, use_container_width=True)
 
-# عرض توزيع الدرجات
-st.subheader("📊 توزيع الجدوى الثلاثي")
+    # المسافة إلى الاجتياز (بحث فوري في السطح المحسوب مسبقاً)
+    show_distance_to_pass(
+        economic_score, social_score, environmental_score,
+        risk_score, sustainability_score, npv, thresholds
+    )
 
-df_sfm = pd.DataFrame({
-    'المحور': ['اقتصادي', 'اجتماعي', 'بيئي'],
-    'الدرجة': [economic_score, social_score, environmental_score],
-    'الوزن': [
-        config.SFM_WEIGHTS['economic'] * 100,
-        config.SFM_WEIGHTS['social'] * 100,
-        config.SFM_WEIGHTS['environmental'] * 100
-    ]
-})
+    # وضع عدم اليقين
+    show_uncertainty_mode(
+        economic_score, social_score, environmental_score,
+        risk_score, sustainability_score, npv, thresholds
+    )
 
-fig = px.bar(
-    df_sfm,
-    x='المحور',
-    y='الدرجة',
-    color='المحور',
-    text='الدرجة',
-    color_discrete_sequence=[config.COLORS['primary'], config.COLORS['info'], config.COLORS['success']]
-)
+    st.markdown("---")
+
+    # مسار البوابات السبع
+    show_gate_pipeline({
+        'project_sector': project_sector,
+        'project_cost': project_cost,
+        'npv': npv,
+        'sfm_score': sfm_score,
+        'risk_score': risk_score,
+        'sustainability_score': sustainability_score
+    })
 
-fig.update_traces(texttemplate='%{text}', textposition='outside')
-fig.update_layout(
-    height=400,
-    xaxis_title="",
-    yaxis_title="الدرجة (0-100)",
-    showlegend=False,
-    font={'family': 'Tajawal', 'size': 14}
-)
 
-st.plotly_chart(fig, use_container_width=True)
+def _current_scores() -> dict:
+    """قيم الشرائح الحالية من حالة الجلسة (يقرأها قسم التحليل)"""
+    return {name: st.session_state[key] for name, key in SCORE_KEYS.items()}
 
-st.markdown("---")
 
-# زر التحليل
-if st.button("🔍 تحليل البوابة الثانية (SFM)", type="primary", use_container_width=True):
+@st.fragment
+def show_analysis(project_name: str, project_cost: float, project_location: str,
+                  project_sector: str, project_duration: int, npv: float):
+    """تحليل البوابة الثانية وإرسال القرار (جزء يُعاد تشغيله وحده)"""
     
-    if not project_name:
-        st.error("⚠️ الرجاء إدخال اسم المشروع")
-        return
+    scores = _current_scores()
+    economic_score = scores['economic_score']
+    social_score = scores['social_score']
+    environmental_score = scores['environmental_score']
+    risk_score = scores['risk_score']
+    sustainability_score = scores['sustainability_score']
     
-    # عرض رسالة التحميل
-    with st.spinner("🔄 جاري تحليل البيانات وفحص شروط البوابة..."):
-        show_loading_animation()
+    show_engine_status()
+
+    # زر التحليل
+    if st.button("🔍 تحليل البوابة الثانية (SFM)", type="primary", use_container_width=True):
     
-    # فحص شروط البوابة
-    passed, reason, violations = check_gate_2_conditions(
-        risk_score,
-        sustainability_score,
-        npv,
-        sfm_score
-    )
+        if not project_name:
+            st.error("⚠️ الرجاء إدخال اسم المشروع")
+            return
     
-    # إعداد البيانات للإرسال إلى n8n
-    project_data = {
-        'project_name': project_name,
-        'project_cost': project_cost,
-        'project_location': project_location,
-        'project_sector': project_sector,
-        'project_duration': project_duration,
-        'npv': npv,
-        'economic_score': economic_score,
-        'social_score': social_score,
-        'environmental_score': environmental_score,
-        'sfm_score': sfm_score,
-        'risk_score': risk_score,
-        'sustainability_score': sustainability_score,
-        'gate_2_passed': passed,
-        'timestamp': datetime.now().isoformat()
-    }
+        # مراحل التحليل الفعلية مع قياس زمن كل مرحلة
+        progress = StageProgress({
+            'scoring': 'حساب درجة الجدوى الشاملة (SFM)',
+            'rules': 'فحص شروط البوابة الثانية',
+            'dispatch': 'حفظ القرار وجدولة إرساله إلى محرك القرارات'
+        }, title="🔄 جاري تحليل البيانات وفحص شروط البوابة...")
     
-    # إرسال إلى n8n (إذا كان مفعلاً)
-    with st.spinner("📡 جاري الاتصال بمحرك القرارات..."):
-        n8n_response = send_to_n8n_webhook(project_data)
+        with progress.stage('scoring'):
+            sfm_score = calculate_sfm_score(economic_score, social_score, environmental_score)
     
-    # عرض النتيجة
-    st.markdown("---")
-    st.subheader("📋 نتيجة التحليل")
+        # فحص شروط البوابة (بحدود القطاع)
+        with progress.stage('rules'):
+            thresholds = gate_thresholds('gate_2', project_sector)
+            passed, reason, violations = check_gate_2_conditions(
+                risk_score,
+                sustainability_score,
+                npv,
+                sfm_score,
+                thresholds
+            )
     
-    if passed:
-        st.markdown(f"""
-            <div class="success-message">
-                ✅ تم اجتياز البوابة الثانية بنجاح!
-            </div>
-        """, unsafe_allow_html=True)
+        with progress.stage('dispatch'):
+            # إعداد البيانات للإرسال إلى n8n
+            project_data = {
+                'project_name': project_name,
+                'project_cost': project_cost,
+                'project_location': project_location,
+                'project_sector': project_sector,
+                'project_duration': project_duration,
+                'npv': npv,
+                'economic_score': economic_score,
+                'social_score': social_score,
+                'environmental_score': environmental_score,
+                'sfm_score': sfm_score,
+                'risk_score': risk_score,
+                'sustainability_score': sustainability_score,
+                'gate_2_passed': passed,
+                'timestamp': datetime.now().isoformat()
+            }
+    
+            # إرسال إلى n8n في الخلفية؛ الاستجابة يعرضها جزء دوري عند وصولها
+            st.session_state.pop('n8n_result', None)
+            st.session_state['n8n_dispatch'] = {
+                'future': dispatch_to_n8n_webhook(project_data),
+                'started': time.perf_counter()
+            }
+    
+        progress.complete()
+    
+        # عرض النتيجة
+        st.markdown("---")
+        st.subheader("📋 نتيجة التحليل")
+    
+        if passed:
+            st.markdown(f"""
+                <div class="success-message">
+                    ✅ تم اجتياز البوابة الثانية بنجاح!
+                </div>
+            """, unsafe_allow_html=True)
         
-        st.balloons()
+            st.balloons()
         
-        st.success(reason)
+            st.success(reason)
         
-        # عرض التفاصيل
-        with st.expander("📊 تفاصيل التقييم"):
-            col1, col2 = st.columns(2)
+            # عرض التفاصيل
+            with st.expander("📊 تفاصيل التقييم"):
+                col1, col2 = st.columns(2)
             
-            with col1:
-                st.metric("درجة SFM", f"{sfm_score}/100", "جيد جداً ✓")
-                st.metric("صافي القيمة الحالية", f"{npv} مليون", "موجب ✓")
+                with col1:
+                    st.metric("درجة SFM", f"{sfm_score}/100", "جيد جداً ✓")
+                    st.metric("صافي القيمة الحالية", f"{npv} مليون", "موجب ✓")
             
-            with col2:
-                st.metric("درجة المخاطر", f"{risk_score}%", "مقبول ✓")
-                st.metric("درجة الاستدامة", f"{sustainability_score}%", "مقبول ✓")
+                with col2:
+                    st.metric("درجة المخاطر", f"{risk_score}%", "مقبول ✓")
+                    st.metric("درجة الاستدامة", f"{sustainability_score}%", "مقبول ✓")
         
-        # الخطوات التالية
-        st.info("""
-            **📌 الخطوات التالية:**
-            1. الانتقال إلى البوابة الثالثة (التصميم المعتمد)
-            2. إعداد نموذج BIM بمستوى LOD 300
-            3. تحليل GIS المتقدم للموقع
-            4. إعداد وثائق المناقصة
-        """)
+            # الخطوات التالية
+            st.info("""
+                **📌 الخطوات التالية:**
+                1. الانتقال إلى البوابة الثالثة (التصميم المعتمد)
+                2. إعداد نموذج BIM بمستوى LOD 300
+                3. تحليل GIS المتقدم للموقع
+                4. إعداد وثائق المناقصة
+            """)
         
-    else:
-        st.markdown(f"""
-            <div class="danger-message">
-                ❌ فشل المشروع في اجتياز البوابة الثانية
-            </div>
-        """, unsafe_allow_html=True)
+        else:
+            st.markdown(f"""
+                <div class="danger-message">
+                    ❌ فشل المشروع في اجتياز البوابة الثانية
+                </div>
+            """, unsafe_allow_html=True)
+        
+            st.error(reason)
         
-        st.error(reason)
+            # عرض الانتهاكات
+            with st.expander("⚠️ تفاصيل الانتهاكات"):
+                for violation in violations:
+                    st.warning(violation)
         
-        # عرض الانتهاكات
-        with st.expander("⚠️ تفاصيل الانتهاكات"):
-            for violation in violations:
-                st.warning(violation)
+            # أقل تغيير مطلوب للاجتياز
+            change = whole_step_changes(
+                minimum_change_to_pass(pd.DataFrame([project_data]), thresholds=thresholds)
+            ).iloc[0]
+            change_labels = {
+                'delta_economic': '💰 الدرجة الاقتصادية',
+                'delta_social': '👥 الدرجة الاجتماعية',
+                'delta_environmental': '🌱 الدرجة البيئية',
+                'delta_risk': '⚠️ درجة المخاطر',
+                'delta_sustainability': '🌿 درجة الاستدامة',
+                'delta_npv': '💵 صافي القيمة الحالية'
+            }
+            with st.expander("🎯 أقل تغيير مطلوب للاجتياز", expanded=True):
+                for column, label in change_labels.items():
+                    if change[column]:
+                        st.markdown(f"- {label}: **{change[column]:+d}**")
+            
+            # التوصيات
+            st.info("""
+                **💡 التوصيات:**
+                - مراجعة دراسة الجدوى وتحسين المحاور الضعيفة
+                - إعادة تصميم المشروع لتقليل المخاطر
+                - تحسين معايير الاستدامة
+                - التشاور مع لجنة الاستثناءات في حالات الضرورة القصوى
+            """)
+    
+        st.caption(f"⏱️ التحليل: {format_duration(progress.total)}")
+        show_n8n_response()
+
+
+@st.fragment(run_every=config.N8N_DISPATCH['poll_interval'])
+def show_n8n_response():
+    """استجابة محرك القرارات لآخر إرسال (جزء دوري يفحص وصولها دون حجب الصفحة)"""
+    
+    dispatch = st.session_state.get('n8n_dispatch')
+    if dispatch is not None:
+        future = dispatch['future']
+        if not future.done():
+            waited = time.perf_counter() - dispatch['started']
+            if waited < config.N8N_DISPATCH['wait_timeout']:
+                st.info(f"📡 جاري الاتصال بمحرك القرارات... ({waited:.0f} ث)")
+            else:
+                st.info("📡 انتهت مهلة الانتظار، سيصل الرد من محرك القرارات لاحقاً")
+            return
         
-        # التوصيات
-        st.info("""
-            **💡 التوصيات:**
-            - مراجعة دراسة الجدوى وتحسين المحاور الضعيفة
-            - إعادة تصميم المشروع لتقليل المخاطر
-            - تحسين معايير الاستدامة
-            - التشاور مع لجنة الاستثناءات في حالات الضرورة القصوى
-        """)
-    
-    # عرض استجابة n8n
+        # النتيجة تُثبَّت عند أول فحص يجدها جاهزة ويخرج الإرسال من حالة الفحص،
+        # فالدورات التالية تعيد عرضها فقط دون المستقبل أو صندوق الصادر
+        n8n_response = future.result()
+        st.session_state['n8n_result'] = {
+            'response': n8n_response,
+            'waited': time.perf_counter() - dispatch['started'],
+            'pending': None if n8n_response['success'] else get_webhook_outbox().pending_count()
+        }
+        del st.session_state['n8n_dispatch']
+    
+    result = st.session_state.get('n8n_result')
+    if result is None:
+        return
+    n8n_response = result['response']
+    
+    st.caption(f"⏱️ انتظار محرك القرارات: {format_duration(result['waited'])}")
     if n8n_response['success']:
         with st.expander("🔗 استجابة محرك القرارات (n8n)"):
+            if n8n_response.get('cached'):
+                st.caption("♻️ نفس البيانات أُرسلت مسبقاً، تُعرض الاستجابة المحفوظة")
             st.json(n8n_response['data'])
     else:
         with st.expander("⚠️ ملاحظة: محرك القرارات غير متصل"):
             st.warning(f"لم يتم الاتصال بـ n8n: {n8n_response['message']}")
-            st.info("💡 لتفعيل الاتصال، يُرجى إعداد Webhook في n8n وتحديث الرابط في ملف config.py")---
+            if n8n_response.get('circuit_open'):
+                st.caption("⚡ تم تخطي الاتصال فوراً لأن قاطع الدائرة مفتوح")
+            st.caption(f"📦 القرار محفوظ محلياً وسيُعاد إرساله تلقائياً ({result['pending']} في الانتظار)")
+            st.info("💡 لتفعيل الاتصال، يُرجى إعداد Webhook في n8n وتحديث الرابط في ملف config.py")
+
+
+def show_engine_status():
+    """حالة الاتصال بمحرك القرارات (قاطع الدائرة) ونسبة إصابة ذاكرة الاستجابات"""
+    
+    status = get_n8n_circuit_status()
+    icons = {'closed': '🟢', 'open': '🔴', 'half_open': '🟡'}
+    text = f"{icons[status['state']]} محرك القرارات (n8n): {status['label']}"
+    if status['state'] == 'open':
+        text += f" — إعادة الفحص خلال {status['retry_in']:.0f} ث"
+    elif status['failures']:
+        text += f" — إخفاقات متتالية: {status['failures']}"
+    cache = get_webhook_response_cache().stats()
+    if cache['hits'] + cache['misses']:
+        text += f" | ♻️ الاستجابات المُعاد استخدامها: {cache['hit_rate']:.0%}"
+    st.caption(text)
+
+
+def _default_cash_flows(project_cost: float) -> pd.DataFrame:
+    """تدفقات افتراضية: التكلفة في السنة صفر ثم 15% منها سنوياً لعشر سنوات"""
+    return pd.DataFrame({
+        'السنة': list(range(11)),
+        'التدفق النقدي': [-project_cost] + [round(project_cost * 0.15, 2)] * 10
+    })
+
+def show_cash_flow_editor(project_cost: float) -> float:
+    """جدول التدفقات النقدية وحساب NPV منه"""
+    
+    st.markdown("**🧮 التدفقات النقدية السنوية (مليون دولار)**")
+    
+    col1, col2 = st.columns([3, 1])
+    
+    # الجدول الأساسي يُبنى مرة واحدة ويبقى ثابتاً في الجلسة، فتبقى تعديلات
+    # المستخدم (المحفوظة تحت مفتاح المحرر) عند تغيير التكلفة
+    if 'cash_flow_base' not in st.session_state:
+        st.session_state['cash_flow_base'] = _default_cash_flows(project_cost)
+    
+    with col2:
+        discount_rate = st.number_input(
+            "معدل الخصم (%)",
+            min_value=0.0,
+            max_value=50.0,
+            value=8.0,
+            step=0.5
+        )
+        if st.button("↺ من التكلفة", help="إعادة بناء التدفقات من تكلفة المشروع الحالية"):
+            st.session_state['cash_flow_base'] = _default_cash_flows(project_cost)
+            st.session_state.pop('cash_flow_editor', None)
+    
+    with col1:
+        flows = st.data_editor(
+            st.session_state['cash_flow_base'],
+            key='cash_flow_editor',
+            num_rows="dynamic",
+            hide_index=True,
+            use_container_width=True,
+            disabled=['السنة']
+        )
+    
+    if flows.empty:
+        st.info("أضف سنة واحدة على الأقل لحساب صافي القيمة الحالية")
+        return 0.0
+    
+    cash_flows = flows['التدفق النقدي'].fillna(0).to_numpy()
+    valuation = evaluate_cash_flows([cash_flows], discount_rate / 100).iloc[0]
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("صافي القيمة الحالية", f"{valuation['npv']:.2f} مليون")
+    col2.metric("معدل العائد الداخلي", "—" if pd.isna(valuation['irr']) else f"{valuation['irr']:.1%}")
+    col3.metric("فترة الاسترداد", "—" if pd.isna(valuation['payback_period']) else f"{valuation['payback_period']:.1f} سنة")
+    
+    return round(float(valuation['npv']), 2)
+
+def show_distance_to_pass(economic_score, social_score, environmental_score,
+                          risk_score, sustainability_score, npv, thresholds):
+    """عرض أقل تغيير مطلوب في كل محور لاجتياز البوابة الثانية"""
+    
+    surface = get_pass_surface(thresholds)
+    distances = surface.distance_to_pass(
+        economic_score, social_score, environmental_score,
+        risk_score, sustainability_score, npv
+    )
+    
+    st.subheader("📏 المسافة إلى الاجتياز")
+    
+    labels = {
+        'economic': '💰 اقتصادي',
+        'social': '👥 اجتماعي',
+        'environmental': '🌱 بيئي',
+        'risk': '⚠️ المخاطر',
+        'sustainability': '🌿 الاستدامة',
+        'npv': '💵 NPV'
+    }
+    
+    cols = st.columns(len(labels))
+    for col, (axis, label) in zip(cols, labels.items()):
+        distance = distances[axis]
+        if distance is None:
+            col.metric(label, "غير ممكن")
+        elif distance == 0:
+            col.metric(label, "✓ مستوفٍ")
+        else:
+            col.metric(label, f"{distance:+g}")
 
- (`decision_center.py`, `live_report.py`, `app.py`) + دليل إعداد n8n Webhook...
\ No newline at end of file
+@st.fragment
+def show_uncertainty_mode(economic_score, social_score, environmental_score,
+                          risk_score, sustainability_score, npv, thresholds):
+    """عرض احتمال اجتياز البوابة الثانية تحت عدم اليقين (جزء يُعاد تشغيله وحده)"""
+    
+    if not st.toggle("🎲 وضع عدم اليقين (Monte Carlo)", help="معاملة الدرجات وNPV كتوزيعات بدلاً من قيم دقيقة"):
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        score_std = st.slider("عدم اليقين في الدرجات (± نقاط)", 0.0, 20.0, 5.0, 0.5)
+    with col2:
+        npv_std = st.slider("عدم اليقين في NPV (± مليون)", 0.0, 50.0, max(round(abs(npv) * 0.2, 1), 1.0), 0.5)
+    with col3:
+        n_samples = st.select_slider("عدد العينات", [100_000, 200_000, 500_000, 1_000_000], 200_000)
+    
+    result = simulate_gate_2(
+        economic_score, social_score, environmental_score,
+        risk_score, sustainability_score, npv,
+        score_std=score_std, npv_std=npv_std, n_samples=n_samples,
+        thresholds=thresholds
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("احتمال الاجتياز", f"{result['pass_probability']:.1%}")
+    col2.metric("نطاق SFM (5%-95%)", f"{result['sfm_p05']:.1f} - {result['sfm_p95']:.1f}")
+    col3.metric("السبب الأكثر للفشل", result['dominant_violation'] or "—")
+    
+    st.plotly_chart(
+        charts.monte_carlo_histogram(
+            tuple(result['failure_shares']),
+            tuple(float(share) for share in result['failure_shares'].values())
+        ),
+        use_container_width=True
+    )
+
+@st.fragment
+def show_gate_pipeline(project: dict):
+    """عرض مسار البوابات السبع للمشروع الحالي (جزء يُعاد تشغيله وحده)"""
+    
+    st.subheader("🧭 مسار البوابات السبع")
+    
+    # المسار محفوظ في الجلسة ليعيد استخدام نتائج البوابات التي لم تتغير مدخلاتها
+    if 'gate_pipeline' not in st.session_state:
+        st.session_state['gate_pipeline'] = GatePipeline()
+    pipeline = st.session_state['gate_pipeline']
+    
+    with st.expander("📝 مدخلات البوابات الأخرى"):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            project['strategic_alignment'] = st.slider("المواءمة الاستراتيجية (%)", 0, 100, 70)
+            project['bim_lod'] = st.selectbox("مستوى نموذج BIM (LOD)", [100, 200, 300, 350, 400, 500], index=2)
+            project['gis_readiness'] = st.slider("جاهزية تحليل GIS (%)", 0, 100, 65)
+            project['funding_secured'] = st.slider("التمويل المؤمَّن (%)", 0, 100, 85)
+        
+        with col2:
+            project['procurement_readiness'] = st.slider("جاهزية وثائق المناقصة (%)", 0, 100, 70)
+            project['schedule_variance'] = st.slider("الانحراف الزمني (%)", 0, 100, 5)
+            project['cost_variance'] = st.slider("تجاوز الميزانية (%)", 0, 100, 4)
+        
+        with col3:
+            project['handover_readiness'] = st.slider("جاهزية التسليم (%)", 0, 100, 75)
+            project['quality_score'] = st.slider("درجة الجودة (%)", 0, 100, 80)
+            project['benefits_realization'] = st.slider("تحقق المنافع (%)", 0, 100, 60)
+    
+    result = pipeline.run(project)
+    
+    cols = st.columns(len(config.GATE_RULES))
+    for col, gate_id in zip(cols, config.GATE_RULES):
+        stage = next((s for s in result.stages if s.gate_id == gate_id), None)
+        if stage is None:
+            icon, color = "⏸️", config.COLORS['light']
+        elif stage.passed:
+            icon, color = "✅", config.COLORS['success']
+        elif stage.hard_failed:
+            icon, color = "❌", config.COLORS['danger']
+        else:
+            icon, color = "⚠️", config.COLORS['warning']
+        
+        with col:
+            st.markdown(f"""
+                <div style="background: {color}; color: white; padding: 10px; 
+                            border-radius: 5px; text-align: center; font-size: 0.85em;">
+                    {icon}<br>{config.GATE_RULES[gate_id]['title']}
+                </div>
+            """, unsafe_allow_html=True)
+    
+    if result.stopped_at:
+        st.error(f"⛔ توقف المسار عند {config.GATE_RULES[result.stopped_at]['title']}")
+    elif result.passed:
+        st.success("✅ اجتاز المشروع البوابات السبع")
+    
+    for stage in result.stages:
+        for violation in stage.violations:
+            st.warning(f"{stage.title} — {violation}")
+    
+    st.caption(f"♻️ نتائج مُعاد استخدامها: {pipeline.hits} | محسوبة: {pipeline.misses}")
\ No newline at end of file
@@ -3,22 +3,34 @@
 """
 
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import config
+from datetime import datetime
+import charts
+from gate_analysis import nearest_to_pass, whole_step_changes
+from project_store import ACTIVE_STATUSES, GATE_2_COLUMNS, SECTORS
+from utils import get_portfolio_snapshot, show_decision_feed
+
+# تسميات الحالات في رسم التوزيع
+PIE_STATUSES = {
+    'on_track': 'On Track',
+    'at_risk': 'At Risk',
+    'critical': 'Critical',
+    'completed': 'Completed'
+}
 
 def show():
     """عرض صفحة تقرير الأداء الحي"""
     
     st.title("📈 تقرير الأداء الحي")
     
+    snapshot = get_portfolio_snapshot()
+    
     # تاريخ ووقت التحديث
     st.markdown(f"""
         <div style="text-align: left; color: gray; font-size: 0.9em;">
             آخر تحديث: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+            — بيانات المحفظة: {datetime.fromisoformat(snapshot.published_at).strftime('%Y-%m-%d %H:%M')}
         </div>
     """, unsafe_allow_html=True)
     
@@ -27,9 +39,11 @@ def show():
     
     col1, col2, col3, col4, col5 = st.columns(5)
     
+    active = snapshot.stats(ACTIVE_STATUSES)
+    
     metrics_data = [
-        ("إجمالي المشاريع", "487", "+23", "📁"),
-        ("القيمة الإجمالية", "28.5 مليار", "+2.1 مليار", "💰"),
+        ("إجمالي المشاريع", f"{active['count']:,}", "+23", "📁"),
+        ("القيمة الإجمالية", f"{active['total_cost'] / 1000:.1f} مليار", "+2.1 مليار", "💰"),
         ("معدل الإنجاز", "68%", "+5%", "⚙️"),
         ("الوفورات", "180 مليون", "+15 مليون", "💎"),
         ("معدل النجاح", "87%", "+12%", "✅")
@@ -42,125 +56,55 @@ def show():
     
     st.markdown("---")
     
+    # القرارات الراجعة من n8n (تتحدث تلقائياً عند وصولها)
+    st.subheader("📡 قرارات محرك القرارات")
+    show_decision_feed()
+    
+    st.markdown("---")
+    
     # توزيع المشاريع حسب الحالة
+    status_counts = snapshot.count_by('status')
+    sector_counts = snapshot.count_by('sector', ACTIVE_STATUSES)
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📌 توزيع المشاريع حسب الحالة")
         
-        status_data = pd.DataFrame({
-            'الحالة': ['On Track', 'At Risk', 'Critical', 'Completed'],
-            'العدد': [385, 82, 20, 350],
-            'النسبة': [79, 17, 4, 100]
-        })
-        
-        fig = px.pie(
-            status_data,
-            values='العدد',
-            names='الحالة',
-            color='الحالة',
-            color_discrete_map={
-                'On Track': config.COLORS['success'],
-                'At Risk': config.COLORS['warning'],
-                'Critical': config.COLORS['danger'],
-                'Completed': config.COLORS['info']
-            },
-            hole=0.4
-        )
-        
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        fig.update_layout(
-            height=400,
-            font={'family': 'Tajawal', 'size': 14},
-            showlegend=True
+        st.plotly_chart(
+            charts.status_pie(
+                tuple(PIE_STATUSES.values()),
+                tuple(status_counts.get(status, 0) for status in PIE_STATUSES)
+            ),
+            use_container_width=True
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.subheader("🏗️ توزيع المشاريع حسب القطاع")
         
-        sector_data = pd.DataFrame({
-            'القطاع': ['الصحة', 'التعليم', 'البنية التحتية', 'الإسكان', 'الطاقة'],
-            'العدد': [95, 120, 180, 65, 27],
-            'الميزانية': [4.2, 3.8, 12.5, 5.3, 2.7]
-        })
-        
-        fig = px.bar(
-            sector_data,
-            x='القطاع',
-            y='العدد',
-            text='العدد',
-            color='القطاع',
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        
-        fig.update_traces(texttemplate='%{text}', textposition='outside')
-        fig.update_layout(
-            height=400,
-            xaxis_title="",
-            yaxis_title="عدد المشاريع",
-            showlegend=False,
-            font={'family': 'Tajawal', 'size': 14}
+        st.plotly_chart(
+            charts.sector_bar(tuple(SECTORS), tuple(sector_counts.get(sector, 0) for sector in SECTORS)),
+            use_container_width=True
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
     
     st.markdown("---")
     
     # الأداء الزمني
     st.subheader("📅 الأداء الزمني (آخر 12 شهر)")
     
-    # بيانات وهمية للأداء الشهري
+    # بيانات وهمية للأداء الشهري (ثابتة خلال اليوم حتى يُعاد استخدام الرسم)
     dates = pd.date_range(end=datetime.now(), periods=12, freq='ME')
-    
-    performance_data = pd.DataFrame({
-        'التاريخ': dates,
-        'المشاريع الجديدة': np.random.randint(15, 45, 12),
-        'المشاريع المكتملة': np.random.randint(10, 35, 12),
-        'الانحرافات المكتشفة': np.random.randint(2, 15, 12)
-    })
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Scatter(
-        x=performance_data['التاريخ'],
-        y=performance_data['المشاريع الجديدة'],
-        mode='lines+markers',
-        name='مشاريع جديدة',
-        line=dict(color=config.COLORS['primary'], width=3),
-        marker=dict(size=8)
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=performance_data['التاريخ'],
-        y=performance_data['المشاريع المكتملة'],
-        mode='lines+markers',
-        name='مشاريع مكتملة',
-        line=dict(color=config.COLORS['success'], width=3),
-        marker=dict(size=8)
-    ))
-    
-    fig.add_trace(go.Scatter(
-        x=performance_data['التاريخ'],
-        y=performance_data['الانحرافات المكتشفة'],
-        mode='lines+markers',
-        name='انحرافات مكتشفة',
-        line=dict(color=config.COLORS['danger'], width=3, dash='dash'),
-        marker=dict(size=8)
-    ))
-    
-    fig.update_layout(
-        height=450,
-        xaxis_title="الشهر",
-        yaxis_title="العدد",
-        hovermode='x unified',
-        font={'family': 'Tajawal', 'size': 14},
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    rng = np.random.default_rng(int(datetime.now().strftime('%Y%m%d')))
+    
+    st.plotly_chart(
+        charts.performance_timeline(
+            tuple(dates.strftime('%Y-%m-%d')),
+            tuple(rng.integers(15, 45, 12).tolist()),
+            tuple(rng.integers(10, 35, 12).tolist()),
+            tuple(rng.integers(2, 15, 12).tolist())
+        ),
+        use_container_width=True
     )
     
-    st.plotly_chart(fig, use_container_width=True)
-    
     st.markdown("---")
     
     # أفضل وأسوأ أداء
@@ -169,17 +113,11 @@ def show():
     with col1:
         st.subheader("🏆 أفضل 5 مشاريع أداءً")
         
-        top_projects = pd.DataFrame({
-            'المشروع': [
-                'مستشفى الجنوب',
-                'مدرسة النور',
-                'جسر الوحدة',
-                'محطة تحلية',
-                'مركز رياضي'
-            ],
-            'SFM Score': [92, 89, 87, 85, 83],
-            'الإنجاز': [95, 88, 92, 78, 85]
-        })
+        top_projects = snapshot.top(
+            5, 'sfm_score', ['name', 'sfm_score', 'progress'], ACTIVE_STATUSES
+        ).astype({'sfm_score': int, 'progress': int}).rename(
+            columns={'name': 'المشروع', 'sfm_score': 'SFM Score', 'progress': 'الإنجاز'}
+        )
         
         st.dataframe(
             top_projects,
@@ -190,22 +128,15 @@ def show():
     with col2:
         st.subheader("⚠️ مشاريع تحتاج تدخل")
         
+        bottom_projects = snapshot.top(5, 'risk', ['name', 'issue', 'risk'], ['critical', 'at_risk'])
         bottom_projects = pd.DataFrame({
-            'المشروع': [
-                'مطار الشرق',
-                'طريق الساحل',
-                'مجمع سكني',
-                'محطة كهرباء',
-                'سد مائي'
-            ],
-            'المشكلة': [
-                'تأخير 6 أشهر',
-                'تجاوز ميزانية 15%',
-                'نزاع قانوني',
-                'مخاطر جيولوجية',
-                'نقص مواد'
-            ],
-            'الأولوية': ['🔴 عاجل', '🔴 عاجل', '🟡 متوسط', '🟡 متوسط', '🟢 منخفض']
+            'المشروع': bottom_projects['name'],
+            'المشكلة': bottom_projects['issue'],
+            'الأولوية': np.select(
+                [bottom_projects['risk'] >= 80, bottom_projects['risk'] >= 60],
+                ['🔴 عاجل', '🟡 متوسط'],
+                '🟢 منخفض'
+            )
         })
         
         st.dataframe(
@@ -216,6 +147,32 @@ def show():
     
     st.markdown("---")
     
+    # المشاريع المرفوضة الأقرب للاجتياز
+    st.subheader("🎯 المشاريع المرفوضة الأقرب للاجتياز")
+    
+    candidates = snapshot.select(['name', 'sector', 'risk'] + GATE_2_COLUMNS, ACTIVE_STATUSES)
+    candidates = candidates.rename(columns={'sector': 'project_sector', 'risk': 'risk_score'}).dropna()
+    rejected = nearest_to_pass(candidates)
+    changes = whole_step_changes(rejected)
+    near_misses = pd.DataFrame({
+        'المشروع': rejected['name'],
+        'اقتصادي': changes['delta_economic'],
+        'اجتماعي': changes['delta_social'],
+        'بيئي': changes['delta_environmental'],
+        'المخاطر': changes['delta_risk'],
+        'الاستدامة': changes['delta_sustainability'],
+        'NPV': changes['delta_npv'],
+        'تكلفة التغيير': rejected['total_cost'].round(1)
+    })
+    
+    st.dataframe(
+        near_misses,
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    st.markdown("---")
+    
     # تحميل التقرير
     st.subheader("📥 تصدير التقرير")
     
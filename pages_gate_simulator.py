@@ -1,7 +1,6 @@
 import streamlit as st
 from datetime import datetime
-import config
-from utils import check_gate_2_conditions, send_to_n8n_webhook, show_loading_animation
+from utils import StageProgress, check_gate_2_conditions, send_to_n8n_webhook
 
 def show():
     st.title("🚪 محاكي بوابات العبور الرقمية")
@@ -30,15 +29,22 @@ def show():
     env = c3.slider("بيئي", 0, 100, 70)
 
     if st.button("🚀 تحليل والعبور"):
-        show_loading_animation("جاري الفحص...")
+        progress = StageProgress({
+            'scoring': 'حساب النتيجة',
+            'rules': 'فحص الشروط'
+        }, title="جاري الفحص...")
         
         # حساب النتيجة
-        sfm_val = (eco + soc + env) / 3
+        with progress.stage('scoring'):
+            sfm_val = (eco + soc + env) / 3
         
         # فحص الشروط
-        is_passed, reason, violations = check_gate_2_conditions(
-            risk_score, sustainability, npv, sfm_val
-        )
+        with progress.stage('rules'):
+            is_passed, reason, violations = check_gate_2_conditions(
+                risk_score, sustainability, npv, sfm_val
+            )
+        
+        progress.complete()
         
         st.divider()
         
@@ -0,0 +1,256 @@
+"""
+محسن المحفظة الاستثمارية
+اختيار مجموعة المشاريع التي تعظم مجموع درجات SFM (أو SFM لكل دولار) تحت سقف
+الميزانية، مع حد أدنى لعدد المشاريع في كل قطاع وسقف لمتوسط المخاطر
+"""
+
+import bisect
+import time
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+# سماحية المقارنات العشرية (حتى لا يُرفض مشروع يساوي المتبقي من الميزانية تماماً)
+EPSILON = 1e-9
+
+# الأهداف المدعومة
+OBJECTIVES = {
+    'sfm': 'مجموع درجات SFM',
+    'sfm_per_cost': 'SFM لكل مليون دولار'
+}
+
+
+def _fractional_bound(costs: np.ndarray, values: np.ndarray, budget: float) -> float:
+    """حل الحقيبة الكسرية (Dantzig) كحد أعلى"""
+    keep = values > 0
+    costs, values = costs[keep], values[keep]
+    order = np.argsort(-values / costs)
+    costs, values = costs[order], values[order]
+    cumulative = np.cumsum(costs)
+    k = int(np.searchsorted(cumulative, budget, side='right'))
+    bound = values[:k].sum()
+    if k < len(costs):
+        bound += values[k] * (budget - (cumulative[k - 1] if k else 0.0)) / costs[k]
+    return float(bound)
+
+
+def _risk_multiplier(costs: np.ndarray, values: np.ndarray, slack: np.ndarray, budget: float) -> float:
+    """
+    مضاعف لاغرانج لقيد المخاطر يُصغّر الحد الأعلى (بحث المقطع الذهبي)
+
+    لأي λ ≥ 0 تكون قيمة الحقيبة الكسرية بالقيم v + λ·slack حداً أعلى صالحاً،
+    لأن slack·x ≥ 0 لكل محفظة مقبولة؛ والدالة محدبة في λ.
+    """
+    if not np.any(slack < 0):
+        return 0.0
+    scale = values.mean() / max(np.abs(slack).mean(), EPSILON)
+
+    def bound_at(log_multiplier):
+        return _fractional_bound(costs, values + scale * 10 ** log_multiplier * slack, budget)
+
+    lower, upper = -6.0, 3.0
+    ratio = (np.sqrt(5) - 1) / 2
+    for _ in range(40):
+        a = upper - ratio * (upper - lower)
+        b = lower + ratio * (upper - lower)
+        if bound_at(a) <= bound_at(b):
+            upper = b
+        else:
+            lower = a
+    best = (lower + upper) / 2
+    return 0.0 if _fractional_bound(costs, values, budget) <= bound_at(best) else scale * 10 ** best
+
+
+def _greedy_incumbent(order, costs, values, slack, sectors, needs, budget):
+    """حل ابتدائي سريع: تلبية الحدود الدنيا للقطاعات ثم الملء بترتيب الكثافة"""
+    chosen = np.zeros(len(costs), dtype=bool)
+    budget_left, total_slack = budget, 0.0
+    needs = dict(needs)
+
+    # المشاريع ضمن سقف المخاطر أولاً، ثم البقية إذا لم تكفِ
+    for within_risk_cap in (True, False):
+        for i in order:
+            if (not chosen[i] and needs.get(sectors[i], 0) > 0
+                    and (slack[i] >= 0 or not within_risk_cap)
+                    and costs[i] <= budget_left + EPSILON):
+                chosen[i] = True
+                budget_left -= costs[i]
+                total_slack += slack[i]
+                needs[sectors[i]] -= 1
+    if any(need > 0 for need in needs.values()) or total_slack < -EPSILON:
+        return None
+
+    for i in order:
+        if not chosen[i] and costs[i] <= budget_left + EPSILON and total_slack + slack[i] >= -EPSILON:
+            chosen[i] = True
+            budget_left -= costs[i]
+            total_slack += slack[i]
+    return chosen
+
+
+def optimize_portfolio(
+    projects: pd.DataFrame,
+    budget: float,
+    objective: str = 'sfm',
+    sector_minimums: Optional[Dict[str, int]] = None,
+    max_avg_risk: Optional[float] = None,
+    time_limit: float = 5.0
+) -> Dict[str, Any]:
+    """
+    اختيار أفضل مجموعة مشاريع تحت سقف الميزانية (حقيبة 0/1 بالتفرع والتقييد)
+
+    قيد المخاطر يُرخى بمضاعف لاغرانج، فتُرتب المشاريع حسب القيمة المعدلة لكل
+    دولار، والحد الأعلى لكل فرع هو حل الحقيبة الكسرية (Dantzig) بالقيم المعدلة
+    ويُحسب من المجاميع التراكمية ببحث ثنائي. يُقطع الفرع أيضاً إذا لم تعد
+    الحدود الدنيا للقطاعات أو سقف المخاطر قابلة للتحقيق.
+    عند انتهاء time_limit يُعاد أفضل حل وُجد حتى الآن مع فجوة الأمثلية
+    (وضع anytime للمدخلات الكبيرة جداً).
+
+    Args:
+        projects: جدول بالأعمدة cost, sfm_score, risk, sector
+        budget: سقف الميزانية (بنفس وحدة cost)
+        objective: 'sfm' أو 'sfm_per_cost'
+        sector_minimums: الحد الأدنى لعدد المشاريع المختارة لكل قطاع
+        max_avg_risk: سقف متوسط المخاطر الموزون بالتكلفة للمحفظة (%)
+        time_limit: الحد الأقصى لزمن البحث (ثوانٍ)
+
+    Returns:
+        Dict: المشاريع المختارة (selected كفهرس من projects) والقيمة والتكلفة
+        ومتوسط المخاطر وهل الحل أمثل والفجوة وعدد العقد المستكشفة
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"هدف غير مدعوم: {objective}")
+    sector_minimums = {s: n for s, n in (sector_minimums or {}).items() if n > 0}
+    started = time.perf_counter()
+
+    candidates = projects[projects['cost'] <= budget]
+    costs_all = candidates['cost'].to_numpy(dtype=float)
+    values_all = candidates['sfm_score'].to_numpy(dtype=float)
+    if objective == 'sfm_per_cost':
+        values_all = values_all / costs_all
+
+    # هامش المخاطر: المحفظة مقبولة إذا كان مجموع cost × (السقف - المخاطر) ≥ 0
+    if max_avg_risk is None:
+        slack_all = np.zeros(len(costs_all))
+    else:
+        slack_all = costs_all * (max_avg_risk - candidates['risk'].to_numpy(dtype=float))
+    multiplier = _risk_multiplier(costs_all, values_all, slack_all, budget)
+    adjusted_all = values_all + multiplier * slack_all
+
+    # الترتيب حسب الكثافة المعدلة بالمخاطر (القيمة لكل دولار)
+    order = np.argsort(-adjusted_all / costs_all, kind='stable')
+    costs = costs_all[order]
+    values = values_all[order]
+    adjusted = adjusted_all[order]
+    slack = slack_all[order]
+    sectors = candidates['sector'].to_numpy()[order]
+    n = len(costs)
+    # المشاريع ذات القيمة المعدلة غير الموجبة لا تدخل في الحد الأعلى
+    positive = int(np.searchsorted(-adjusted / costs, 0.0, side='left')) if n else 0
+
+    # المجاميع التراكمية للحد الأعلى، واللاحقة لقطع الفروع
+    prefix_cost = np.concatenate([[0.0], np.cumsum(costs)]).tolist()
+    prefix_adjusted = np.concatenate([[0.0], np.cumsum(adjusted)]).tolist()
+    suffix_slack = np.concatenate([np.cumsum(np.maximum(slack, 0)[::-1])[::-1], [0.0]]).tolist()
+    suffix_sector = {
+        sector: np.concatenate([np.cumsum((sectors == sector)[::-1])[::-1], [0]]).tolist()
+        for sector in sector_minimums
+    }
+    costs_l, values_l, adjusted_l = costs.tolist(), values.tolist(), adjusted.tolist()
+    slack_l, sectors_l = slack.tolist(), sectors.tolist()
+
+    def upper_bound(i, budget_left):
+        if i >= positive:
+            return 0.0
+        limit = prefix_cost[i] + budget_left + EPSILON
+        k = bisect.bisect_right(prefix_cost, limit, lo=i, hi=positive + 1) - 1
+        bound = prefix_adjusted[k] - prefix_adjusted[i]
+        if k < positive:
+            bound += adjusted_l[k] * (limit - prefix_cost[k]) / costs_l[k]
+        return bound
+
+    incumbent = _greedy_incumbent(range(n), costs_l, values_l, slack_l, sectors_l, sector_minimums, budget)
+    best_value = float(values[incumbent].sum()) if incumbent is not None else -np.inf
+    best_chosen = incumbent.copy() if incumbent is not None else None
+    root_bound = upper_bound(0, budget)
+
+    # بحث بالعمق (تضمين أولاً) بمكدس صريح وحالة قابلة للتراجع
+    chosen = np.zeros(n, dtype=bool)
+    needs = dict(sector_minimums)
+    state = {'budget': float(budget), 'value': 0.0, 'slack': 0.0}
+    stack = [(0, 0)]
+    nodes = 0
+    timed_out = False
+
+    while stack:
+        i, stage = stack.pop()
+
+        if stage == 0:
+            nodes += 1
+            if nodes % 2048 == 0 and time.perf_counter() - started > time_limit:
+                timed_out = True
+                break
+            bound = state['value'] + multiplier * state['slack'] + upper_bound(i, state['budget'])
+            if bound <= best_value + EPSILON:
+                continue
+            if state['slack'] + suffix_slack[i] < -EPSILON:
+                continue
+            if any(need > suffix_sector[s][i] for s, need in needs.items() if need > 0):
+                continue
+            if i == n:
+                if (state['value'] > best_value and state['slack'] >= -EPSILON
+                        and all(need <= 0 for need in needs.values())):
+                    best_value = state['value']
+                    best_chosen = chosen.copy()
+                continue
+
+            if costs_l[i] <= state['budget'] + EPSILON:
+                chosen[i] = True
+                state['budget'] -= costs_l[i]
+                state['value'] += values_l[i]
+                state['slack'] += slack_l[i]
+                if sectors_l[i] in needs:
+                    needs[sectors_l[i]] -= 1
+                stack.append((i, 1))
+                stack.append((i + 1, 0))
+            else:
+                stack.append((i + 1, 0))
+
+        elif stage == 1:
+            # التراجع عن التضمين ثم استكشاف فرع الاستبعاد
+            chosen[i] = False
+            state['budget'] += costs_l[i]
+            state['value'] -= values_l[i]
+            state['slack'] -= slack_l[i]
+            if sectors_l[i] in needs:
+                needs[sectors_l[i]] += 1
+            stack.append((i + 1, 0))
+
+    elapsed = time.perf_counter() - started
+
+    if best_chosen is None:
+        return {
+            'feasible': False,
+            'selected': candidates.index[:0],
+            'optimal': not timed_out,
+            'nodes': nodes,
+            'elapsed': elapsed
+        }
+
+    selected = candidates.index[order[best_chosen]]
+    selected_costs = costs[best_chosen]
+    total_cost = float(selected_costs.sum())
+    risks = projects.loc[selected, 'risk'].to_numpy(dtype=float)
+    return {
+        'feasible': True,
+        'selected': selected,
+        'objective_value': best_value,
+        'total_sfm': float(projects.loc[selected, 'sfm_score'].sum()),
+        'total_cost': total_cost,
+        'avg_risk': float(risks @ selected_costs / total_cost) if total_cost else 0.0,
+        'optimal': not timed_out,
+        'gap': 0.0 if not timed_out else max(root_bound - best_value, 0.0) / max(best_value, EPSILON),
+        'nodes': nodes,
+        'elapsed': elapsed
+    }
@@ -0,0 +1,191 @@
+"""
+لقطات المحفظة العمودية
+تُنشر المحفظة من مستودع المشاريع في ملف Arrow IPC غير مضغوط، وتفتحه الجلسات
+بربط الذاكرة (memory-map) دون نسخ: الأعمدة تُقرأ مباشرة من ذاكرة التخزين
+المؤقت لنظام التشغيل، فتتشارك كل الجلسات والعمليات نسخة فعلية واحدة
+
+قياس الذاكرة وزمن الفتح:
+    python portfolio_snapshot.py --projects 50000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from project_store import ACTIVE_STATUSES, COLUMNS, ProjectStore, demo_portfolio
+
+# ترميز القاموس للأعمدة ذات القيم المتكررة يصغّر الملف ويسرّع التجميع
+_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('name', pa.string()),
+    ('sector', pa.dictionary(pa.int8(), pa.string())),
+    ('status', pa.dictionary(pa.int8(), pa.string())),
+    ('awaiting_decision', pa.bool_()),
+    ('cost', pa.float64()),
+    ('sfm_score', pa.float64()),
+    ('risk', pa.int16()),
+    ('progress', pa.float64()),
+    ('issue', pa.string()),
+    ('start_date', pa.string()),
+    ('finish_date', pa.string()),
+    ('economic_score', pa.float64()),
+    ('social_score', pa.float64()),
+    ('environmental_score', pa.float64()),
+    ('sustainability_score', pa.float64()),
+    ('npv', pa.float64())
+])
+
+
+def write_snapshot(projects: pd.DataFrame, path: str) -> int:
+    """
+    كتابة لقطة عمودية بشكل ذري (ملف مؤقت ثم استبدال)
+
+    الجلسات التي فتحت اللقطة السابقة تبقى تقرأها حتى تعيد الفتح.
+
+    Args:
+        projects: المشاريع بأعمدة COLUMNS
+        path: مسار ملف اللقطة
+
+    Returns:
+        int: حجم الملف (بايت)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # دفعة واحدة بقاموس واحد لكل عمود (صيغة ملف IPC لا تقبل استبدال القاموس)
+    table = pa.Table.from_pandas(projects[COLUMNS], schema=_SCHEMA, preserve_index=False).combine_chunks()
+    table = table.replace_schema_metadata({'published_at': datetime.now().isoformat()})
+
+    temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with pa.OSFile(temporary, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return os.path.getsize(path)
+
+
+def publish_snapshot(store: ProjectStore, path: str) -> int:
+    """
+    نشر المحفظة الحالية من مستودع المشاريع
+
+    Returns:
+        int: حجم الملف (بايت)
+    """
+    return write_snapshot(store.query(), path)
+
+
+class PortfolioSnapshot:
+    """
+    لقطة محفظة مفتوحة بربط الذاكرة
+
+    الجدول للقراءة فقط، ولا تُحوَّل إلى pandas إلا الصفوف المعروضة.
+
+    Args:
+        path: مسار ملف اللقطة
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        with pa.memory_map(path, 'r') as source:
+            self.table = pa.ipc.open_file(source).read_all()
+        metadata = self.table.schema.metadata or {}
+        self.published_at = metadata.get(b'published_at', b'').decode() or None
+
+    @property
+    def num_rows(self) -> int:
+        return self.table.num_rows
+
+    def _filter(self, columns: List[str], statuses: Optional[Iterable[str]]) -> pa.Table:
+        """الأعمدة المطلوبة فقط (دون نسخ)، ثم تصفيتها بالحالة (تنسخ الصفوف المطابقة وحدها)"""
+        table = self.table.select(columns)
+        if statuses is None:
+            return table
+        mask = pc.is_in(self.table['status'], value_set=pa.array(list(statuses), pa.string()))
+        return table.filter(mask)
+
+    def stats(self, statuses: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        عدد المشاريع وقيمتها الإجمالية
+
+        Returns:
+            Dict: count و total_cost
+        """
+        table = self._filter(['cost'], statuses)
+        return {'count': table.num_rows, 'total_cost': pc.sum(table['cost']).as_py() or 0.0}
+
+    def count_by(self, column: str, statuses: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        عدد المشاريع لكل قيمة في عمود (الحالة أو القطاع)
+
+        Returns:
+            Dict: القيمة ← العدد
+        """
+        counts = pc.value_counts(self._filter([column], statuses)[column])
+        return dict(zip(counts.field('values').to_pylist(), counts.field('counts').to_pylist()))
+
+    def select(self, columns: List[str], statuses: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        أعمدة المشاريع المطابقة للحالة
+
+        Returns:
+            pd.DataFrame: الأعمدة المطلوبة فقط
+        """
+        return self._filter(columns, statuses).to_pandas()
+
+    def top(self, n: int, order_by: str, columns: List[str], statuses: Optional[Iterable[str]] = None,
+            descending: bool = True) -> pd.DataFrame:
+        """
+        أعلى (أو أدنى) n مشروع حسب عمود
+
+        Returns:
+            pd.DataFrame: الصفوف المختارة فقط
+        """
+        table = self._filter(list(dict.fromkeys(columns + [order_by])), statuses)
+        order = 'descending' if descending else 'ascending'
+        indices = pc.select_k_unstable(table, n, sort_keys=[(order_by, order)])
+        return table.take(indices).sort_by([(order_by, order)]).select(columns).to_pandas()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='قياس فتح لقطة المحفظة')
+    parser.add_argument('--projects', type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'portfolio.arrow')
+        size = write_snapshot(demo_portfolio(args.projects), path)
+        print(f"اللقطة: {args.projects:,} مشروع، {size / 1e6:.1f} MB")
+
+        before = pa.total_allocated_bytes()
+        started = time.perf_counter()
+        snapshot = PortfolioSnapshot(path)
+        opened = time.perf_counter() - started
+        print(f"الفتح: {opened * 1000:.2f} ms، ذاكرة مخصصة: {(pa.total_allocated_bytes() - before) / 1e6:.2f} MB")
+
+        started = time.perf_counter()
+        snapshot.stats(ACTIVE_STATUSES)
+        snapshot.count_by('sector', ACTIVE_STATUSES)
+        snapshot.top(5, 'sfm_score', ['name', 'sfm_score', 'progress'])
+        print(f"استعلامات التقرير: {(time.perf_counter() - started) * 1000:.2f} ms")
+
+        started = time.perf_counter()
+        frame = demo_portfolio(args.projects)
+        print(f"للمقارنة، DataFrame كامل لكل جلسة: {frame.memory_usage(deep=True).sum() / 1e6:.1f} MB "
+              f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+"""
+مستودع المشاريع
+محفظة المشاريع في SQLite (وضع WAL) مع فهارس على الحالة والقطاع والمخاطر
+ودرجة SFM والقيمة، فتُنفذ الصفحات التصفية والترتيب والتقسيم إلى صفحات داخل
+قاعدة البيانات وتقرأ الصفوف المعروضة فقط
+
+قياس زمن الاستعلامات على محفظة تجريبية:
+    python project_store.py --projects 50000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# حالات المشروع
+STATUSES = {
+    'on_track': 'على المسار',
+    'at_risk': 'معرض للخطر',
+    'critical': 'حرج',
+    'completed': 'مكتمل'
+}
+
+# الحالات النشطة (غير المكتملة)
+ACTIVE_STATUSES = ('on_track', 'at_risk', 'critical')
+
+SECTORS = ['الصحة', 'التعليم', 'البنية التحتية', 'الإسكان', 'الطاقة']
+
+# مدخلات البوابة الثانية المحفوظة لكل مشروع (تُقرأ منها المشاريع المرفوضة
+# الأقرب للاجتياز)؛ قد تكون فارغة في المستودعات المنشأة قبل إضافتها
+GATE_2_COLUMNS = ['economic_score', 'social_score', 'environmental_score', 'sustainability_score', 'npv']
+
+COLUMNS = [
+    'id', 'name', 'sector', 'status', 'awaiting_decision', 'cost', 'sfm_score',
+    'risk', 'progress', 'issue', 'start_date', 'finish_date'
+] + GATE_2_COLUMNS
+
+# الأعمدة المسموح بالترتيب عليها
+SORTABLE = ('id', 'name', 'cost', 'sfm_score', 'risk', 'progress', 'start_date', 'finish_date')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    sector TEXT NOT NULL,
+    status TEXT NOT NULL,
+    awaiting_decision INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL,
+    sfm_score REAL NOT NULL,
+    risk INTEGER NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    issue TEXT,
+    start_date TEXT NOT NULL,
+    finish_date TEXT NOT NULL,
+    economic_score REAL,
+    social_score REAL,
+    environmental_score REAL,
+    sustainability_score REAL,
+    npv REAL
+);
+CREATE INDEX IF NOT EXISTS idx_projects_status ON projects (status, sector, cost);
+CREATE INDEX IF NOT EXISTS idx_projects_sector ON projects (sector, status);
+CREATE INDEX IF NOT EXISTS idx_projects_risk ON projects (risk);
+CREATE INDEX IF NOT EXISTS idx_projects_sfm ON projects (sfm_score);
+CREATE INDEX IF NOT EXISTS idx_projects_cost ON projects (cost);
+CREATE INDEX IF NOT EXISTS idx_projects_awaiting ON projects (risk, status, cost)
+    WHERE awaiting_decision = 1;
+"""
+
+
+def _merge_ranges(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    دمج نطاقات المخاطر المتداخلة أو المتجاورة (قيم صحيحة)
+
+    نطاق واحد يستخدم الفهرس مباشرة، أما OR بين عدة نطاقات فيدفع SQLite إلى
+    فهرس آخر أقل انتقائية.
+    """
+    merged: List[Tuple[int, int]] = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def _where(statuses: Optional[Iterable[str]] = None,
+           sectors: Optional[Iterable[str]] = None,
+           risk_ranges: Optional[Iterable[Tuple[int, int]]] = None,
+           cost_range: Optional[Tuple[float, float]] = None,
+           min_sfm: Optional[float] = None,
+           awaiting_decision: Optional[bool] = None) -> Tuple[str, List[Any]]:
+    """
+    بناء شرط WHERE بمعاملات (لا تُدمج القيم في نص الاستعلام)
+
+    قائمة فارغة في statuses أو sectors أو risk_ranges لا تطابق أي مشروع،
+    أما None فتعني بلا تصفية.
+
+    Returns:
+        Tuple: (نص الشرط، المعاملات)
+    """
+    clauses, params = [], []
+    for column, values in (('status', statuses), ('sector', sectors)):
+        if values is not None:
+            values = list(values)
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})" if values else '0')
+            params += values
+    if risk_ranges is not None:
+        ranges = _merge_ranges(risk_ranges)
+        clauses.append('(' + ' OR '.join(['risk BETWEEN ? AND ?'] * len(ranges)) + ')' if ranges else '0')
+        params += [bound for risk_range in ranges for bound in risk_range]
+    if cost_range is not None:
+        clauses.append('cost BETWEEN ? AND ?')
+        params += list(cost_range)
+    if min_sfm is not None:
+        clauses.append('sfm_score >= ?')
+        params.append(min_sfm)
+    if awaiting_decision is not None:
+        # قيمة ثابتة في النص حتى يستخدم SQLite الفهرس الجزئي idx_projects_awaiting
+        clauses.append(f'awaiting_decision = {int(awaiting_decision)}')
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+class ProjectStore:
+    """
+    مستودع المشاريع المشترك بين الجلسات
+
+    كل دوال القراءة تقبل نفس المرشحات (statuses, sectors, risk_ranges,
+    cost_range, min_sfm, awaiting_decision) وتنفذها في SQLite.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add_many(self, projects: pd.DataFrame) -> int:
+        """
+        حفظ مشاريع (المشروع الموجود بنفس المعرف يُستبدل)
+
+        Args:
+            projects: جدول بأعمدة COLUMNS
+
+        Returns:
+            int: عدد المشاريع المحفوظة
+        """
+        rows = projects[COLUMNS].astype(object).where(projects[COLUMNS].notna(), None)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO projects ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                    rows.itertuples(index=False, name=None)
+                )
+            self._conn.execute("ANALYZE projects")
+        return len(rows)
+
+    def query(self, columns: Optional[List[str]] = None, order_by: str = 'id', descending: bool = False,
+              limit: Optional[int] = None, offset: int = 0, **filters) -> pd.DataFrame:
+        """
+        المشاريع المطابقة مرتبة ومقتطعة
+
+        Args:
+            columns: الأعمدة المطلوبة (افتراضياً كلها)
+            order_by: عمود الترتيب (من SORTABLE)
+            descending: ترتيب تنازلي
+            limit: الحد الأقصى للصفوف
+            offset: عدد الصفوف المتخطاة (للتقسيم إلى صفحات)
+            **filters: مرشحات _where
+
+        Returns:
+            pd.DataFrame: المشاريع
+        """
+        if order_by not in SORTABLE:
+            raise ValueError(f"لا يمكن الترتيب على {order_by}")
+        columns = columns or COLUMNS
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"أعمدة غير معروفة: {', '.join(sorted(unknown))}")
+        where, params = _where(**filters)
+        # rowid بنفس الاتجاه يثبت ترتيب القيم المتساوية ويسمح بقراءة الفهرس مرتباً دون فرز
+        direction = 'DESC' if descending else 'ASC'
+        sql = (f"SELECT {', '.join(columns)} FROM projects{where} "
+               f"ORDER BY {order_by} {direction}, rowid {direction}")
+        if limit is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [limit, offset]
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def stats(self, **filters) -> Dict[str, float]:
+        """
+        إحصاءات المشاريع المطابقة
+
+        Returns:
+            Dict: count و total_cost و max_cost
+        """
+        where, params = _where(**filters)
+        with self._lock:
+            count, total_cost, max_cost = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(cost), 0), COALESCE(MAX(cost), 0) FROM projects{where}",
+                params
+            ).fetchone()
+        return {'count': count, 'total_cost': total_cost, 'max_cost': max_cost}
+
+    def count_by(self, column: str, **filters) -> Dict[str, int]:
+        """
+        عدد المشاريع المطابقة لكل حالة أو قطاع
+
+        Args:
+            column: 'status' أو 'sector'
+
+        Returns:
+            Dict: القيمة ← العدد
+        """
+        if column not in ('status', 'sector'):
+            raise ValueError(f"لا يمكن التجميع على {column}")
+        where, params = _where(**filters)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {column}, COUNT(*) FROM projects{where} GROUP BY {column}", params
+            ).fetchall()
+        return dict(rows)
+
+
+# مشاريع معروفة تُضاف في مقدمة المحفظة التجريبية
+FEATURED_PROJECTS = [
+    {
+        'id': 'PRJ-2025-00234',
+        'name': 'مطار إقليمي - المنطقة الشرقية',
+        'sector': 'البنية التحتية',
+        'status': 'critical',
+        'awaiting_decision': True,
+        'cost': 450,
+        'sfm_score': 58,
+        'risk': 72,
+        'progress': 41,
+        'issue': 'تأخير 6 أشهر + تجاوز ميزانية 12%',
+        'start_date': '2024-03-01',
+        'finish_date': '2026-12-31',
+        'economic_score': 61,
+        'social_score': 57,
+        'environmental_score': 55,
+        'sustainability_score': 38,
+        'npv': 12.0
+    },
+    {
+        'id': 'PRJ-2025-00156',
+        'name': 'محطة طاقة شمسية - 500 ميجاواط',
+        'sector': 'الطاقة',
+        'status': 'at_risk',
+        'awaiting_decision': True,
+        'cost': 380,
+        'sfm_score': 82,
+        'risk': 48,
+        'progress': 57,
+        'issue': 'نزاع قانوني مع مقاول فرعي',
+        'start_date': '2024-06-01',
+        'finish_date': '2026-08-31',
+        'economic_score': 85,
+        'social_score': 80,
+        'environmental_score': 80,
+        'sustainability_score': 74,
+        'npv': 41.5
+    },
+    {
+        'id': 'PRJ-2025-00089',
+        'name': 'طريق سريع - 250 كم',
+        'sector': 'البنية التحتية',
+        'status': 'on_track',
+        'awaiting_decision': True,
+        'cost': 520,
+        'sfm_score': 75,
+        'risk': 35,
+        'progress': 22,
+        'issue': 'انتظار موافقة M17_ESG_Approval',
+        'start_date': '2024-09-01',
+        'finish_date': '2027-03-31',
+        'economic_score': 78,
+        'social_score': 74,
+        'environmental_score': 72,
+        'sustainability_score': 66,
+        'npv': 28.0
+    }
+]
+
+# نسب الحالات والقطاعات في المحفظة التجريبية
+_DEMO_STATUS_WEIGHTS = {'on_track': 385, 'at_risk': 82, 'critical': 20, 'completed': 350}
+_DEMO_SECTOR_WEIGHTS = {'الصحة': 95, 'التعليم': 120, 'البنية التحتية': 180, 'الإسكان': 65, 'الطاقة': 27}
+_DEMO_FACILITIES = {
+    'الصحة': ['مستشفى', 'مركز صحي', 'وحدة إسعاف'],
+    'التعليم': ['مدرسة', 'جامعة', 'معهد فني'],
+    'البنية التحتية': ['طريق', 'جسر', 'محطة مياه', 'ميناء جاف'],
+    'الإسكان': ['مجمع سكني', 'مدينة جديدة'],
+    'الطاقة': ['محطة كهرباء', 'محطة رياح', 'محطة طاقة شمسية']
+}
+_DEMO_REGIONS = ['المنطقة الشرقية', 'الدلتا', 'الصعيد', 'سيناء', 'القاهرة الكبرى', 'الساحل']
+_DEMO_ISSUES = [
+    'تأخير في التوريدات',
+    'تجاوز الميزانية المعتمدة',
+    'نزاع قانوني مع مقاول فرعي',
+    'مخاطر جيولوجية',
+    'نقص مواد',
+    'إعادة تقييم دراسة الجدوى'
+]
+
+
+def demo_portfolio(n_projects: int, seed: int = 2025) -> pd.DataFrame:
+    """
+    محفظة تجريبية تبدأ بالمشاريع المعروفة (FEATURED_PROJECTS)
+
+    Args:
+        n_projects: عدد المشاريع الكلي
+        seed: بذرة العشوائية
+
+    Returns:
+        pd.DataFrame: المشاريع بأعمدة COLUMNS
+    """
+    rng = np.random.default_rng(seed)
+    n = max(n_projects - len(FEATURED_PROJECTS), 0)
+
+    weights = np.array(list(_DEMO_STATUS_WEIGHTS.values()), dtype=float)
+    status = rng.choice(list(_DEMO_STATUS_WEIGHTS), n, p=weights / weights.sum())
+    weights = np.array(list(_DEMO_SECTOR_WEIGHTS.values()), dtype=float)
+    sector = rng.choice(list(_DEMO_SECTOR_WEIGHTS), n, p=weights / weights.sum())
+    facility = [_DEMO_FACILITIES[s][i % len(_DEMO_FACILITIES[s])]
+                for s, i in zip(sector, rng.integers(0, 12, n))]
+
+    critical, at_risk = status == 'critical', status == 'at_risk'
+    active = status != 'completed'
+    risk = np.select([critical, at_risk], [rng.integers(60, 96, n), rng.integers(40, 60, n)],
+                     rng.integers(5, 40, n))
+    sfm = np.select([critical, at_risk], [rng.integers(35, 66, n), rng.integers(50, 81, n)],
+                    rng.integers(65, 96, n))
+    # محاور SFM حول الدرجة المستهدفة، ثم الدرجة المحفوظة منها بأوزان config.SFM_WEIGHTS
+    axes = np.clip(sfm[:, None] + rng.integers(-10, 11, (n, 3)), 0, 100)
+    sfm = np.round(axes @ np.array([config.SFM_WEIGHTS[axis] for axis in ('economic', 'social', 'environmental')]))
+    sustainability = np.select([critical, at_risk], [rng.integers(25, 61, n), rng.integers(35, 76, n)],
+                               rng.integers(45, 96, n))
+    cost = np.round(rng.lognormal(3.6, 0.8, n), 1)
+    awaiting = critical | (at_risk & (rng.random(n) < 0.5)) | ((status == 'on_track') & (rng.random(n) < 0.03))
+    issue = np.where(status == 'on_track', 'انتظار موافقة M17_ESG_Approval', rng.choice(_DEMO_ISSUES, n))
+    start = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 1100, n), unit='D')
+    finish = start + pd.to_timedelta(rng.integers(180, 1500, n), unit='D')
+
+    generated = pd.DataFrame({
+        'id': [f"PRJ-2025-{i:05d}" for i in range(1000, 1000 + n)],
+        'name': pd.Series(facility) + ' - ' + rng.choice(_DEMO_REGIONS, n),
+        'sector': sector,
+        'status': status,
+        'awaiting_decision': awaiting,
+        'cost': cost,
+        'sfm_score': sfm,
+        'risk': risk,
+        'progress': np.where(active, rng.integers(5, 96, n), 100),
+        'issue': np.where(awaiting | critical | at_risk, issue, None),
+        'start_date': start.strftime('%Y-%m-%d'),
+        'finish_date': finish.strftime('%Y-%m-%d'),
+        'economic_score': axes[:, 0],
+        'social_score': axes[:, 1],
+        'environmental_score': axes[:, 2],
+        'sustainability_score': sustainability,
+        'npv': np.round(cost * rng.uniform(-0.2, 0.5, n), 1)
+    })
+    return pd.concat([pd.DataFrame(FEATURED_PROJECTS), generated], ignore_index=True)[COLUMNS]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='قياس زمن استعلامات مستودع المشاريع')
+    parser.add_argument('--projects', type=int, default=50_000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ProjectStore(os.path.join(directory, 'projects.db'))
+        started = time.perf_counter()
+        store.add_many(demo_portfolio(args.projects))
+        print(f"تحميل {args.projects:,} مشروع: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        pending = dict(awaiting_decision=True, statuses=['critical', 'at_risk'],
+                       risk_ranges=[(40, 59), (60, 100)], cost_range=(0, 500))
+        queries = {
+            'صفحة قرارات معلقة': lambda: store.query(order_by='risk', descending=True, limit=25, offset=50,
+                                                     **pending),
+            'عدد المطابق': lambda: store.stats(**pending),
+            'أفضل 5 (SFM)': lambda: store.query(statuses=ACTIVE_STATUSES, order_by='sfm_score',
+                                                descending=True, limit=5),
+            'التوزيع حسب القطاع': lambda: store.count_by('sector', statuses=ACTIVE_STATUSES),
+            'الجدول الزمني للحرجة': lambda: store.query(['id', 'name', 'status', 'start_date', 'finish_date'],
+                                                        statuses=['critical'])
+        }
+        for name, run in queries.items():
+            samples = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                run()
+                samples.append((time.perf_counter() - started) * 1000)
+            print(f"{name:<24} الوسيط {np.median(samples):6.2f} ms  الأقصى {max(samples):6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from finance import (
+    IRR_LOWER_BOUND, IRR_UPPER_BOUND, evaluate_cash_flows, irr_batch, npv_batch,
+    payback_period_batch
+)
+
+
+def _npv(flows, rate):
+    flows = np.asarray(flows, dtype=float)
+    return float((flows * (1.0 + rate) ** -np.arange(flows.shape[-1])).sum())
+
+
+def _assert_root(flows, rate, tol=1e-6):
+    """إشارة NPV تتغير حول المعدل المحسوب"""
+    assert _npv(flows, rate - tol) * _npv(flows, rate + tol) <= 0
+
+
+def test_conventional_schedule():
+    assert irr_batch([[-100, 110]])[0] == pytest.approx(0.10, abs=1e-6)
+
+
+@pytest.mark.parametrize('flows', [
+    [-100, 60, 60, -5],
+    [-150] + [12] * 28 + [-1],
+])
+def test_trailing_outflow_has_irr(flows):
+    rate = irr_batch([flows])[0]
+    assert not np.isnan(rate)
+    assert 0 < rate < 1
+    _assert_root(flows, rate)
+
+
+def test_no_sign_change_is_nan():
+    assert np.isnan(irr_batch([[100, 10, 10]])[0])
+
+
+def test_random_schedules_match_brute_force_scan():
+    rng = np.random.default_rng(7)
+    flows = np.column_stack([-rng.uniform(50, 150, 1000), rng.normal(15, 20, (1000, 10))])
+    rates = irr_batch(flows)
+
+    grid = np.linspace(IRR_LOWER_BOUND, IRR_UPPER_BOUND, 5001)
+    signs = np.sign(flows @ ((1.0 + grid)[None, :] ** -np.arange(flows.shape[1])[:, None]))
+    has_root = (signs[:, :-1] * signs[:, 1:] <= 0).any(axis=1)
+
+    np.testing.assert_array_equal(~np.isnan(rates), has_root)
+    for row in np.flatnonzero(has_root):
+        _assert_root(flows[row], rates[row])
+
+
+def test_npv_matches_direct_discounting():
+    flows = [[-100, 30, 40, 50], [-20, 5, 5, 5]]
+    np.testing.assert_allclose(npv_batch(flows, 0.08), [_npv(row, 0.08) for row in flows])
+
+
+def test_npv_rate_curve_per_period():
+    expected = -100 + 60 / 1.05 + 60 / (1.05 * 1.10)
+    assert npv_batch([[-100, 60, 60]], [0.05, 0.10])[0] == pytest.approx(expected)
+
+
+def test_payback_interpolates_within_period():
+    np.testing.assert_allclose(
+        payback_period_batch([[-100, 40, 40, 40], [10, -5, 5, 5], [-100, 10, 10, 10]]),
+        [2.5, 0.0, np.nan]
+    )
+
+
+def test_discounted_payback_is_later():
+    flows = [[-100, 40, 40, 40]]
+    assert payback_period_batch(flows, 0.05)[0] > payback_period_batch(flows)[0]
+
+
+@pytest.mark.parametrize('flows, npv, payback', [
+    ([[-100]], -100.0, np.nan),
+    ([[50]], 50.0, 0.0),
+    ([[]], 0.0, np.nan),
+])
+def test_short_schedules(flows, npv, payback):
+    valuation = evaluate_cash_flows(flows, 0.08).iloc[0]
+    assert valuation['npv'] == pytest.approx(npv)
+    assert np.isnan(valuation['irr'])
+    np.testing.assert_equal(valuation['payback_period'], payback)
@@ -1,13 +1,54 @@
 """
 دوال مساعدة مشتركة عبر التطبيق
+
+كل الصفحات (ومنها صفحة الرؤية الثابتة) تستورد هذه الوحدة عند البدء، لذلك
+تُستورد pandas ووحدات الاتصال بـ n8n داخل الدوال التي تحتاجها فقط، و numpy
+عند أول استخدام فعلي عبر _LazyModule.
 """
 
+from __future__ import annotations
+
+import importlib
+import os
 import streamlit as st
-import requests
 import time
-from typing import Dict, Any, Tuple
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple, Optional
 import config
 
+
+class _LazyModule:
+    """وحدة تُستورد عند أول وصول إلى إحدى خصائصها"""
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from callback_receiver import CallbackReceiver, DecisionStore
+    from n8n_client import N8NClient, WebhookBatcher, WebhookDispatcher, WebhookResponseCache
+    from outbox import WebhookOutbox
+    from portfolio_snapshot import PortfolioSnapshot
+    from project_store import ProjectStore
+else:
+    np = _LazyModule('numpy')
+
+# رموز انتهاكات البوابة الثانية (بت لكل شرط) لاستخدامها في الفحص الدفعي
+GATE_2_VIOLATION_RISK = 1
+GATE_2_VIOLATION_SUSTAINABILITY = 2
+GATE_2_VIOLATION_NPV = 4
+GATE_2_VIOLATION_SFM = 8
+
 def apply_custom_css():
     """
     تطبيق CSS مخصص للتطبيق
@@ -144,11 +185,61 @@ def calculate_sfm_score(economic: float, social: float, environmental: float) ->
     return round(sfm_score, 2)
 
 
+# ترتيب محاور SFM في المصفوفات
+SFM_AXES = ('economic', 'social', 'environmental')
+
+
+def sfm_weight_matrix(weight_sets=None) -> np.ndarray:
+    """
+    تحويل مجموعات أوزان SFM إلى مصفوفة (K×3)
+    
+    Args:
+        weight_sets: قائمة قواميس بنفس مفاتيح config.SFM_WEIGHTS،
+            أو مصفوفة (K×3) بترتيب SFM_AXES (افتراضياً أوزان config)
+    
+    Returns:
+        np.ndarray: مصفوفة الأوزان (K×3)
+    """
+    if weight_sets is None:
+        weight_sets = [config.SFM_WEIGHTS]
+    if isinstance(weight_sets, dict):
+        weight_sets = [weight_sets]
+    if len(weight_sets) and isinstance(weight_sets[0], dict):
+        return np.array(
+            [[weights[axis] for axis in SFM_AXES] for weights in weight_sets],
+            dtype=float
+        )
+    return np.atleast_2d(np.asarray(weight_sets, dtype=float))
+
+
+def calculate_sfm_scores(economic, social, environmental, weight_sets=None) -> np.ndarray:
+    """
+    حساب درجات SFM لعدة مشاريع تحت عدة مجموعات أوزان بضرب مصفوفات واحد
+    
+    Args:
+        economic: مصفوفة الدرجات الاقتصادية (N)
+        social: مصفوفة الدرجات الاجتماعية (N)
+        environmental: مصفوفة الدرجات البيئية (N)
+        weight_sets: مجموعات الأوزان المرشحة (انظر sfm_weight_matrix)
+    
+    Returns:
+        np.ndarray: مصفوفة الدرجات (N×K)، العمود k يقابل مجموعة الأوزان k
+    """
+    scores = np.column_stack([
+        np.asarray(economic, dtype=float),
+        np.asarray(social, dtype=float),
+        np.asarray(environmental, dtype=float)
+    ])
+    weights = sfm_weight_matrix(weight_sets)
+    return np.round(scores @ weights.T, 2)
+
+
 def check_gate_2_conditions(
     risk_score: float,
     sustainability_score: float,
     npv: float,
-    sfm_score: float
+    sfm_score: float,
+    thresholds: Optional[Dict[str, float]] = None
 ) -> Tuple[bool, str, list]:
     """
     فحص شروط اجتياز البوابة الثانية
@@ -158,79 +249,538 @@ def check_gate_2_conditions(
         sustainability_score: درجة الاستدامة (0-100)
         npv: صافي القيمة الحالية (بالملايين)
         sfm_score: درجة الجدوى الشاملة (0-100)
+        thresholds: حدود البوابة بعد استثناءات القطاع
+            (gate_rules.gate_thresholds؛ افتراضياً الحدود العامة من config)
     
     Returns:
         Tuple[bool, str, list]: (نجح/فشل, السبب, قائمة الانتهاكات)
     """
-    thresholds = config.GATE_THRESHOLDS['gate_2']
+    if thresholds is None:
+        thresholds = config.GATE_THRESHOLDS['gate_2']
+    violation_mask = _gate_2_violation_mask(
+        risk_score, sustainability_score, npv, sfm_score, thresholds
+    )
+    violations = format_gate_2_violations(
+        violation_mask, risk_score, sustainability_score, npv, sfm_score, thresholds
+    )
+    
+    # القرار النهائي
+    if violations:
+        reason = "فشل المشروع في استيفاء الشروط التالية:\n" + "\n".join(violations)
+        return False, reason, violations
+    else:
+        reason = "✅ المشروع استوفى جميع شروط البوابة الثانية بنجاح"
+        return True, reason, []
+
+
+def _gate_2_violation_mask(risk_score, sustainability_score, npv, sfm_score, thresholds):
+    """
+    حساب قناع الانتهاكات لشروط البوابة الثانية
+    
+    يعمل على القيم المفردة والمصفوفات على حد سواء، لأنه يعتمد فقط على
+    عمليات المقارنة والضرب و OR الثنائي.
+    """
+    return (
+        (risk_score > thresholds['max_risk']) * GATE_2_VIOLATION_RISK
+        | (sustainability_score < thresholds['min_sustainability']) * GATE_2_VIOLATION_SUSTAINABILITY
+        | (npv < thresholds['min_npv']) * GATE_2_VIOLATION_NPV
+        | (sfm_score < thresholds['min_sfm_score']) * GATE_2_VIOLATION_SFM
+    )
+
+
+def format_gate_2_violations(
+    violation_mask: int,
+    risk_score: float,
+    sustainability_score: float,
+    npv: float,
+    sfm_score: float,
+    thresholds: Optional[Dict[str, float]] = None
+) -> list:
+    """
+    تحويل قناع الانتهاكات لمشروع واحد إلى رسائل نصية
+    
+    تُستدعى فقط للصفوف المعروضة فعلاً، بينما يبقى الفحص نفسه دفعياً.
+    
+    Args:
+        violation_mask: قناع الانتهاكات للمشروع (ناتج check_gate_2_batch)
+        risk_score: درجة المخاطر (0-100)
+        sustainability_score: درجة الاستدامة (0-100)
+        npv: صافي القيمة الحالية (بالملايين)
+        sfm_score: درجة الجدوى الشاملة (0-100)
+        thresholds: حدود البوابة (افتراضياً من config)
+    
+    Returns:
+        list: قائمة رسائل الانتهاكات
+    """
+    if thresholds is None:
+        thresholds = config.GATE_THRESHOLDS['gate_2']
+    violation_mask = int(violation_mask)
     violations = []
     
     # فحص المخاطر
-    if risk_score > thresholds['max_risk']:
+    if violation_mask & GATE_2_VIOLATION_RISK:
         violations.append(f"⚠️ درجة المخاطر ({risk_score}%) تتجاوز الحد المسموح ({thresholds['max_risk']}%)")
     
     # فحص الاستدامة
-    if sustainability_score < thresholds['min_sustainability']:
+    if violation_mask & GATE_2_VIOLATION_SUSTAINABILITY:
         violations.append(f"🌱 درجة الاستدامة ({sustainability_score}%) أقل من الحد الأدنى ({thresholds['min_sustainability']}%)")
     
     # فحص NPV
-    if npv < thresholds['min_npv']:
+    if violation_mask & GATE_2_VIOLATION_NPV:
         violations.append(f"💰 صافي القيمة الحالية ({npv} مليون) سالب أو صفر")
     
     # فحص SFM
-    if sfm_score < thresholds['min_sfm_score']:
+    if violation_mask & GATE_2_VIOLATION_SFM:
         violations.append(f"📊 درجة الجدوى الشاملة ({sfm_score}) أقل من الحد الأدنى ({thresholds['min_sfm_score']})")
     
-    # القرار النهائي
-    if violations:
-        reason = "فشل المشروع في استيفاء الشروط التالية:\n" + "\n".join(violations)
-        return False, reason, violations
-    else:
-        reason = "✅ المشروع استوفى جميع شروط البوابة الثانية بنجاح"
-        return True, reason, []
+    return violations
+
+
+def check_gate_2_batch(
+    risk_scores,
+    sustainability_scores,
+    npvs,
+    sfm_scores,
+    thresholds: Optional[Dict[str, float]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    فحص شروط البوابة الثانية لمحفظة كاملة دفعة واحدة
+    
+    Args:
+        risk_scores: مصفوفة درجات المخاطر (0-100)
+        sustainability_scores: مصفوفة درجات الاستدامة (0-100)
+        npvs: مصفوفة صافي القيمة الحالية (بالملايين)
+        sfm_scores: مصفوفة درجات الجدوى الشاملة (0-100)
+        thresholds: حدود البوابة (افتراضياً من config)
+    
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (قناع النجاح, قناع الانتهاكات لكل صف)
+    """
+    if thresholds is None:
+        thresholds = config.GATE_THRESHOLDS['gate_2']
+    
+    violation_mask = np.asarray(_gate_2_violation_mask(
+        np.asarray(risk_scores),
+        np.asarray(sustainability_scores),
+        np.asarray(npvs),
+        np.asarray(sfm_scores),
+        thresholds
+    ), dtype=np.uint8)
+    
+    return violation_mask == 0, violation_mask
+
+
+def check_gate_2_dataframe(
+    df: pd.DataFrame,
+    thresholds: Optional[Dict[str, float]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    فحص البوابة الثانية لجدول مشاريع يحتوي الأعمدة:
+    risk_score, sustainability_score, npv, sfm_score
+    
+    Args:
+        df: جدول المشاريع
+        thresholds: حدود البوابة (افتراضياً من config)
+    
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (قناع النجاح, قناع الانتهاكات لكل صف)
+    """
+    return check_gate_2_batch(
+        df['risk_score'].to_numpy(),
+        df['sustainability_score'].to_numpy(),
+        df['npv'].to_numpy(),
+        df['sfm_score'].to_numpy(),
+        thresholds
+    )
+
+
+_n8n_client = None
+_n8n_client_lock = threading.Lock()
+
+
+def get_n8n_client() -> N8NClient:
+    """
+    عميل n8n المشترك (جلسة واحدة بمجمع اتصالات وقاطع دائرة لكل العملية)
+    
+    Returns:
+        N8NClient: العميل (يُنشأ عند أول استخدام)
+    """
+    from n8n_client import CircuitBreaker, N8NClient
+    
+    global _n8n_client
+    with _n8n_client_lock:
+        if _n8n_client is None:
+            _n8n_client = N8NClient(
+                config.N8N_WEBHOOK_URL,
+                health_url=config.N8N_HEALTH_URL,
+                breaker=CircuitBreaker(**config.N8N_CIRCUIT),
+                **config.N8N_CLIENT
+            )
+    return _n8n_client
+
+
+def get_n8n_circuit_status() -> Dict[str, Any]:
+    """
+    حالة قاطع الدائرة لمحرك القرارات (للعرض في الواجهة)
+    
+    Returns:
+        Dict: state, label, failures, retry_in
+    """
+    return get_n8n_client().breaker.snapshot()
+
+
+_webhook_response_cache = None
+_webhook_response_cache_lock = threading.Lock()
+
+
+def get_webhook_response_cache() -> WebhookResponseCache:
+    """
+    ذاكرة استجابات n8n المشتركة بين كل الجلسات
+    
+    Returns:
+        WebhookResponseCache: الذاكرة (تُنشأ عند أول استخدام)
+    """
+    from n8n_client import WebhookResponseCache
+    
+    global _webhook_response_cache
+    with _webhook_response_cache_lock:
+        if _webhook_response_cache is None:
+            _webhook_response_cache = WebhookResponseCache(**config.N8N_RESPONSE_CACHE)
+    return _webhook_response_cache
 
 
 def send_to_n8n_webhook(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     إرسال البيانات إلى n8n webhook
     
+    الحمولة المطابقة (بتجاهل timestamp) لإرسال ناجح سابق تعيد استجابته
+    المحفوظة دون طلب جديد.
+    
     Args:
         data: البيانات المراد إرسالها
     
     Returns:
         Dict: استجابة من n8n أو رسالة خطأ
     """
+    from n8n_client import payload_fingerprint
+    
+    cache = get_webhook_response_cache()
+    key = payload_fingerprint(data)
+    future = cache.lookup(key)
+    if future is not None:
+        return future.result()
+    future = Future()
+    cache.track(key, future)
     try:
-        response = requests.post(
-            config.N8N_WEBHOOK_URL,
-            json=data,
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            return {
-                'success': True,
-                'data': response.json(),
-                'message': 'تم إرسال البيانات بنجاح'
-            }
-        else:
-            return {
-                'success': False,
-                'error': f'خطأ في الاستجابة: {response.status_code}',
-                'message': 'فشل الاتصال بالخادم'
-            }
-    except requests.exceptions.Timeout:
-        return {
-            'success': False,
-            'error': 'انتهت مهلة الاتصال',
-            'message': 'الرجاء المحاولة مرة أخرى'
-        }
-    except requests.exceptions.RequestException as e:
-        return {
-            'success': False,
-            'error': str(e),
-            'message': 'خطأ في الاتصال بالشبكة'
-        }
+        future.set_result(get_n8n_client().post(data))
+    except BaseException as e:
+        # خطأ غير متوقع من العميل: إكمال الـ Future به يزيل قيده الجاري ويصل
+        # الخطأ نفسه لمن ينتظر نفس الحمولة بدلاً من انتظار لا ينتهي
+        future.set_exception(e)
+        raise
+    return future.result()
+
+
+_webhook_outbox = None
+_webhook_outbox_lock = threading.Lock()
+
+
+def get_webhook_outbox() -> WebhookOutbox:
+    """
+    صندوق الإرسال الدائم المشترك (يبدأ المُفرِّغ الخلفي عند أول استخدام)
+    
+    Returns:
+        WebhookOutbox: صندوق الإرسال
+    """
+    from outbox import OutboxFlusher, WebhookOutbox
+    
+    global _webhook_outbox
+    with _webhook_outbox_lock:
+        if _webhook_outbox is None:
+            settings = config.N8N_OUTBOX
+            _webhook_outbox = WebhookOutbox(settings['path'], grace_period=settings['grace_period'])
+            OutboxFlusher(
+                _webhook_outbox,
+                lambda key, data: get_n8n_client().post(data, headers={'Idempotency-Key': key}),
+                lambda items: get_n8n_client().post_batch(items),
+                interval=settings['flush_interval'],
+                batch_size=settings['batch_size'],
+                backoff_max=settings['backoff_max'],
+                retention=settings['retention']
+            ).start()
+    return _webhook_outbox
+
+
+def _deliver_outbox_entry(entry: Tuple[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """المحاولة الأولى لتسليم حمولة محفوظة في صندوق الإرسال"""
+    key, data = entry
+    outbox = get_webhook_outbox()
+    response = get_n8n_client().post(data, headers={'Idempotency-Key': key})
+    if response['success']:
+        outbox.mark_delivered([key])
+    else:
+        outbox.mark_failed([key], response.get('error', ''), config.N8N_OUTBOX['flush_interval'])
+    return response
+
+
+_webhook_dispatcher = None
+_webhook_dispatcher_lock = threading.Lock()
+
+
+def get_webhook_dispatcher() -> WebhookDispatcher:
+    """
+    المرسل الخلفي المشترك بين كل الجلسات
+    
+    Returns:
+        WebhookDispatcher: المرسل (يُنشأ عند أول استخدام)
+    """
+    from n8n_client import WebhookDispatcher
+    
+    global _webhook_dispatcher
+    with _webhook_dispatcher_lock:
+        if _webhook_dispatcher is None:
+            _webhook_dispatcher = WebhookDispatcher(
+                _deliver_outbox_entry,
+                max_queue=config.N8N_DISPATCH['max_queue'],
+                workers=config.N8N_DISPATCH['workers']
+            )
+    return _webhook_dispatcher
+
+
+def dispatch_to_n8n_webhook(data: Dict[str, Any]) -> Future:
+    """
+    حفظ البيانات في صندوق الإرسال ثم إرسالها إلى n8n في الخلفية دون انتظار
+    
+    إذا فشل الإرسال أو امتلأت قائمة الانتظار يبقى القرار محفوظاً ويُعاد
+    إرساله تلقائياً بواسطة المُفرِّغ. الحمولة المطابقة (بتجاهل timestamp)
+    لإرسال ناجح سابق أو جارٍ لا تُحفظ ولا تُرسل مرة أخرى.
+    
+    Args:
+        data: البيانات المراد إرسالها
+    
+    Returns:
+        Future: تكتمل باستجابة المحاولة الأولى
+    """
+    from n8n_client import payload_fingerprint
+    
+    cache = get_webhook_response_cache()
+    fingerprint = payload_fingerprint(data)
+    future = cache.lookup(fingerprint)
+    if future is not None:
+        return future
+    key = get_webhook_outbox().enqueue(data)
+    future = get_webhook_dispatcher().submit((key, data))
+    cache.track(fingerprint, future)
+    return future
+
+
+def _deliver_outbox_batch(items: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """المحاولة الأولى لتسليم دفعة محفوظة في صندوق الإرسال"""
+    keys = [key for key, _ in items]
+    outbox = get_webhook_outbox()
+    response = get_n8n_client().post_batch(items)
+    if response['success']:
+        outbox.mark_delivered(keys)
+    else:
+        outbox.mark_failed(keys, response.get('error', ''), config.N8N_OUTBOX['flush_interval'])
+    return response
+
+
+_webhook_batcher = None
+_webhook_batcher_lock = threading.Lock()
+
+
+def get_webhook_batcher() -> WebhookBatcher:
+    """
+    مُجمِّع الدفعات المشترك بين كل الجلسات
+    
+    Returns:
+        WebhookBatcher: المُجمِّع (يُنشأ عند أول استخدام)
+    """
+    from n8n_client import WebhookBatcher
+    
+    global _webhook_batcher
+    with _webhook_batcher_lock:
+        if _webhook_batcher is None:
+            _webhook_batcher = WebhookBatcher(_deliver_outbox_batch, **config.N8N_BATCH)
+    return _webhook_batcher
+
+
+def dispatch_many_to_n8n_webhook(payloads: List[Dict[str, Any]]) -> List[Future]:
+    """
+    حفظ عدة نتائج في صندوق الإرسال ثم إرسالها إلى n8n في دفعات مضغوطة
+    
+    مناسبة للتحليل الجماعي: بدلاً من طلب HTTP لكل مشروع تُجمع النتائج
+    وتُرسل عند امتلاء الدفعة (عدداً أو حجماً) أو انقضاء max_delay.
+    
+    Args:
+        payloads: البيانات المراد إرسالها
+    
+    Returns:
+        List[Future]: Future لكل نتيجة تكتمل باستجابة دفعتها
+    """
+    keys = get_webhook_outbox().enqueue_many(payloads)
+    batcher = get_webhook_batcher()
+    return [batcher.add(payload, key=key) for key, payload in zip(keys, payloads)]
+
+
+_decision_store = None
+_callback_receiver = None
+_callback_receiver_lock = threading.Lock()
+
+
+def get_decision_store() -> DecisionStore:
+    """
+    مخزن القرارات الراجعة من n8n (يبدأ المستقبل عند أول استخدام)
+    
+    Returns:
+        DecisionStore: المخزن المشترك بين كل الجلسات
+    """
+    from callback_receiver import CallbackReceiver, DecisionStore
+    
+    global _decision_store, _callback_receiver
+    with _callback_receiver_lock:
+        if _decision_store is None:
+            settings = config.CALLBACK_RECEIVER
+            _decision_store = DecisionStore(settings['store_path'])
+            if settings['enabled']:
+                receiver = CallbackReceiver(
+                    _decision_store,
+                    host=settings['host'],
+                    port=settings['port'],
+                    path=settings['path'],
+                    token=settings['token'],
+                    max_body=settings['max_body']
+                )
+                try:
+                    _callback_receiver = receiver.start()
+                except OSError:
+                    # المنفذ مشغول (نسخة أخرى من التطبيق تستقبل القرارات في نفس المخزن)
+                    _callback_receiver = None
+    return _decision_store
+
+
+def get_callback_receiver() -> Optional[CallbackReceiver]:
+    """
+    مستقبل القرارات في هذه العملية
+    
+    Returns:
+        CallbackReceiver: المستقبل، أو None إذا لم يبدأ
+    """
+    get_decision_store()
+    return _callback_receiver
+
+
+_project_store = None
+_project_store_lock = threading.Lock()
+
+
+def get_project_store() -> ProjectStore:
+    """
+    مستودع المشاريع المشترك بين كل الجلسات
+    
+    يُملأ بالمحفظة التجريبية عند أول تشغيل إذا كان فارغاً.
+    
+    Returns:
+        ProjectStore: المستودع
+    """
+    from project_store import ProjectStore, demo_portfolio
+    
+    global _project_store
+    with _project_store_lock:
+        if _project_store is None:
+            settings = config.PROJECT_STORE
+            store = ProjectStore(settings['path'])
+            if store.stats()['count'] == 0:
+                store.add_many(demo_portfolio(settings['demo_projects']))
+            _project_store = store
+    return _project_store
+
+
+_portfolio_snapshot = None
+_portfolio_snapshot_lock = threading.Lock()
+
+
+def get_portfolio_snapshot() -> PortfolioSnapshot:
+    """
+    لقطة المحفظة المشتركة بين كل الجلسات (مفتوحة بربط الذاكرة)
+    
+    تُنشر من مستودع المشاريع إذا لم توجد أو مضى عليها أكثر من max_age، وتُعاد
+    فتحها فقط عندما تنشر أي عملية لقطة أحدث.
+    
+    Returns:
+        PortfolioSnapshot: اللقطة
+    """
+    from portfolio_snapshot import PortfolioSnapshot, publish_snapshot
+    
+    global _portfolio_snapshot
+    settings = config.PORTFOLIO_SNAPSHOT
+    with _portfolio_snapshot_lock:
+        try:
+            mtime = os.path.getmtime(settings['path'])
+        except OSError:
+            mtime = None
+        if mtime is None or time.time() - mtime > settings['max_age']:
+            publish_snapshot(get_project_store(), settings['path'])
+            mtime = os.path.getmtime(settings['path'])
+        if _portfolio_snapshot is None or _portfolio_snapshot.mtime != mtime:
+            _portfolio_snapshot = PortfolioSnapshot(settings['path'])
+    return _portfolio_snapshot
+
+
+@st.fragment(run_every=config.CALLBACK_RECEIVER['refresh_interval'])
+def _render_decision_feed(limit: int = 10):
+    """
+    القرارات الراجعة من n8n (جزء يُعاد رسمه وحده كل refresh_interval)
+    
+    تُقرأ من المخزن فقط عند تغير رقم إصداره.
+    """
+    from callback_receiver import DECISIONS
+    
+    store = get_decision_store()
+    cache_key = f'decision_feed_{limit}'
+    cached = st.session_state.get(cache_key)
+    if cached is None or cached['version'] != store.version:
+        cached = {'version': store.version, 'summary': store.summary(), 'recent': store.recent(limit)}
+        st.session_state[cache_key] = cached
+    
+    summary = cached['summary']
+    total = sum(summary.values())
+    if total == 0:
+        receiver = get_callback_receiver()
+        st.info(f"📭 لم تصل قرارات من محرك القرارات بعد"
+                + (f" — عنوان الاستقبال: {receiver.url}" if receiver else ""))
+        return
+    
+    cols = st.columns(len(DECISIONS) + 1)
+    cols[0].metric("القرارات المستلمة", total)
+    for col, (decision, label) in zip(cols[1:], DECISIONS.items()):
+        col.metric(label, summary[decision], f"{summary[decision] / total:.0%}", delta_color="off")
+    
+    recent = cached['recent'].assign(decision=lambda df: df['decision'].map(DECISIONS))
+    st.dataframe(
+        recent.rename(columns={
+            'project_id': 'المعرف',
+            'project_name': 'المشروع',
+            'gate': 'البوابة',
+            'decision': 'القرار',
+            'reason': 'السبب',
+            'sfm_score': 'SFM',
+            'decided_at': 'وقت القرار'
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+
+def show_decision_feed(limit: int = 10):
+    """
+    عرض القرارات الراجعة من n8n مع تحديث تلقائي عند وصول قرارات جديدة
+    
+    Args:
+        limit: عدد أحدث القرارات المعروضة
+    """
+    _render_decision_feed(limit)
 
 
 def display_metric_card(title: str, value: str, delta: str = None, icon: str = "📊"):
@@ -254,20 +804,50 @@ def display_metric_card(title: str, value: str, delta: str = None, icon: str = "
     """, unsafe_allow_html=True)
 
 
-def show_loading_animation(message: str = "جاري المعالجة..."):
+def format_duration(seconds: float) -> str:
+    """تنسيق زمن مرحلة للعرض"""
+    if seconds < 1:
+        return f"{seconds * 1000:.1f} ms"
+    return f"{seconds:.2f} ث"
+
+
+class StageProgress:
     """
-    عرض رسالة تحميل مع شريط تقدم
+    تقدم فعلي لمراحل المعالجة مع قياس زمن كل مرحلة
+    
+    يتقدم الشريط عند انتهاء كل مرحلة فعلياً (لا انتظار مصطنع)، ويُعرض
+    الزمن المقاس لكل مرحلة داخل لوحة الحالة.
     
     Args:
-        message: رسالة التحميل
+        stages: المراحل بالترتيب {المفتاح: العنوان}
+        title: عنوان لوحة الحالة أثناء المعالجة
     """
-    progress_bar = st.progress(0)
-    status_text = st.empty()
     
-    for i in range(100):
-        time.sleep(0.02)
-        progress_bar.progress(i + 1)
-        status_text.text(f"{message} {i+1}%")
+    def __init__(self, stages: Dict[str, str], title: str = "جاري المعالجة..."):
+        self.stages = stages
+        self.durations: Dict[str, float] = {}
+        self._status = st.status(title, expanded=False)
+        self._bar = self._status.progress(0.0)
+    
+    @contextmanager
+    def stage(self, key: str):
+        """قياس مرحلة واحدة (with progress.stage('scoring'): ...)"""
+        label = self.stages[key]
+        self._status.update(label=f"{label}...")
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.durations[key] = elapsed
+            self._status.write(f"✅ {label} — {format_duration(elapsed)}")
+            self._bar.progress(len(self.durations) / len(self.stages))
+    
+    @property
+    def total(self) -> float:
+        """الزمن الكلي للمراحل المقاسة (ثوانٍ)"""
+        return sum(self.durations.values())
     
-    progress_bar.empty()
-    status_text.empty()
\ No newline at end of file
+    def complete(self, label: str = "اكتمل التحليل"):
+        """إغلاق لوحة الحالة مع الزمن الكلي"""
+        self._status.update(label=f"⏱️ {label} في {format_duration(self.total)}", state="complete")
\ No newline at end of file
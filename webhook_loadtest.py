@@ -0,0 +1,199 @@
+"""
+مولّد أحمال لمسار الإرسال إلى n8n
+يرسل حمولات البوابة الثانية بمعدل ثابت (طلبات/ثانية) عبر نفس مسار التطبيق
+(dispatch_to_n8n_webhook: صندوق الإرسال ثم المرسل الخلفي والعميل المشترك
+بقاطع دائرته) ويقيس زمن الاستجابة (p50/p95/p99) وعدد الأخطاء؛ يعمل مع خادم
+n8n_stub المحلي أو أي رابط آخر
+
+التشغيل (يبدأ خادماً بديلاً محلياً إن لم يُعطَ --url):
+    python webhook_loadtest.py --rps 100 --duration 10 --latency 0.05 --error-rate 0.02
+    python webhook_loadtest.py --url http://127.0.0.1:5678/webhook/egisf-gate-check --batch-size 50
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, wait
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+import config
+from gate_rules import gate_thresholds
+from n8n_stub import N8NStubServer
+from utils import check_gate_2_batch, dispatch_many_to_n8n_webhook, dispatch_to_n8n_webhook
+
+SECTORS = ['البنية التحتية', 'الطاقة', 'الصحة', 'التعليم', 'الزراعة', 'الصناعة', 'السياحة']
+
+
+def sample_payload(rng: random.Random, index: int) -> Dict[str, Any]:
+    """حمولة بنفس شكل project_data في محاكي البوابات"""
+    economic, social, environmental = (rng.randint(0, 100) for _ in range(3))
+    sfm = (economic * config.SFM_WEIGHTS['economic']
+           + social * config.SFM_WEIGHTS['social']
+           + environmental * config.SFM_WEIGHTS['environmental'])
+    risk, sustainability = rng.randint(0, 100), rng.randint(0, 100)
+    npv = round(rng.uniform(-50, 500), 1)
+    sector = rng.choice(SECTORS)
+    passed, _ = check_gate_2_batch([risk], [sustainability], [npv], [sfm], gate_thresholds('gate_2', sector))
+    return {
+        'project_name': f'مشروع اختبار {index}',
+        'project_cost': round(rng.uniform(10, 5000), 1),
+        'project_location': 'القاهرة',
+        'project_sector': sector,
+        'project_duration': rng.randint(6, 120),
+        'npv': npv,
+        'economic_score': economic,
+        'social_score': social,
+        'environmental_score': environmental,
+        'sfm_score': round(sfm, 2),
+        'risk_score': risk,
+        'sustainability_score': sustainability,
+        'gate_2_passed': bool(passed[0]),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def configure_dispatch(url: str, concurrency: int, batch_size: int, outbox_dir: str):
+    """
+    توجيه مسار الإرسال في utils إلى رابط الاختبار
+
+    يجب استدعاؤها قبل أول إرسال (العميل والمرسل وصندوق الإرسال تُنشأ عند
+    أول استخدام بهذه الإعدادات). صندوق الإرسال في مجلد مؤقت حتى لا تختلط
+    حمولات الاختبار بقرارات التطبيق.
+    """
+    config.N8N_WEBHOOK_URL = url
+    config.N8N_CLIENT = {**config.N8N_CLIENT, 'pool_maxsize': concurrency}
+    config.N8N_DISPATCH = {**config.N8N_DISPATCH, 'workers': concurrency}
+    config.N8N_BATCH = {**config.N8N_BATCH, 'max_items': batch_size}
+    config.N8N_OUTBOX = {**config.N8N_OUTBOX, 'path': os.path.join(outbox_dir, 'n8n_outbox.db')}
+
+
+def run_load(rps: float, duration: float, batch_size: int = 1, seed: int = 0,
+             drain_timeout: float = 60.0) -> Dict[str, Any]:
+    """
+    تشغيل حمل مفتوح (open-loop) بمعدل ثابت عبر مسار الإرسال في التطبيق
+
+    الطلب i مجدول عند start + i / rps، ويُقاس زمنه من موعده المجدول حتى
+    اكتمال استجابته، فيظهر أثر تكدس الطلبات (وامتلاء قائمة الإرسال) عندما
+    يعجز الخادم عن مجاراة المعدل.
+
+    Args:
+        rps: الطلبات المستهدفة في الثانية
+        duration: مدة التشغيل (ثوانٍ)
+        batch_size: عدد النتائج في كل طلب (أكبر من 1 يستخدم dispatch_many_to_n8n_webhook)
+        seed: بذرة الحمولات
+        drain_timeout: أقصى انتظار لاستجابات الطلبات الجارية بعد آخر طلب (ثوانٍ)
+
+    Returns:
+        Dict: عدد الطلبات والمعدل المحقق والنسب المئوية للزمن (مللي ثانية) والأخطاء
+    """
+    rng = random.Random(seed)
+    total = int(rps * duration)
+    latencies = np.full(total, np.nan)
+    errors: Counter = Counter()
+    errors_lock = threading.Lock()
+    futures: List[Future] = []
+
+    def record(i: int, scheduled: float, future: Future):
+        latencies[i] = time.perf_counter() - scheduled
+        response = future.result()
+        if not response['success']:
+            with errors_lock:
+                errors[response.get('error', 'unknown')] += 1
+
+    started = time.perf_counter()
+    for i in range(total):
+        scheduled = started + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if batch_size > 1:
+            # نتائج الطلب الواحد تُرسل في دفعة واحدة وتكتمل باستجابتها معاً
+            future = dispatch_many_to_n8n_webhook(
+                [sample_payload(rng, i * batch_size + j) for j in range(batch_size)]
+            )[-1]
+        else:
+            future = dispatch_to_n8n_webhook(sample_payload(rng, i))
+        future.add_done_callback(lambda f, i=i, scheduled=scheduled: record(i, scheduled, f))
+        futures.append(future)
+    wait(futures, timeout=drain_timeout)
+    elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = np.nanpercentile(latencies, [50, 95, 99]) * 1000 if total else (np.nan,) * 3
+    return {
+        'requests': total,
+        'items': total * batch_size,
+        'target_rps': rps,
+        'achieved_rps': total / elapsed if elapsed else 0.0,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(np.nanmax(latencies) * 1000) if total else float('nan'),
+        'errors': sum(errors.values()),
+        'error_breakdown': dict(errors)
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """تقرير نصي مختصر"""
+    lines = [
+        f"الطلبات: {report['requests']} (نتائج: {report['items']})",
+        f"المعدل: {report['achieved_rps']:.1f} / {report['target_rps']:.1f} طلب/ث",
+        f"الزمن (ms): p50={report['p50_ms']:.1f}  p95={report['p95_ms']:.1f}  "
+        f"p99={report['p99_ms']:.1f}  max={report['max_ms']:.1f}",
+        f"الأخطاء بعد إعادة المحاولة: {report['errors']}"
+    ]
+    lines += [f"  - {error}: {count}" for error, count in report['error_breakdown'].items()]
+    if 'server' in report:
+        server = report['server']
+        lines.append(
+            f"الخادم: {server['requests']} طلب مستلم، {server['errors']} خطأ محقون، "
+            f"{server['retries']} إعادة محاولة"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='اختبار أحمال مسار الإرسال إلى n8n')
+    parser.add_argument('--url', help='رابط الـ Webhook (افتراضياً: خادم n8n_stub محلي)')
+    parser.add_argument('--rps', type=float, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=32, help='خيوط الإرسال واتصالات المجمع')
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.05, help='زمن الخادم المحلي (ثوانٍ)')
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='طباعة التقرير بصيغة JSON')
+    args = parser.parse_args(argv)
+
+    stub = None
+    url = args.url
+    if url is None:
+        stub = N8NStubServer(latency=args.latency, jitter=args.jitter,
+                             error_rate=args.error_rate, seed=args.seed).start()
+        url = stub.url
+
+    try:
+        with tempfile.TemporaryDirectory() as outbox_dir:
+            configure_dispatch(url, args.concurrency, args.batch_size, outbox_dir)
+            report = run_load(args.rps, args.duration, args.batch_size, args.seed)
+    finally:
+        if stub is not None:
+            stub.stop()
+    if stub is not None:
+        # إعادة المحاولة في العميل تخفي أخطاء الخادم عن زمن الطلبات، فتُعرض إحصاءاته بجانبها
+        report['server'] = dict(stub.stats)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2) if args.json else format_report(report))
+
+
+if __name__ == '__main__':
+    main()